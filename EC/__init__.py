@@ -1,2 +1 @@
-from .more_items_loaded import more_items_loaded
 from .element_attribute_changed import element_attribute_changed
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Run the microbenchmark suite:
+
+    python -m benchmarks [--quick] [--filter REGEX] [--save-baseline NAME] [--compare NAME]
+
+Baselines are saved as JSON under benchmarks/baselines/, one per machine or
+branch, and `--compare` flags benchmarks slower than the baseline by more
+than `--tolerance`.
+"""
+from .suite import BENCHMARKS
+from utils.colors import *
+
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+from pathlib import Path
+from datetime import datetime
+
+BASELINES_DIR = Path(__file__).parent.joinpath("baselines")
+
+
+def time_benchmark(setup, quick: bool, repeat: int) -> list[float]:
+    bench = setup(quick)
+    if isinstance(bench, tuple):
+        prepare, run = bench
+    else:
+        prepare, run = (lambda: None), (lambda state: bench())
+
+    # Warm up caches (regexes, imports) before timing
+    run(prepare())
+    timings = []
+    for _ in range(repeat):
+        state = prepare()
+        start = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--quick", "-q", default=False, action="store_true", help="Smaller fixtures, for a fast sanity run")
+    parser.add_argument("--filter", "-k", default="", help="Only run benchmarks whose name matches this regex")
+    parser.add_argument("--repeat", "-r", default=5, type=int, help="Timed runs per benchmark")
+    parser.add_argument("--save-baseline", default=None, help="Save results as benchmarks/baselines/<NAME>.json", dest="save_baseline")
+    parser.add_argument("--compare", default=None, help="Compare against benchmarks/baselines/<NAME>.json")
+    parser.add_argument("--tolerance", default=0.2, type=float, help="Allowed slowdown ratio before flagging a regression")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    baseline = None
+    if args.compare:
+        with open(BASELINES_DIR.joinpath(f"{args.compare}.json")) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    regressions = []
+    for name, setup in BENCHMARKS.items():
+        if not re.search(args.filter, name):
+            continue
+        timings = time_benchmark(setup, args.quick, args.repeat)
+        result = {"median": statistics.median(timings), "min": min(timings)}
+        results[name] = result
+
+        line = f"{name:<50}median {result['median'] * 1000:>10.2f}ms   min {result['min'] * 1000:>10.2f}ms"
+        if baseline and name in baseline:
+            ratio = result["median"] / baseline[name]["median"]
+            line += f"   x{ratio:.2f}"
+            if ratio > 1 + args.tolerance:
+                regressions.append(name)
+                line = red(line)
+            elif ratio < 1 - args.tolerance:
+                line = green(line)
+        print(line, flush=True)
+
+    if args.save_baseline:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        with open(BASELINES_DIR.joinpath(f"{args.save_baseline}.json"), "w") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "quick": args.quick,
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+
+    if regressions:
+        print(red(f"{len(regressions)} regression(s): {', '.join(regressions)}"))
+        sys.exit(1)
@@ -0,0 +1,141 @@
+"""
+Synthetic, seeded fixtures shaped like what the crawlers see on Facebook.
+"""
+import json
+import random
+import string
+
+from pandas import DataFrame
+
+VI_WORDS = "ngân hàng khách hàng ưu đãi lãi suất tiết kiệm thẻ tín dụng chuyển khoản miễn phí ứng dụng".split()
+
+
+class HTMLElement:
+    """Stands in for a `WebElement` in `utils.parsing` functions reading `innerHTML`"""
+
+    def __init__(self, inner_html: str) -> None:
+        self.inner_html = inner_html
+
+    def get_attribute(self, name: str):
+        assert name == "innerHTML"
+        return self.inner_html
+
+
+def rng(seed: int = 0):
+    return random.Random(seed)
+
+
+def sentence(r: random.Random, n_words: int = 12):
+    return " ".join(r.choice(VI_WORDS) for _ in range(n_words))
+
+
+def caption_html(r: random.Random, n_paragraphs: int = 6):
+    """Story message innerHTML with emoji images, links and paragraphs"""
+    paragraphs = []
+    for i in range(n_paragraphs):
+        parts = [sentence(r)]
+        if i % 2 == 0:
+            parts.append('<img height="16" width="16" alt="👉" src="https://static.xx.fbcdn.net/images/emoji.php/v9/t51/1/16/1f449.png">')
+        if i % 3 == 0:
+            parts.append(f'<a class="x1i10hfl" href="https://www.facebook.com/hashtag/{r.choice(VI_WORDS)}?__eep__=6" role="link" tabindex="0">#{r.choice(VI_WORDS)}</a>')
+        paragraphs.append(f'<div dir="auto" style="text-align: start;">{" ".join(parts)}</div>')
+    return f'<div class="xdj266r x11i5rnm xat24cr x1mh8g0r x1vvkbs">{"".join(paragraphs)}</div>'
+
+
+def raw_post_dates(r: random.Random, n: int, lang: str = "vi"):
+    en_months = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+    dates = []
+    for _ in range(n):
+        d, m, y, hh, mm = r.randint(1, 28), r.randint(1, 12), r.randint(2015, 2024), r.randint(0, 23), r.randint(0, 59)
+        if lang == "vi":
+            dates.append(f"Thứ Hai, {d} Tháng {m}, {y} lúc {hh}:{mm:02d}")
+        else:
+            dates.append(f"Monday {d} {en_months[m - 1]} {y} at {hh}:{mm:02d}")
+    return dates
+
+
+def video_page_source(r: random.Random, size_kb: int = 300):
+    """Page source with escaped video/audio representations buried in script JSON"""
+    filler = "".join(r.choices(string.ascii_letters + string.digits, k=size_kb * 1024))
+    representations = json.dumps([
+        {"mime_type": "video\\/mp4", "codecs": "avc1.64001F", "base_url": "https:\\/\\/video.fsgn5-9.fna.fbcdn.net\\/o1\\/v\\/t2\\/f2\\/m69\\/AQN.mp4?efg=eyJ\\u00253D"},
+        {"mime_type": "audio\\/mp4", "codecs": "mp4a.40.5", "base_url": "https:\\/\\/video.fsgn5-9.fna.fbcdn.net\\/o1\\/v\\/t2\\/f2\\/m69\\/AQM.mp4?efg=eyJ\\u00253D"},
+    ]).replace(", ", ",").replace(": ", ":").replace('\\\\', '\\')
+    half = len(filler) // 2
+    return f"<html><head></head><body><h2>Page</h2><script>{filler[:half]}{representations}{filler[half:]}</script></body></html>"
+
+
+def page_with_links(r: random.Random, n_links: int = 2000):
+    anchors = []
+    for i in range(n_links):
+        kind = r.random()
+        if kind < 0.3:
+            href = f"https://www.facebook.com/{''.join(r.choices(string.ascii_lowercase, k=10))}"
+        elif kind < 0.6:
+            href = f"https://www.facebook.com/groups/{r.randint(10**9, 10**10)}/posts/{r.randint(10**9, 10**10)}"
+        else:
+            href = f"/photo/?fbid={r.randint(10**9, 10**10)}&set=a.{r.randint(10**9, 10**10)}"
+        anchors.append(f'<div class="x1n2onr6"><span><a href="{href}" role="link" tabindex="0">{sentence(r, 3)}</a></span></div>')
+    return f"<html><body><div role='main'>{''.join(anchors)}</div></body></html>"
+
+
+def caption_frame(r: random.Random, n_rows: int = 500):
+    captions = []
+    for _ in range(n_rows):
+        text = sentence(r, 20)
+        for _ in range(r.randint(0, 3)):
+            text += f" href(#{r.choice(VI_WORDS)}, https://www.facebook.com/hashtag/{r.choice(VI_WORDS)}) {sentence(r, 5)}"
+        captions.append(text)
+    return DataFrame({"post_id": [f"{i:064x}" for i in range(n_rows)], "caption": captions})
+
+
+def post_record(r: random.Random, i: int):
+    return {
+        "post_id": f"{i:064x}",
+        "post_url": f"https://www.facebook.com/{r.randint(10**15, 10**16)}",
+        "caption": sentence(r, 40),
+        "num_comments": str(r.randint(0, 500)),
+        "num_shares": str(r.randint(0, 100)),
+        "num_reactions": str(r.randint(0, 5000)),
+    }
+
+
+def urls(r: random.Random, n: int, prefix: str = "https://www.facebook.com/"):
+    return [f"{prefix}{r.getrandbits(64):016x}" for _ in range(n)]
+
+
+def comment_node(r: random.Random, i: int):
+    return {
+        "__typename": "Comment",
+        "id": f"Y29tbWVudDo{i:08d}",
+        "legacy_fbid": str(10**15 + i),
+        "body": {"text": sentence(r, r.randint(3, 30))},
+        "author": {"id": str(r.randint(10**14, 10**15)), "name": sentence(r, 2).title()},
+        "created_time": r.randint(1_600_000_000, 1_730_000_000),
+        "depth": 0,
+    }
+
+
+def comment_thread(r: random.Random, n_pages: int = 20, per_page: int = 50):
+    """
+    Post page source holding the first comments, and the GraphQL responses
+    paging through the rest keyed by cursor, as replayed by `StubServer`
+    """
+    def connection(page: int):
+        nodes = [comment_node(r, page * per_page + i) for i in range(per_page)]
+        has_next = page < n_pages - 1
+        return {"comments": {
+            "edges": [{"node": node} for node in nodes],
+            "page_info": {"end_cursor": f"cursor-{page}" if has_next else None, "has_next_page": has_next},
+        }}
+
+    first = {"data": {"node": {"__typename": "Feedback", "id": "ZmVlZGJhY2s6MTIzNDU2Nzg5", **connection(0)}}}
+    page_html = (
+        '<html><head><script>["DTSGInitialData",[],{"token":"stub-dtsg"}]["LSD",[],{"token":"stub-lsd"}]</script></head>'
+        f'<body><script type="application/json" data-sjs>{json.dumps(first, separators=(",", ":"))}</script></body></html>'
+    )
+    responses = {
+        f"cursor-{page - 1}": "for (;;);" + json.dumps({"data": {"node": connection(page)}}, separators=(",", ":"))
+        for page in range(1, n_pages)
+    }
+    return page_html, responses
@@ -0,0 +1,60 @@
+"""
+Report the import cost of modules, per top-level package, from a fresh interpreter:
+
+    python -m benchmarks.startup [MODULE ...] [--top N]
+
+Default modules are what a crawl imports before opening a browser.
+"""
+import re
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+from collections import defaultdict
+
+ROOT = Path(__file__).parent.parent
+DEFAULT_MODULES = ["main", "config", "crawlers.page_crawler.crawler", "crawlers.bank_crawler.crawler"]
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) of every module imported by `import module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            times.append((name, int(self_us), int(cumulative_us)))
+    return times
+
+
+def report(module: str, top: int):
+    times = import_times(module)
+    total = next((cumulative for name, _, cumulative in times if name == module), 0)
+    per_package = defaultdict(int)
+    for name, self_us, _ in times:
+        per_package[name.split(".")[0]] += self_us
+
+    print(f"import {module}: {total / 1000:.1f}ms, {len(times)} modules")
+    for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"    {package:<30}{self_us / 1000:>10.1f}ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", "-n", default=10, type=int, help="Number of packages listed per module")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for module in args.modules:
+        report(module, args.top)
@@ -0,0 +1,93 @@
+"""
+Local HTTP server standing in for Facebook in benchmarks of
+`utils.comment_client`: it replays a recorded post page, and the GraphQL
+response recorded for each comment cursor.
+"""
+import json
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.graphql import iter_payloads, iter_html_payloads, load_responses
+from utils.comment_client import find_page_info
+
+
+class StubServer:
+    """
+    Serves `page_html` on any GET, and on a POST to `/api/graphql/` the body in
+    `responses` keyed by the `commentsAfterCursor` of its variables, 404 if none.
+    Use as a context manager, `base_url` is set once started.
+    """
+
+    def __init__(self, page_html: str, responses: dict[str, str], host: str = "127.0.0.1", port: int = 0) -> None:
+        self.page_html = page_html
+        self.responses = responses
+        self.n_requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def send_body(self, status: int, body: str, content_type: str):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                stub.n_requests += 1
+                self.send_body(200, stub.page_html, "text/html; charset=utf-8")
+
+            def do_POST(self):
+                stub.n_requests += 1
+                form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+                variables = json.loads(form.get("variables", ["{}"])[0])
+                body = stub.responses.get(variables.get("commentsAfterCursor"))
+                if self.path.rstrip("/") != "/api/graphql" or body is None:
+                    self.send_body(404, "", "text/plain")
+                else:
+                    self.send_body(200, body, "application/json")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @classmethod
+    def from_recording(cls, page_path: str, responses_dir: str, **kwargs):
+        """
+        Replay a post page source, e.g. recorded into a corpus, and the comment
+        pages then captured by `NetworkCapture` into `responses_dir`, in order:
+        each response answers the cursor the previous one ended with.
+        """
+        page_html = Path(page_path).read_text(encoding="utf-8")
+        responses = {}
+        page_info = find_page_info(list(iter_html_payloads(page_html)))
+        for body in load_responses(responses_dir):
+            if not page_info or not page_info.get("end_cursor"):
+                break
+            responses[page_info["end_cursor"]] = body
+            page_info = find_page_info(list(iter_payloads(body)))
+        return cls(page_html, responses, **kwargs)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="stub-server")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
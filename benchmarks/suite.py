@@ -0,0 +1,193 @@
+"""
+Benchmarks of the per-post hot paths. Each benchmark is a setup function
+returning the callable to be timed, so fixtures are built outside the timing.
+A setup may instead return a `(prepare, run)` pair when `run` consumes state:
+`prepare()` is called untimed before each `run(state)`.
+"""
+import os
+import sys
+import tempfile
+import subprocess
+from typing import Any, Callable
+
+from . import fixtures
+from .startup import ROOT
+from utils import LinkExtractor, Progress
+from utils.parsing import parse_text_from_element, parse_post_date, get_video_url_from_source
+from pipeline import Pipeline, HandleHrefs, SaveAsCSV, AsDataFrame
+from utils.comment_client import CommentClient
+from utils.graphql import iter_payloads, iter_html_payloads, find_nodes
+from .stub_server import StubServer
+
+BENCHMARKS: dict[str, Callable[[bool], Any]] = {}
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[bool], Any]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark("parsing.parse_text_from_element")
+def bench_parse_text(quick: bool):
+    r = fixtures.rng()
+    elements = [fixtures.HTMLElement(fixtures.caption_html(r)) for _ in range(100)]
+    return lambda: [parse_text_from_element(element) for element in elements]
+
+
+@benchmark("parsing.parse_post_date[vi]")
+def bench_parse_post_date_vi(quick: bool):
+    dates = fixtures.raw_post_dates(fixtures.rng(), 1000, lang="vi")
+    return lambda: [parse_post_date(date, lang="vi") for date in dates]
+
+
+@benchmark("parsing.parse_post_date[en]")
+def bench_parse_post_date_en(quick: bool):
+    dates = fixtures.raw_post_dates(fixtures.rng(), 1000, lang="en")
+    return lambda: [parse_post_date(date, lang="en") for date in dates]
+
+
+@benchmark("parsing.get_video_url_from_source")
+def bench_video_url(quick: bool):
+    source = fixtures.video_page_source(fixtures.rng(), size_kb=100 if quick else 500)
+    return lambda: get_video_url_from_source(source)
+
+
+@benchmark("link_extractor.extract")
+def bench_link_extractor(quick: bool):
+    html = fixtures.page_with_links(fixtures.rng(), n_links=500 if quick else 5000)
+    extractor = LinkExtractor(allow_regex=r"https://www\.facebook\.com/[^/\s\?]+$", deny_regex=r"")
+    return lambda: extractor.extract(html)
+
+
+def _bench_handle_hrefs(action: str):
+    def setup(quick: bool):
+        df = fixtures.caption_frame(fixtures.rng(), n_rows=200 if quick else 2000)
+        step = HandleHrefs(action=action)
+        return lambda: step(df)
+    return setup
+
+
+for _action in ["ignore", "keep_content", "replace"]:
+    benchmark(f"pipeline.HandleHrefs[{_action}]")(_bench_handle_hrefs(_action))
+
+
+def _bench_enqueue_list(frontier_size: int):
+    def setup(quick: bool):
+        n = frontier_size // 10 if quick else frontier_size
+        r = fixtures.rng()
+        progress_dir = tempfile.mkdtemp(prefix="bench-progress-")
+        history = fixtures.urls(r, n)
+        queued = fixtures.urls(r, n // 2)
+        # Half of the extracted URLs were seen before
+        new_urls = history[:5000] + fixtures.urls(r, 5000)
+
+        def prepare():
+            progress = Progress(dir=progress_dir)
+            for url in history:
+                progress.add_history(url)
+            progress.enqueue_list(queued)
+            return progress
+
+        def run(progress: Progress):
+            # Link extraction enqueues a page's worth of URLs at a time
+            for start in range(0, len(new_urls), 100):
+                progress.selectively_enqueue_list(new_urls[start:start + 100])
+        return prepare, run
+    return setup
+
+
+benchmark("progress.selectively_enqueue_list[1e5]")(_bench_enqueue_list(10**5))
+benchmark("progress.selectively_enqueue_list[1e6]")(_bench_enqueue_list(10**6))
+
+
+def _bench_checkpoint(backend: str):
+    def setup(quick: bool):
+        n = 10**4 if quick else 10**5
+        r = fixtures.rng()
+        history = fixtures.urls(r, n)
+        crawled = fixtures.urls(r, 100)
+        progress = Progress(dir=tempfile.mkdtemp(prefix="bench-progress-"), backend=backend, compact_every=10**9)
+        for url in history:
+            progress.add_history(url)
+        progress.save()
+
+        def run():
+            # Persist progress after each crawled URL
+            for url in crawled:
+                progress.add_history(url)
+                progress.selectively_enqueue(url + "/about")
+                if backend == "text":
+                    progress.save()
+                else:
+                    progress.checkpoint()
+        return run
+    return setup
+
+
+for _backend in ["text", "journal"]:
+    benchmark(f"progress.checkpoint_per_url[{_backend}]")(_bench_checkpoint(_backend))
+
+
+@benchmark("pipeline.SaveAsCSV[append]")
+def bench_save_as_csv(quick: bool):
+    r = fixtures.rng()
+    records = [fixtures.post_record(r, i) for i in range(50 if quick else 200)]
+    to_df = AsDataFrame()
+    save_dir = tempfile.mkdtemp(prefix="bench-csv-")
+    step = SaveAsCSV(save_dir=save_dir)
+
+    def run():
+        if os.path.exists(step.csv_path):
+            os.remove(step.csv_path)
+        for record in records:
+            step(to_df(record))
+    return run
+
+
+def _bench_pipeline(batch_size: int):
+    def setup(quick: bool):
+        r = fixtures.rng()
+        records = [fixtures.post_record(r, i) for i in range(50 if quick else 200)]
+        save_dir = tempfile.mkdtemp(prefix="bench-pipeline-")
+        step = SaveAsCSV(save_dir=save_dir)
+        pipeline = Pipeline(step, batch_size=batch_size)
+
+        def run():
+            if os.path.exists(step.csv_path):
+                os.remove(step.csv_path)
+            for record in records:
+                pipeline(record)
+            pipeline.close()
+        return run
+    return setup
+
+
+for _batch_size in [1, 50]:
+    benchmark(f"pipeline.Pipeline[batch_size={_batch_size}]")(_bench_pipeline(_batch_size))
+
+
+@benchmark("comment_client.fetch[stub server]")
+def bench_comment_client(quick: bool):
+    page_html, responses = fixtures.comment_thread(fixtures.rng(), n_pages=5 if quick else 20)
+    server = StubServer(page_html, responses).start()
+    client = CommentClient([], base_url=server.base_url, page_delay=0)
+    # Every recorded comment is paged through, once
+    payloads = [*iter_html_payloads(page_html), *(payload for body in responses.values() for payload in iter_payloads(body))]
+    expected = [node["legacy_fbid"] for payload in payloads for node in find_nodes(payload, "Comment", nested=True)]
+    comments = client.fetch(f"{server.base_url}/123456789")
+    assert [comment["comment_id"] for comment in comments] == expected, f"{len(comments)} of {len(expected)} comments fetched"
+    # The server thread is a daemon, left running until the suite exits
+    return lambda: client.fetch(f"{server.base_url}/123456789")
+
+
+def _bench_import(module: str):
+    def setup(quick: bool):
+        # A fresh interpreter each run, so nothing is cached in sys.modules
+        return lambda: subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+    return setup
+
+
+for _module in ["main", "config", "crawlers.bank_crawler.crawler"]:
+    benchmark(f"startup.import[{_module}]")(_bench_import(_module))
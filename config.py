@@ -7,6 +7,9 @@ PIPELINE = Pipeline(
     # SaveImages(save_dir="{crawler_dir}/{page_id}", img_url_col="img_urls", id_col="post_id"),
     # SaveVideos(save_dir="{crawler_dir}/{page_id}", vid_url_col="video_urls", audio_url_col="video_audio_urls", id_col="post_id"),
     SaveAsCSV(save_dir="{crawler_dir}/{page_id}"),
+    # Records are saved together every 50 posts or 10 seconds, and whenever a URL is done
+    batch_size=50,
+    flush_interval=10,
 )
 
 NAVIGATE_LINK_EXTRACTOR = LinkExtractor(allow_regex=r"", deny_regex=r".*")
@@ -20,7 +23,9 @@ CRAWLER_ARGUMENTS = {
         page_id="VTManhthu371373",
         language="vi",  # ["vi", "en"]
         theme="dark",  # ["light", "dark"]
-        max_ram_percentage=0.95, # Should be at least 0.9 for Facebook to autoclean its memory
+        parse_mode="snapshot",  # ["driver", "snapshot", "batch", "network"]
+        incremental=False,  # Skip posts stored by previous crawls, stopping after a run of them
+        max_ram_percentage=0.95, # Browser is recycled above this share of system RAM. Should be at least 0.9 for Facebook to autoclean its memory
     ),
     "bank_crawler": dict(
         page_id="NganhangKienLong",
@@ -31,6 +36,9 @@ CRAWLER_ARGUMENTS = {
         post_collect_threshold=2000,
         language="vi",  # ["vi", "en"]
         theme="dark",  # ["light", "dark"]
-        max_ram_percentage=0.95, # Should be at least 0.9 for Facebook to autoclean its memory
+        parse_mode="snapshot",  # ["driver", "snapshot", "batch", "network"]
+        incremental=False,  # Skip posts stored by previous crawls, stopping after a run of them
+        comment_fetch="browser",  # ["browser", "http"], "http" pages through comments without the browser, see utils/comment_client.py
+        max_ram_percentage=0.95, # Browser is recycled above this share of system RAM. Should be at least 0.9 for Facebook to autoclean its memory
     )
 }
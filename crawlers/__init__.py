@@ -1,2 +1,21 @@
-from .base_crawler import BaseCrawler
-from .page_crawler import Crawler as PageCrawler
+from importlib import import_module
+
+# Imported on first access, so that choosing one crawler does not import the others
+_exports = {
+    "BaseCrawler": (".base_crawler", "BaseCrawler"),
+    "PageCrawler": (".page_crawler.crawler", "Crawler"),
+    "CrawlerPool": (".worker_pool", "CrawlerPool"),
+}
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _exports[name]
+    value = getattr(import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_exports})
@@ -1 +1,6 @@
-from .crawler import Crawler
+def __getattr__(name: str):
+    # Imported on first access, so that the browserless `snapshot` module does not import selenium
+    if name != "Crawler":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from .crawler import Crawler
+    return Crawler
@@ -4,7 +4,7 @@ from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver import Chrome
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import WebDriverException, TimeoutException
 
 import re
 import traceback
@@ -16,9 +16,16 @@ import bs4
 import pandas as pd
 from pathlib import Path
 from ..base_crawler import BaseCrawler
-from EC import more_items_loaded, element_attribute_changed
-from utils.parsing import parse_post_date, parse_text_from_element, get_video_url_from_source, get_text_from_cmt_bubble, get_id_from_cmt_bubble
-from utils.utils import to_bs4, to_etree, ordinal, sha256, tqdm_output, check_unavailable, write_element
+from EC import element_attribute_changed
+from utils.parsing import parse_post_date, parse_text_from_element, get_video_url_from_source
+from utils.utils import to_bs4, to_etree, ordinal, sha256, tqdm_output, check_unavailable, write_element, snapshot, append_csv
+from utils.feed_cursor import FeedCursor, post_fingerprint
+from utils.seen_posts import SeenPosts
+from utils.work_queue import WorkQueue
+from utils.selectors import selector, selectors
+from ..page_crawler.snapshot import classify_post
+from .snapshot import parse_post_tree, parse_post_entry, extractor_texts, parse_story_record, parse_comments_tree, comment_columns
+from utils.graphql import iter_payloads, iter_html_payloads, parse_comments
 from utils.colors import *
 
 from urllib.parse import urlparse, parse_qs
@@ -30,10 +37,10 @@ from tqdm import tqdm
 
 
 class Crawler(BaseCrawler):
-    posts_xpath = "(//div[@class='x9f619 x1n2onr6 x1ja2u2z xeuugli xs83m0k xjl7jj x1xmf6yo x1emribx x1e56ztr x1i64zmx x19h7ccj xu9j1y6 x7ep2pv']/div)[last()]/div//div[@class='x1yztbdb x1n2onr6 xh8yej3 x1ja2u2z']"
-    anchor_xpath = "((//div[@class='x9f619 x1n2onr6 x1ja2u2z xeuugli xs83m0k xjl7jj x1xmf6yo x1emribx x1e56ztr x1i64zmx x19h7ccj xu9j1y6 x7ep2pv']/div)[last()]/div//div[@class='x1yztbdb x1n2onr6 xh8yej3 x1ja2u2z'])//div[@data-ad-rendering-role='profile_name']/../../../div[2]//a"
-    content_on_hover_xpath = "(//div[@class='x78zum5 xdt5ytf x1n2onr6 xat3117 xxzkxad']/div)[2]/div"
-    lvl1_comment_xpath = "//div[@class='x1n2onr6 x1ye3gou x1iorvi4 x78zum5 x1q0g3np x1a2a7pz']"
+    posts_xpath = selector("feed.posts")
+    anchor_xpath = selector("feed.post_anchor")
+    content_on_hover_xpath = selector("feed.hover_content")
+    lvl1_comment_xpath = selector("comments.lvl1")
     emoji_src_map = {
         "An-HX414PnqCVzyEq9OFFdayyrdj8c3jnyPbPcierija6hpzsUvw-1VPQ260B2M9EbxgmP7pYlNQSjYAXF782_vnvvpDLxvJQD74bwdWEJ0DhcErkDga6gazZZUYm_Q.png": "like",
         "An8VnwvdkGMXIQcr4C62IqyP-g1O5--yQu9PnL-k4yvIbj8yTSE32ea4ORp0OwFNGEWJbb86MHBaLY-SMvUKdUYJnNFcexEoUGoVzcVd50SaAIzBE-K5dxR8Y-MJn5E.png": "love",
@@ -63,11 +70,11 @@ class Crawler(BaseCrawler):
             elif self.criterion == "post_time":
                 self.progress = datetime.now()
 
-        def update_progress(self, driver: Chrome):
+        def update_progress(self, driver: Chrome, n_loaded: int | None = None):
             if self.criterion == "elapsed_minutes":
                 self.progress = (datetime.now() - self.start).total_seconds() / 60
             elif self.criterion == "n_posts":
-                self.progress = len(driver.find_elements(By.XPATH, Crawler.posts_xpath))
+                self.progress = n_loaded if n_loaded is not None else len(driver.find_elements(By.XPATH, Crawler.posts_xpath))
             elif self.criterion == "post_time":
                 datetime_div = driver.find_element(
                     By.XPATH, Crawler.content_on_hover_xpath
@@ -84,6 +91,14 @@ class Crawler(BaseCrawler):
                 raw_datetime = soup.text
                 self.progress = parse_post_date(raw_datetime, lang=self.language)
 
+        def update_from_post(self, post: dict[str, Any]):
+            if self.criterion == "elapsed_minutes":
+                self.progress = (datetime.now() - self.start).total_seconds() / 60
+            elif self.criterion == "n_posts":
+                self.progress += 1
+            elif self.criterion == "post_time" and post["post_datetime"] is not None:
+                self.progress = post["post_datetime"]
+
         def condition_met(self):
             if self.criterion == "elapsed_minutes":
                 return self.progress >= self.threshold
@@ -103,10 +118,14 @@ class Crawler(BaseCrawler):
         max_ram_percentage: float = 0.95,
         language: Literal["vi", "en"] = "vi",
         theme: Literal["light", "dark"] = "light",
+        parse_mode: Literal["driver", "snapshot", "batch", "network"] = "driver",
+        incremental: bool = False,
+        incremental_stop_after: int = 10,
+        comment_fetch: Literal["browser", "http"] = "browser",
         *args,
         **kwargs,
     ):
-        super().__init__(*args, **kwargs, name="Page Crawler")
+        super().__init__(*args, **kwargs, max_ram_percentage=max_ram_percentage, capture_network=parse_mode == "network", name="Page Crawler")
 
         self.post_collect_criteria = Crawler.PostCollectCriterion(
             criterion=post_collect_criterion,
@@ -118,9 +137,33 @@ class Crawler(BaseCrawler):
         self.pagename = None
         self.language = language
         self.theme = theme
+        assert parse_mode in ["driver", "snapshot", "batch", "network"]
+        self.parse_mode = parse_mode
+        if parse_mode == "batch" and post_collect_criterion == "post_time":
+            self.logger.warning("Post datetime is not extracted in batch mode, \"post_time\" criterion will never be met")
         self.set_pipeline_path_format(page_id=page_id)
         # self.queue_file_path = Path(self.crawler_dir) / self.page_id / "queue_posts.txt"
         self.remaining_urls_path = Path(f"{self.crawler_dir}/{self.page_id}/remaining_posts.json")
+        self.feed_cursor = FeedCursor(f"{self.crawler_dir}/{self.page_id}/feed_cursor.jsonl")
+        # Posts are persisted as processed once their records are saved
+        self.feed_cursor.save_through(self.data_pipeline.n_saved)
+        self.data_pipeline.on_flush(self.feed_cursor.save_through)
+        # Posts handed over to phase workers collecting comments
+        self.work_queue = WorkQueue(f"{self.crawler_dir}/{self.page_id}/comment_queue.jsonl")
+        # Page through comments over HTTP with the browser's cookies, falling back to the browser
+        assert comment_fetch in ["browser", "http"]
+        self.comment_fetch = comment_fetch
+        self.comment_client = None
+        self.comment_columns_warned = False
+        if incremental:
+            self.seen_posts = SeenPosts(
+                f"{self.crawler_dir}/{self.page_id}/seen_posts.jsonl",
+                stop_after=incremental_stop_after,
+                csv_path=f"{self.crawler_dir}/{self.page_id}/data.csv",
+            )
+            # Posts are persisted as stored once their records are saved
+            self.seen_posts.save_through(self.data_pipeline.n_saved)
+            self.data_pipeline.on_flush(self.seen_posts.save_through)
 
 
     def on_parse_error(self):
@@ -132,106 +175,41 @@ class Crawler(BaseCrawler):
         return self.chrome.find_elements(By.XPATH, f"({Crawler.posts_xpath})[position() >= {start} and position() <= {stop}]")
 
     def scroll_to_load_more(self):
-        self.chrome.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        self.wait.until(
-            more_items_loaded(
-                posts_locator=(By.XPATH, Crawler.posts_xpath),
-                current_count=len(self.get_loaded_posts()),
-            ),
-            message="No more post loaded"
-        )
-        self.post_collect_criteria.update_progress(self.chrome)
+        _, n_loaded = self.wait_nodes_added(Crawler.posts_xpath, scroll=True, message="No more post loaded")
+        self.post_collect_criteria.update_progress(self.chrome, n_loaded)
+
+    def prepare_feed(self):
+        """Remove the header and side panels hiding the feed"""
+        self.remove(selectors()["feed.obstructions"])
+
+    def on_recycle(self):
+        self.prepare_feed()
+        # Processed posts are loaded again, and fast-forwarded past
+        self.save_records()
+        self.feed_cursor.load()
 
     def parse(self):
         self.pagename = self.chrome.find_element(By.XPATH, "//h1").text.strip()
-        self.remove([
-            "(//div[@class='x9f619 x1n2onr6 x1ja2u2z x78zum5 xdt5ytf xeuugli x1r8uery x1iyjqo2 xs83m0k x1swvt13 x1pi30zi xqdwrps x16i7wwg x1y5dvz6'])[3]",
-            "//div[@role='banner']",
-            "//div[@class='x9f619 x1ja2u2z x1xzczws x7wzq59']"
-        ])
+        self.prepare_feed()
         if os.path.exists(self.remaining_urls_path):
             self.logger.info("Found post URLs previously saved")
             with open(self.remaining_urls_path) as f:
                 post_urls = json.load(f)
         else:
-            post_urls = {}
-            cover_photo_text = {"vi": re.compile(r"đã cập nhật ảnh bìa của họ\.$"), "en": re.compile(r" updated their cover photo\.$")}
-            n_scraped_posts = 0
-            current_post_idx = 1
-            crashed = False
-
-            with tqdm_output(tqdm(total=round(virtual_memory().total / 1024**3, ndigits=2), desc="RAM Usage (GB)")) as bar:
-                # Scroll though page's feed
-                self.chrome.execute_script("window.scrollTo(0, document.body.scrollHeight)")
-                while (ram_usage := virtual_memory()).percent / 100 < self.max_ram_percentage \
-                        and not (met := self.post_collect_criteria.condition_met()) \
-                        and not crashed:
-                    bar.n = round(ram_usage.percent * ram_usage.total / 100 / 1024**3, ndigits=2)
-                    bar.refresh()
-                    
-                    self.wait.until(
-                        more_items_loaded(
-                            posts_locator=(By.XPATH, Crawler.posts_xpath),
-                            current_count=len(self.get_loaded_posts()),
-                        ),
-                        message="No more post loaded"
-                    )
-                    self.post_collect_criteria.update_progress(self.chrome)
-
-                    post_div = self.get_loaded_posts(start=1, stop=1)[0]
-                    post = None
-                    scraped = False
-                    self.scroll_into_view(post_div)
-
-                    try:
-                        # Check if reel
-                        if to_bs4(post_div).find("a")["href"].startswith("/reel"):
-                            self.logger.info(f"Found {ordinal(current_post_idx)} post as reel, skipping...")
-
-                        # Check if update avatar
-                        elif to_bs4(post_div).find("img", {"data-imgperflogname": "feedCoverPhoto"}):
-                            self.logger.info(f"Found {ordinal(current_post_idx)} post as avatar, skipping...")
-
-                        # Check if update cover photo
-                        elif to_bs4(post_div).find("h2").find(string=cover_photo_text[self.language]):
-                            self.logger.info(f"Found {ordinal(current_post_idx)} post as cover photo, skipping...")
-                            
-                        # Normal post
-                        else:
-                            post = self.parse_post(post_div)
-                            scraped = True
-                    except Exception as e:
-                        exc_type, value, tb = sys.exc_info()
-                        self.logger.warning(f"Skipping {ordinal(current_post_idx)} post: {red(exc_type.__name__)}: {value}\n{traceback.format_exc()}")
-
-                        if str(e).startswith("Message: tab crashed"):
-                            crashed = True
-                        continue
-                    finally:
-                        current_post_idx += 1
-                        try:
-                            # Remove post div from HTML
-                            self.remove_element(post_div.find_element(By.XPATH, "./../.."))
-                            self.clean_memory()
-                        except: 
-                            crashed = True
-                            break
-
-                    # Return result
-                    if post:
-                        yield post
-                        if post["num_comments"] != 0:
-                            post_urls[post["post_id"]] = post["post_url"]
-                    # Continue looping
-                    n_scraped_posts += scraped
-                    bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
-
-            if met:
-                self.logger.info(f"Post collect stopping criteria has met with threshold of {self.post_collect_criteria.threshold}")
-
-            self.start_driver()
-            self.on_start()
-            self.ensure_logged_in()
+            # With phase workers, comments are collected while the feed is scrolled
+            with self.phase_workers_running(self.work_queue, Crawler.collect_post_comments):
+                if self.parse_mode == "batch":
+                    post_urls = yield from self.parse_feed_batched()
+                elif self.parse_mode == "network":
+                    post_urls = yield from self.parse_feed_network()
+                else:
+                    post_urls = yield from self.parse_feed_driver()
+            self.end_feed(post_urls)
+
+            if post_urls:
+                self.start_driver()
+                self.on_start()
+                self.ensure_logged_in()
 
         yield []
         self.collect_comments_step(post_urls)
@@ -259,9 +237,112 @@ class Crawler(BaseCrawler):
         #         f"Post collect stopping criteria has met with threshold of {self.post_collect_criteria.threshold}"
         #     )
 
+    def parse_feed_driver(self):
+        """
+        Scroll through page's feed, parsing posts one by one through the driver.
+        Returns URLs of posts having comments.
+        """
+        post_urls = dict(self.feed_cursor.post_urls)
+        n_scraped_posts = 0
+        current_post_idx = 1
+        crashed = False
+        if len(self.feed_cursor):
+            self.logger.info(f"Resuming feed after {len(self.feed_cursor)} processed posts, fast-forwarding...")
+
+        feed_url = self.chrome.current_url
+        with tqdm_output(tqdm(total=round(virtual_memory().total / 1024**3, ndigits=2), desc="RAM Usage (GB)")) as bar:
+            # Scroll though page's feed, recycling the tab or browser rather than stopping when it grows too big
+            self.chrome.execute_script("window.scrollTo(0, document.body.scrollHeight)")
+            while not (met := self.post_collect_criteria.condition_met()) \
+                    and not crashed:
+                ram_usage = virtual_memory()
+                bar.n = round(ram_usage.percent * ram_usage.total / 100 / 1024**3, ndigits=2)
+                bar.refresh()
+                if self.govern_memory(feed_url) == "exhausted":
+                    break
+
+                _, n_loaded = self.wait_nodes_added(Crawler.posts_xpath, message="No more post loaded")
+                self.post_collect_criteria.update_progress(self.chrome, n_loaded)
+
+                post_div = self.get_loaded_posts(start=1, stop=1)[0]
+                post = None
+                scraped = False
+
+                # Skip posts processed before a restart, or stored by a previous crawl, without parsing them
+                try:
+                    # Taken once, so that the fingerprint is of what is classified and parsed
+                    post_tree = snapshot(post_div)
+                    fingerprint = post_fingerprint(post_tree)
+                    is_processed = self.feed_cursor.skip(fingerprint)
+                    is_stored = not is_processed and self.is_stored_post(fingerprint=fingerprint)
+                    if is_processed or is_stored:
+                        current_post_idx += 1
+                        self.retire_post(post_div)
+                except WebDriverException:
+                    crashed = True
+                    break
+                if is_stored and self.update_seen_posts(None, known=True):
+                    break
+                if is_processed or is_stored:
+                    continue
+                self.scroll_into_view(post_div)
+
+                try:
+                    post_type = classify_post(post_tree, self.language)
+                    # Check if reel
+                    if post_type == "reel":
+                        self.logger.info(f"Found {ordinal(current_post_idx)} post as reel, skipping...")
+
+                    # Check if update avatar
+                    elif post_type == "avatar":
+                        self.logger.info(f"Found {ordinal(current_post_idx)} post as avatar, skipping...")
+
+                    # Check if update cover photo
+                    elif post_type == "cover_photo":
+                        self.logger.info(f"Found {ordinal(current_post_idx)} post as cover photo, skipping...")
+                        
+                    # Normal post
+                    else:
+                        post = self.parse_post(post_div)
+                        scraped = True
+                    self.record_element("post", post_div, post_type=post_type)
+                except Exception as e:
+                    exc_type, value, tb = sys.exc_info()
+                    self.logger.warning(f"Skipping {ordinal(current_post_idx)} post: {red(exc_type.__name__)}: {value}\n{traceback.format_exc()}")
+
+                    if str(e).startswith("Message: tab crashed"):
+                        crashed = True
+                    continue
+                finally:
+                    current_post_idx += 1
+                    try:
+                        # Remove post div from HTML
+                        self.retire_post(post_div)
+                    except: 
+                        crashed = True
+                        break
+
+                # Return result, unless stored by a previous crawl under another fingerprint
+                is_stored = post is not None and self.is_stored_post(post_id=post["post_id"])
+                if post and not is_stored:
+                    yield post
+                    self.queue_post(post, post_urls)
+                self.advance_feed_cursor(fingerprint, post, post_urls)
+                if post and self.update_seen_posts(post, fingerprint, known=is_stored):
+                    break
+                # Continue looping
+                n_scraped_posts += scraped
+                bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
+
+        if met:
+            self.logger.info(f"Post collect stopping criteria has met with threshold of {self.post_collect_criteria.threshold}")
+        if crashed:
+            # Keep the feed cursor, so that the next run fast-forwards to where the tab crashed
+            raise WebDriverException("Tab crashed while scrolling the feed")
+        return post_urls
+
     def scroll_step(self):
         post_urls = {}
-        cover_photo_text = {"vi": re.compile(r"đã cập nhật ảnh bìa của họ\.$"), "en": re.compile(r" updated their cover photo\.$")}
         n_scraped_posts = 0
         current_post_idx = 1
         crashed = False
@@ -275,14 +356,8 @@ class Crawler(BaseCrawler):
                 bar.n = round(ram_usage.percent * ram_usage.total / 100 / 1024**3, ndigits=2)
                 bar.refresh()
                 
-                self.wait.until(
-                    more_items_loaded(
-                        posts_locator=(By.XPATH, Crawler.posts_xpath),
-                        current_count=len(self.get_loaded_posts()),
-                    ),
-                    message="No more post loaded"
-                )
-                self.post_collect_criteria.update_progress(self.chrome)
+                _, n_loaded = self.wait_nodes_added(Crawler.posts_xpath, message="No more post loaded")
+                self.post_collect_criteria.update_progress(self.chrome, n_loaded)
 
                 for post_div in self.get_loaded_posts(start=1, stop=1):
                     post = None
@@ -290,22 +365,24 @@ class Crawler(BaseCrawler):
                     self.scroll_into_view(post_div)
 
                     try:
+                        post_type = classify_post(snapshot(post_div), self.language)
                         # Check if reel
-                        if to_bs4(post_div).find("a")["href"].startswith("/reel"):
+                        if post_type == "reel":
                             self.logger.info(f"Found {ordinal(current_post_idx)} post as reel, skipping...")
 
                         # Check if update avatar
-                        elif to_bs4(post_div).find("img", {"data-imgperflogname": "feedCoverPhoto"}):
+                        elif post_type == "avatar":
                             self.logger.info(f"Found {ordinal(current_post_idx)} post as avatar, skipping...")
 
                         # Check if update cover photo
-                        elif to_bs4(post_div).find("h2").find(string=cover_photo_text[self.language]):
+                        elif post_type == "cover_photo":
                             self.logger.info(f"Found {ordinal(current_post_idx)} post as cover photo, skipping...")
                             
                         # Normal post
                         else:
                             post = self.parse_post(post_div)
                             scraped = True
+                        self.record_element("post", post_div, post_type=post_type)
                     except Exception as e:
                         exc_type, value, tb = sys.exc_info()
                         self.logger.warning(f"Skipping {ordinal(current_post_idx)} post: {red(exc_type.__name__)}: {value}\n{traceback.format_exc()}")
@@ -315,8 +392,7 @@ class Crawler(BaseCrawler):
 
                     current_post_idx += 1
                     try:
-                        self.remove_element(post_div.find_element(By.XPATH, "./../.."))
-                        self.clean_memory()
+                        self.retire_post(post_div)
                     except: 
                         crashed = True
                         break
@@ -324,8 +400,7 @@ class Crawler(BaseCrawler):
                     # Return result
                     if post:
                         yield post
-                        if post["num_comments"] != 0:
-                            post_urls[post["post_id"]] = post["post_url"]
+                        self.queue_post(post, post_urls)
                     # Continue looping
                     n_scraped_posts += scraped
                     bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
@@ -333,37 +408,168 @@ class Crawler(BaseCrawler):
         if met:
             self.logger.info(f"Post collect stopping criteria has met with threshold of {self.post_collect_criteria.threshold}")
 
+    def advance_feed_cursor(self, fingerprint: str | None, post: dict[str, Any] | None, post_urls: dict[str, str]):
+        post_id = post["post_id"] if post else None
+        self.feed_cursor.advance(
+            fingerprint,
+            post_id=post_id,
+            remaining=post_urls.get(post_id),
+            after=self.data_pipeline.n_received,
+        )
+
+    def queue_post(self, post: dict[str, Any], post_urls: dict[str, str]):
+        """Remember a post having comments for the comment step, or queue it for phase workers"""
+        if post["num_comments"] != 0:
+            post_urls[post["post_id"]] = post["post_url"]
+            if self.phase_workers:
+                self.work_queue.put(post["post_id"], post["post_url"])
+
+    def end_feed(self, post_urls: dict[str, str]):
+        """
+        Hand post URLs over to the comment step, replacing the feed cursor.
+        Phase workers have already been through them, only those left in
+        their queue are handed over.
+        """
+        self.save_records()
+        if self.phase_workers:
+            post_urls.clear()
+            post_urls.update(self.work_queue.pending)
+        os.makedirs(self.remaining_urls_path.parent, exist_ok=True)
+        with open(self.remaining_urls_path, "w+") as f:
+            json.dump(post_urls, f, indent=2)
+        if self.phase_workers:
+            self.work_queue.clear()
+        self.feed_cursor.clear()
+
+    def extract_loaded_posts(self) -> list[dict[str, Any]]:
+        entries = self.run_script(
+            "extract_posts",
+            Crawler.posts_xpath,
+            extractor_texts(self.language),
+            True,
+            selectors().xpaths,
+            asynchronous=True,
+        )
+        return json.loads(entries)
+
+    def parse_feed_batched(self):
+        """
+        Scroll through page's feed, extracting every loaded post with a single
+        in-page script call per scroll instead of driver calls per post field.
+        Returns URLs of posts having comments.
+        """
+        post_urls = dict(self.feed_cursor.post_urls)
+        n_scraped_posts = 0
+        current_post_idx = 1
+        met = False
+        caught_up = False
+
+        feed_url = self.chrome.current_url
+        with tqdm_output(tqdm(total=round(virtual_memory().total / 1024**3, ndigits=2), desc="RAM Usage (GB)")) as bar:
+            while not (met := self.post_collect_criteria.condition_met()) \
+                    and not caught_up:
+                ram_usage = virtual_memory()
+                bar.n = round(ram_usage.percent * ram_usage.total / 100 / 1024**3, ndigits=2)
+                bar.refresh()
+                # Posts extracted before recycling are extracted again, but not saved twice
+                if self.govern_memory(feed_url) == "exhausted":
+                    break
+
+                try:
+                    entries = self.extract_loaded_posts()
+                except WebDriverException:
+                    exc_type, value, tb = sys.exc_info()
+                    self.logger.warning(f"Stop scrolling: {red(exc_type.__name__)}: {value}")
+                    break
+
+                # Load more posts once every rendered one is extracted, waiting for one added after scrolling
+                if not entries:
+                    try:
+                        self.wait_nodes_added(Crawler.posts_xpath, scroll=True, message="No more post loaded")
+                    except TimeoutException:
+                        self.logger.info("No more post loaded")
+                        break
+                    continue
+
+                for entry in entries:
+                    post = None
+                    try:
+                        if "error" in entry:
+                            raise ValueError(entry["error"])
+                        if entry["post_type"] == "post":
+                            post = parse_post_entry(entry, self.language)
+                        else:
+                            self.logger.info(f"Found {ordinal(current_post_idx)} post as {entry['post_type'].replace('_', ' ')}, skipping...")
+                    except Exception:
+                        exc_type, value, tb = sys.exc_info()
+                        self.logger.warning(f"Skipping {ordinal(current_post_idx)} post: {red(exc_type.__name__)}: {value}\n{traceback.format_exc()}")
+                    current_post_idx += 1
+
+                    # Posts output before a restart are scrolled past again, but not saved twice
+                    is_stored = post is not None and self.is_stored_post(post_id=post["post_id"])
+                    if post and not is_stored and not self.feed_cursor.seen(post["post_id"]):
+                        yield post
+                        self.queue_post(post, post_urls)
+                        self.advance_feed_cursor(None, post, post_urls)
+                    if post:
+                        self.post_collect_criteria.update_from_post(post)
+                        n_scraped_posts += 1
+                    if post and self.update_seen_posts(post, known=is_stored):
+                        caught_up = True
+                        break
+                bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
+                self.clean_memory()
+
+        if met:
+            self.logger.info(f"Post collect stopping criteria has met with threshold of {self.post_collect_criteria.threshold}")
+        return post_urls
+
+    def parse_feed_network(self):
+        """
+        Scroll through page's feed, parsing posts from captured GraphQL responses
+        rather than from the DOM. Returns URLs of posts having comments.
+        """
+        post_urls = dict(self.feed_cursor.post_urls)
+        n_scraped_posts = 0
+        met = False
+
+        with tqdm_output(tqdm(total=round(virtual_memory().total / 1024**3, ndigits=2), desc="RAM Usage (GB)")) as bar:
+            try:
+                for story in self.scroll_network_stories():
+                    ram_usage = virtual_memory()
+                    if ram_usage.percent / 100 >= self.max_ram_percentage \
+                            or (met := self.post_collect_criteria.condition_met()):
+                        break
+                    bar.n = round(ram_usage.percent * ram_usage.total / 100 / 1024**3, ndigits=2)
+                    bar.refresh()
+
+                    post = parse_story_record(story)
+                    # Posts output before a restart are scrolled past again, but not saved twice
+                    is_stored = self.is_stored_post(post_id=post["post_id"])
+                    if not is_stored and not self.feed_cursor.seen(post["post_id"]):
+                        yield post
+                        self.queue_post(post, post_urls)
+                        self.advance_feed_cursor(None, post, post_urls)
+                    self.post_collect_criteria.update_from_post(post)
+                    if self.update_seen_posts(post, known=is_stored):
+                        break
+                    n_scraped_posts += 1
+                    bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
+            except WebDriverException:
+                exc_type, value, tb = sys.exc_info()
+                self.logger.warning(f"Stop scrolling: {red(exc_type.__name__)}: {value}")
+
+        if met:
+            self.logger.info(f"Post collect stopping criteria has met with threshold of {self.post_collect_criteria.threshold}")
+        return post_urls
+
     def collect_comments_step(self, post_urls: dict[str, str]):
         self.logger.info(f"Begin to collect comments from {len(post_urls)} posts.")
         with tqdm_output(tqdm(total=len(post_urls), desc="Collecting Comments", unit="post")) as bar:
-            comment_csv_path = f"{self.crawler_dir}/{self.page_id}/comments.csv"
             try:
                 while post_urls:
                     id, url = tuple(post_urls.items())[0]
-                    self.chrome.get(url)
-                    self.wait_DOM()
-                    self.remove([
-                        "//div[@role='banner']",
-                        "//div[@class='x7wzq59 xxzkxad xh8yej3 xzkaem6']",
-                    ])
-                    main_div = self.chrome.find_element(By.XPATH, "//div[@role='main']")
-                    if (
-                        len(to_etree(main_div).xpath("//h2")) > 0
-                        and "".join(to_etree(main_div).xpath("//h2//text()")).strip()
-                        == "Bạn hiện không xem được nội dung này"
-                    ):
-                        self.logger.warning(f"Post is no longer available at {url}")
-    
-                    comments = self.get_comments()
-                    cmt_data = pd.DataFrame(comments)
-                    cmt_data["post_id"] = id
-                    cmt_data.to_csv(
-                        comment_csv_path,
-                        index=False,
-                        mode="a",
-                        header=not os.path.exists(comment_csv_path),
-                    )
-
+                    self.collect_post_comments(id, url)
                     post_urls.pop(id)
                     bar.update()
                     self.sleep()
@@ -376,6 +582,36 @@ class Crawler(BaseCrawler):
                 # exc_type, value, tb = sys.exc_info()
                 # self.logger.error(f"Saving remaining post URLs at {self.remaining_urls_path} due to error {red(exc_type.__name__): {value}\n{traceback.format_exc()}}")
 
+    def collect_post_comments(self, id: str, url: str):
+        """Collect comments of a post, appending them to the page's comments CSV"""
+        comment_csv_path = f"{self.crawler_dir}/{self.page_id}/comments.csv"
+        comments = self.get_comments_http(url) if self.comment_fetch == "http" else None
+        page_source = None
+        if comments is None:
+            self.chrome.get(url)
+            self.wait_DOM()
+            self.remove(selectors()["post_page.obstructions"])
+            main_div = self.chrome.find_element(By.XPATH, "//div[@role='main']")
+            if (
+                len(to_etree(main_div).xpath("//h2")) > 0
+                and "".join(to_etree(main_div).xpath("//h2//text()")).strip()
+                == "Bạn hiện không xem được nội dung này"
+            ):
+                self.logger.warning(f"Post is no longer available at {url}")
+
+            comments = self.get_comments()
+            page_source = self.chrome.page_source if self.corpus is not None else None
+        cmt_data = pd.DataFrame(comments)
+        cmt_data["post_id"] = id
+        # Phase workers append to the same files
+        with self.phase_lock:
+            if page_source is not None:
+                self.record("comments", page_source, post_id=id)
+            left_out = append_csv(cmt_data, comment_csv_path)
+        if left_out and not self.comment_columns_warned:
+            self.comment_columns_warned = True
+            self.logger.warning(f"Leaving {', '.join(left_out)} out of {comment_csv_path}, written by an older version. Move it away to keep them")
+
     def on_parse_complete(self, data):
         if data:
             data["pagename"] = self.pagename
@@ -388,28 +624,32 @@ class Crawler(BaseCrawler):
                 self.remove_element(to_be_removed)
 
     def parse_post(self, post_div: WebElement):
+        if self.parse_mode == "snapshot":
+            return self.parse_post_snapshot(post_div)
+
         hover_content_div = self.chrome.find_element(By.XPATH, Crawler.content_on_hover_xpath)
 
+        sel = selectors()
         post_content_divs = post_div.find_element(
-            By.XPATH, "./descendant::div[@class='html-div xdj266r x11i5rnm xat24cr x1mh8g0r xexx8yu x4uap5 x18d9i69 xkhd6sd']"
-        ).find_elements(By.XPATH, f"./div/div/div")
+            By.XPATH, sel["post.content_root"]
+        ).find_elements(By.XPATH, sel["post.content_divs"])
 
         # Get profile div
-        profile_div = post_div.find_element(By.XPATH, "./descendant::div[@data-ad-rendering-role='profile_name']")
+        profile_div = post_div.find_element(By.XPATH, sel["post.profile"])
 
         # Get content (caption + image/video) div
         content_div = post_content_divs[2]
-        text_content_div = content_div.find_elements(By.XPATH, "./descendant::div[@data-ad-rendering-role='story_message']")
+        text_content_div = content_div.find_elements(By.XPATH, sel["post.story_message"])
         text_content_div = text_content_div[0] if text_content_div else None
 
         # Get comment, share div
-        interaction_div = post_content_divs[3].find_element(By.XPATH, "./descendant::div[@class='x1n2onr6']/div")
+        interaction_div = post_content_divs[3].find_element(By.XPATH, sel["post.interactions"])
         reaction_div = interaction_div.find_element(By.XPATH, "./div/div")
         cmt_share_div = interaction_div.find_element(By.XPATH, "(./div)[last()]")
 
         num_comments, num_shares = 0, 0
         if to_bs4(cmt_share_div).find_all("div", {"role": "button"}):
-            for btn in cmt_share_div.find_elements(By.XPATH, "./descendant::div[@role='button']"):
+            for btn in cmt_share_div.find_elements(By.XPATH, sel["post.interaction_buttons"]):
                 btn_text_match = re.search(r"^([\d,]+K?) (.+)$", btn.text)
                 count, btn_text = btn_text_match.group(1), btn_text_match.group(2)
                 comment_text = {"vi": "bình luận", "en": "comments"}
@@ -420,7 +660,7 @@ class Crawler(BaseCrawler):
                     num_shares = count
 
         # Get reaction counts
-        total_reactions = reaction_div.find_element(By.XPATH, ".//span[@class='xrbpyxo x6ikm8r x10wlt62 xlyipyv x1exxlbk']").text
+        total_reactions = reaction_div.find_element(By.XPATH, sel["post.reactions"]).text
         # self.action.click(reaction_div).pause(1).perform()
         # reaction_modal = self.chrome.find_element(By.XPATH, "//div[@role='dialog']")
         # reaction_counts = reaction_modal.find_elements(By.XPATH, "./descendant::div[@class='x1swvt13 x1pi30zi']/descendant::div[@class='x6ikm8r x10wlt62 xlshs6z']/div")
@@ -443,7 +683,7 @@ class Crawler(BaseCrawler):
             self.action.move_to_element(show_more_btn).click(show_more_btn).pause(0.1).move_to_element(post_div).perform()
 
         # Get post's datetime a element
-        post_datetime_a = profile_div.find_element(By.XPATH, "(../../../div)[2]//a")
+        post_datetime_a = profile_div.find_element(By.XPATH, sel["post.datetime_anchor"])
         self.scroll_into_view(post_datetime_a)
         WebDriverWait(self.chrome, 5).until(
             EC.presence_of_element_located((By.XPATH, f"{Crawler.content_on_hover_xpath}/descendant::div[contains(@class, '__fb-light-mode')]"))
@@ -454,7 +694,7 @@ class Crawler(BaseCrawler):
         post_datetime = parse_post_date(raw_datetime, lang=self.language)
 
         # Get post's raw URL
-        post_datetime_a = profile_div.find_element(By.XPATH, "(../../../div)[2]//a")
+        post_datetime_a = profile_div.find_element(By.XPATH, sel["post.datetime_anchor"])
         post_raw_url = post_datetime_a.get_attribute("href")
         # Get post's ID
         post_id = Path(urlparse(post_raw_url).path).name
@@ -482,13 +722,38 @@ class Crawler(BaseCrawler):
         # result.update(reactions)
         return result
 
+    def parse_post_snapshot(self, post_div: WebElement):
+        """
+        Only the interactions that change the DOM go through the driver,
+        every other field is then derived from a single outerHTML snapshot.
+        """
+        # Ensure post's text content showing full version
+        see_more_text = {"vi": "Xem thêm", "en": "See more"}
+        show_more_btns = post_div.find_elements(By.XPATH, f"{selectors()['post.story_message']}//div[@role='button' and text()='{see_more_text[self.language]}']")
+        if show_more_btns:
+            self.action.move_to_element(show_more_btns[0]).click(show_more_btns[0]).pause(0.1).move_to_element(post_div).perform()
+
+        post_datetime = self.hover_post_datetime(post_div)
+        return parse_post_tree(snapshot(post_div), self.language, post_datetime=post_datetime)
+
+    def hover_post_datetime(self, post_div: WebElement):
+        # Hovering post's datetime a element reveals the full datetime and resolves its href
+        post_datetime_a = post_div.find_element(By.XPATH, selectors()["post.post_datetime_anchor"])
+        self.scroll_into_view(post_datetime_a)
+        WebDriverWait(self.chrome, 5).until(
+            EC.presence_of_element_located((By.XPATH, f"{Crawler.content_on_hover_xpath}/descendant::div[contains(@class, '__fb-light-mode')]"))
+        )
+        hover_content_div = self.chrome.find_element(By.XPATH, Crawler.content_on_hover_xpath)
+        raw_datetime = snapshot(hover_content_div.find_element(By.XPATH, "./div[@class='__fb-light-mode'][last()]")).xpath("string()")
+        self.chrome.execute_script(f"document.querySelector('div.x78zum5.xdt5ytf.x1n2onr6.xat3117.xxzkxad>div:nth-of-type(2)>div>div.__fb-light-mode').remove()")
+        return parse_post_date(raw_datetime, lang=self.language)
+
     def get_comments(self):
-        comments = {
-            "comment_id": [],
-            "comment_text": []
-        }
-        if self.page_source_soup().find("span", {"class": "x193iq5w xeuugli x13faqbe x1vvkbs x10flsy6 x1lliihq x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x x4zkp8e x41vudc x6prxxf xvq8zen xo1l8bm x1fey0fg"}):
-            self.chrome.find_element(By.XPATH, "//span[@class='x193iq5w xeuugli x13faqbe x1vvkbs x10flsy6 x1lliihq x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x x4zkp8e x41vudc x6prxxf xvq8zen xo1l8bm x1fey0fg']").click()
+        if self.parse_mode == "network":
+            return self.get_comments_network()
+
+        if self.page_source_etree().xpath(selectors()["comments.see_all"]):
+            self.chrome.find_element(By.XPATH, selectors()["comments.see_all"]).click()
 
         self.show_all_comments()
         self.sleep(0.5)
@@ -496,25 +761,49 @@ class Crawler(BaseCrawler):
         while not self.load_all_lvl1_cmts():
             break
 
-        n_comments = len(self.chrome.find_elements(By.XPATH, Crawler.lvl1_comment_xpath))
-        for i in range(1, n_comments+1):
-            cmt_bubble = self.chrome.find_element(By.XPATH, f"({Crawler.lvl1_comment_xpath})[{i}]")
-            id = get_id_from_cmt_bubble(cmt_bubble)
-            text = get_text_from_cmt_bubble(cmt_bubble, lang=self.language)
+        # Expand truncated comments at once, then parse all of them from one snapshot
+        see_more = extractor_texts(self.language)["see_more"]
+        if self.click_all(f"{Crawler.lvl1_comment_xpath}//div[@role='button' and text()='{see_more}']"):
+            self.sleep(0.5)
+        return parse_comments_tree(self.page_source_etree())
+    
+    def get_comments_network(self):
+        """
+        Comments are still loaded by clicking through the post, but parsed from
+        the page source and captured GraphQL responses instead of the DOM.
+        """
+        self.capture.discard()
+        payloads = list(iter_html_payloads(self.chrome.page_source))
 
-            if text != "":
-                comments["comment_id"].append(id)
-                comments["comment_text"].append(text)
+        self.show_all_comments()
+        self.sleep(0.5)
+        while not self.load_all_lvl1_cmts():
+            break
+        payloads.extend(payload for body in self.capture.drain() for payload in iter_payloads(body))
+
+        return comment_columns(parse_comments(payloads))
+
+    def get_comments_http(self, url: str):
+        """Comments paged over HTTP without the browser, None if the post page does not allow it"""
+        from requests import RequestException
+        from utils.comment_client import CommentClient, CommentClientError
+        if self.comment_client is None:
+            self.comment_client = CommentClient(self.cookies)
+        try:
+            return comment_columns(self.comment_client.fetch(url))
+        except (CommentClientError, RequestException):
+            exc_type, value, tb = sys.exc_info()
+            self.logger.warning(f"Falling back to the browser for comments of {url}: {red(exc_type.__name__)}: {value}")
+            return None
 
-        return comments
-    
     def show_all_comments(self):
-        if not self.page_source_soup().find("div", {"class": "x6s0dn4 x78zum5 xdj266r x11i5rnm xat24cr x1mh8g0r xe0p6wg"}):
+        sel = selectors()
+        if not self.page_source_etree().xpath(sel["comments.order_button"]):
             return
 
-        cmt_show_mode_btn = self.chrome.find_element(By.XPATH, "//div[@class='x6s0dn4 x78zum5 xdj266r x11i5rnm xat24cr x1mh8g0r xe0p6wg']/div")
+        cmt_show_mode_btn = self.chrome.find_element(By.XPATH, sel["comments.order_button"])
         self.click(cmt_show_mode_btn)
-        show_all_btn = self.chrome.find_element(By.XPATH, "(//div[@role='menuitem'])[last()]")
+        show_all_btn = self.chrome.find_element(By.XPATH, sel["comments.order_all"])
         self.click(show_all_btn)
     
     def load_all_lvl1_cmts(self):
@@ -526,19 +815,14 @@ class Crawler(BaseCrawler):
         comments_section = last_comment.find_element(By.XPATH, "./../../../..")
         self.chrome.execute_script("arguments[0].scrollIntoView(true);", last_comment)
         # self.scroll_into_view(last_comment)
-        if to_bs4(comments_section).find("div", {"class": "x1i10hfl xjbqb8w xjqpnuy xa49m3k xqeqjp1 x2hbi6w x13fuv20 xu3j5b3 x1q0q8m5 x26u7qi x972fbf xcfux6l x1qhh985 xm0m39n x9f619 x1ypdohk xdl72j9 xe8uvvx xdj266r x11i5rnm xat24cr x1mh8g0r x2lwn1j xeuugli xexx8yu x18d9i69 xkhd6sd x1n2onr6 x16tdsg8 x1hl2dhg xggy1nq x1ja2u2z x1t137rt x1o1ewxj x3x9cwd x1e5q0jg x13rtm0m x3nfvp2 x87ps6o x1lku1pv x1a2a7pz x6s0dn4 xi81zsa x1q0g3np x1iyjqo2 xs83m0k xsyo7zv"}):
-            load_more_btn = comments_section.find_element(By.XPATH, ".//div[@class='x1i10hfl xjbqb8w xjqpnuy xa49m3k xqeqjp1 x2hbi6w x13fuv20 xu3j5b3 x1q0q8m5 x26u7qi x972fbf xcfux6l x1qhh985 xm0m39n x9f619 x1ypdohk xdl72j9 xe8uvvx xdj266r x11i5rnm xat24cr x1mh8g0r x2lwn1j xeuugli xexx8yu x18d9i69 xkhd6sd x1n2onr6 x16tdsg8 x1hl2dhg xggy1nq x1ja2u2z x1t137rt x1o1ewxj x3x9cwd x1e5q0jg x13rtm0m x3nfvp2 x87ps6o x1lku1pv x1a2a7pz x6s0dn4 xi81zsa x1q0g3np x1iyjqo2 xs83m0k xsyo7zv']")
+        load_more_xpath = selectors()["comments.load_more"]
+        if to_etree(comments_section).xpath(load_more_xpath):
+            load_more_btn = comments_section.find_element(By.XPATH, load_more_xpath)
             self.chrome.execute_script("arguments[0].scrollIntoView(true);", load_more_btn)
             load_more_btn.click()
 
         try:
-            WebDriverWait(self.chrome, 2).until(
-                more_items_loaded(
-                    posts_locator=(By.XPATH, Crawler.lvl1_comment_xpath),
-                    current_count=current_n_cmts,
-                ),
-                message="No more comment loaded"
-            )
+            self.wait_nodes_added(Crawler.lvl1_comment_xpath, min_count=current_n_cmts + 1, timeout=2, message="No more comment loaded")
             return False
         except:
             return True
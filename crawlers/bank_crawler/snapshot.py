@@ -0,0 +1,173 @@
+"""
+Browserless parsing of bank posts, either from a single outerHTML snapshot,
+from the JSON entries returned by the `extract_posts` in-page script, or
+from GraphQL stories.
+Nothing here touches the driver.
+"""
+import re
+from lxml import etree
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from datetime import datetime
+from typing import Any, Iterable, Literal
+
+from utils.parsing import parse_text_from_html
+from utils.utils import sha256, inner_html, element_text
+from utils.selectors import selectors
+from ..page_crawler.snapshot import parse_caption, extractor_texts as page_extractor_texts
+
+comment_text = {"vi": "bình luận", "en": "comments"}
+share_text = {"vi": "lượt chia sẻ", "en": "shares"}
+# Same fields as `utils.graphql.parse_comment`, so that both parse modes write the same CSV
+COMMENT_COLUMNS = ["comment_id", "comment_text", "author_id", "author_name"]
+
+
+def parse_interaction_texts(texts: list[str], language: Literal["vi", "en"] = "vi"):
+    num_comments, num_shares = 0, 0
+    for text in texts:
+        btn_text_match = re.search(r"^([\d,]+K?) (.+)$", text)
+        count, btn_text = btn_text_match.group(1), btn_text_match.group(2)
+        if btn_text == comment_text[language]:
+            num_comments = count
+        elif btn_text == share_text[language]:
+            num_shares = count
+    return num_comments, num_shares
+
+
+def parse_post_tree(
+    post_tree: etree.Element,
+    language: Literal["vi", "en"] = "vi",
+    post_datetime: datetime | None = None,
+):
+    sel = selectors()
+    post_content_divs = sel.xpath("post.content_divs")(sel.xpath("post.content_root")(post_tree)[0])
+
+    # Get profile div
+    profile_div = sel.xpath("post.profile")(post_tree)[0]
+
+    # Get content (caption + image/video) div
+    content_div = post_content_divs[2]
+    text_content_div = sel.xpath("post.story_message")(content_div)
+    text_content_div = text_content_div[0] if text_content_div else None
+
+    # Get comment, share div
+    interaction_div = sel.xpath("post.interactions")(post_content_divs[3])[0]
+    reaction_div = interaction_div.xpath("./div/div")[0]
+    cmt_share_div = interaction_div.xpath("(./div)[last()]")[0]
+
+    num_comments, num_shares = parse_interaction_texts(
+        [element_text(btn) for btn in sel.xpath("post.interaction_buttons")(cmt_share_div)],
+        language,
+    )
+
+    # Get reaction counts
+    total_reactions = element_text(
+        sel.xpath("post.reactions")(reaction_div)[0]
+    )
+
+    # Get post's ID from the datetime anchor
+    post_raw_url = sel.xpath("post.datetime_anchor")(profile_div)[0].get("href", "")
+    post_id = Path(urlparse(post_raw_url).path).name
+
+    # Get post's caption
+    caption = parse_caption(inner_html(text_content_div)) if text_content_div is not None else ""
+
+    return {
+        "post_id": sha256(post_id),
+        "post_url": f"https://www.facebook.com/{post_id}",
+        "post_datetime": post_datetime,
+        "crawl_time": datetime.now(),
+        "caption": caption,
+        "num_comments": num_comments,
+        "num_shares": num_shares,
+        "num_reactions": total_reactions,
+    }
+
+
+def parse_author_id(href: str) -> str | None:
+    """
+    Numeric ID of a profile link, as `utils.graphql.parse_comment` gives.
+    Links by username do not tell it
+    """
+    url = urlparse(href)
+    path = url.path.rstrip("/")
+    if path.endswith("profile.php"):
+        author_id = parse_qs(url.query).get("id", [None])[0]
+    else:
+        # e.g. /people/<name>/<ID>
+        author_id = path.rsplit("/", 1)[-1]
+    return author_id if author_id and author_id.isdigit() else None
+
+
+def parse_comment_bubble(bubble: etree.Element):
+    sel = selectors()
+    link_a = sel.xpath("comments.bubble_link")(bubble)[0]
+    comment_id = re.search(r"comment_id=(\d+)", link_a.get("href", "")).group(1)
+    text_divs = sel.xpath("comments.bubble_text")(bubble)
+    text = parse_text_from_html(inner_html(text_divs[0])) if text_divs else ""
+    author_as = sel.xpath("comments.author")(bubble)
+    return {
+        "comment_id": comment_id,
+        "comment_text": text,
+        "author_id": parse_author_id(author_as[0].get("href", "")) if author_as else None,
+        "author_name": element_text(author_as[0]) if author_as else None,
+    }
+
+
+def parse_comments_tree(page_tree: etree.Element):
+    """Level 1 comments loaded in a post page, in the column layout returned by `Crawler.get_comments`"""
+    comments = {column: [] for column in COMMENT_COLUMNS}
+    for bubble in selectors().xpath("comments.lvl1")(page_tree):
+        comment = parse_comment_bubble(bubble)
+        if comment["comment_text"] != "":
+            for column in COMMENT_COLUMNS:
+                comments[column].append(comment[column])
+    return comments
+
+
+def comment_columns(comments: Iterable[dict[str, Any]]):
+    """Level 1 comments parsed by `utils.graphql.parse_comments`, in the column layout returned by `Crawler.get_comments`"""
+    columns = {column: [] for column in COMMENT_COLUMNS}
+    for comment in comments:
+        if comment["depth"] == 0 and comment["comment_text"] != "":
+            for column in COMMENT_COLUMNS:
+                columns[column].append(comment[column])
+    return columns
+
+
+def extractor_texts(language: Literal["vi", "en"] = "vi"):
+    # Event highlights are parsed as normal posts in bank pages
+    return {**page_extractor_texts(language), "event": ""}
+
+
+def parse_post_entry(entry: dict, language: Literal["vi", "en"] = "vi"):
+    """`post_datetime` is only shown in a hover tooltip, so it is not available here"""
+    post_id = Path(urlparse(entry["url"]).path).name
+    num_comments, num_shares = parse_interaction_texts(entry["interaction_texts"], language)
+    return {
+        "post_id": sha256(post_id),
+        "post_url": f"https://www.facebook.com/{post_id}",
+        "post_datetime": None,
+        "crawl_time": datetime.now(),
+        "caption": parse_caption(entry["caption_html"]),
+        "num_comments": num_comments,
+        "num_shares": num_shares,
+        "num_reactions": entry["num_reactions"],
+    }
+
+
+def parse_story_record(story: dict):
+    """
+    Record from a story parsed by `utils.graphql.parse_story`. Note that the
+    ID hashed here is the numeric post ID, not the one found in DOM links.
+    """
+    return {
+        "post_id": sha256(story["post_id"]),
+        "post_url": f"https://www.facebook.com/{story['post_id']}",
+        "post_datetime": story["creation_time"],
+        "crawl_time": datetime.now(),
+        "caption": story["caption"],
+        "num_comments": story["num_comments"],
+        "num_shares": story["num_shares"],
+        "num_reactions": story["num_reactions"],
+    }
@@ -1,38 +1,48 @@
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.remote.remote_connection import LOGGER
 from selenium.webdriver.remote.webelement import WebElement
-from selenium.common.exceptions import NoSuchWindowException, WebDriverException
+from selenium.common.exceptions import NoSuchWindowException, WebDriverException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver import ActionChains
 
-from utils import Logger, Progress, LinkExtractor, Cookies
+from utils import Logger, LinkExtractor, Cookies, Pacer, MemoryGovernor, WorkQueue, Progress, open_progress
 from utils.colors import *
-from utils.utils import login, is_logged_in, ordinal, to_bs4, to_etree
-from EC import more_items_loaded
-from pipeline import Pipeline
+from utils.utils import login, is_logged_in, hit_wall, ordinal, to_bs4, to_etree
+from utils.graphql import iter_payloads, iter_html_payloads, parse_stories
+from utils.corpus import CorpusWriter, CorpusKind
+from utils.seen_posts import SeenPosts
+from pipeline import Pipeline, BackgroundPipeline
+from .scripts import load_script
+from .network_capture import NetworkCapture
+from .driver_manager import DriverManager
+from .request_blocker import RequestBlocker, BlockProfile
 
 import json
 import os
+import random
 import sys
 import time
 import logging
-from copy import deepcopy
+import threading
+from copy import copy, deepcopy
 from datetime import datetime
 from bs4 import BeautifulSoup
 from lxml import etree
 from os.path import join
 from urllib.parse import urlparse
 from traceback import format_exc
-from scipy.stats import weibull_min
-from contextlib import contextmanager
-from typing import Any, Iterable, Literal
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterable, Literal
 
 LOGGER.setLevel(logging.CRITICAL)
 
 
+class WallError(Exception):
+    """Facebook redirected to a login or checkpoint page"""
+
+
 class BaseCrawler:
     """
     Base class for crawlers
@@ -41,6 +51,9 @@ class BaseCrawler:
     CRITICAL_EXCEPTIONS = [
         KeyboardInterrupt,
         NotImplementedError,
+    ]
+    # Browser crashed or closed, retried in a replacement browser
+    BROWSER_EXCEPTIONS = [
         NoSuchWindowException,
         WebDriverException,
     ]
@@ -51,16 +64,34 @@ class BaseCrawler:
         navigate_link_extractor: LinkExtractor,
         parse_link_extractor: LinkExtractor,
         crawler_dir: str,
-        data_pipeline: Pipeline,
+        data_pipeline: Pipeline | BackgroundPipeline,
         user: str,
         secrets_file: str,
         cookies_save_dir: str,
         error_screenshot_dir: str | None = None,
         headless: bool = True,
         sleep_weibull_lambda: float = 10.0,
+        pacing: Literal["adaptive", "fixed"] = "adaptive",
         max_loading_wait: float = 90,
         max_error_trials: int = 5,
         additional_JS_heap: float = 2.,
+        max_ram_percentage: float | None = 0.95,
+        max_js_heap_mb: float | None = 3072,
+        max_dom_nodes: int | None = 200_000,
+        max_browser_rss_mb: float | None = None,
+        memory_check_every: int = 10,
+        prewarm_browsers: bool = True,
+        prune_budget: int = 20,
+        phase_workers: int = 0,
+        block_profile: BlockProfile = "feed",
+        block_stats: bool = False,
+        progress_backend: Literal["text", "journal", "sqlite"] = "text",
+        progress: Progress | None = None,
+        history_fp_rate: float | None = None,
+        history_capacity: int = 10**7,
+        capture_network: bool = False,
+        network_record_dir: str | None = None,
+        record_dir: str | None = None,
         name: str = "Crawler",
     ):
         self.logger = Logger(name)
@@ -68,8 +99,16 @@ class BaseCrawler:
         self.navigate_link_extractor = navigate_link_extractor
         self.parse_link_extractor = parse_link_extractor
         self.set_crawler_dir(crawler_dir=crawler_dir, data_pipeline=data_pipeline)
-        self.progress = Progress(dir=join(crawler_dir, "progress"))
-        self.progress.load()
+        # Shared among the workers of a `CrawlerPool`, which then closes it
+        self.owns_progress = progress is None
+        self.progress = progress or open_progress(
+            dir=join(crawler_dir, "progress"),
+            backend=progress_backend,
+            history_fp_rate=history_fp_rate,
+            history_capacity=history_capacity,
+        )
+        # Claimed from progress and neither added to history nor requeued yet
+        self.claimed_url: str | None = None
         self.user = user
         self.secret_file = secrets_file
         self.cookies = Cookies(user=user, save_dir=cookies_save_dir)
@@ -77,11 +116,26 @@ class BaseCrawler:
 
         self.headless = headless
         self.sleep_weibull_lambda = sleep_weibull_lambda
+        # Politeness delay between page visits of this account
+        self.pacer = Pacer(
+            base_delay=sleep_weibull_lambda,
+            min_delay=min(2.0, sleep_weibull_lambda),
+            mode=pacing,
+            state_path=join(crawler_dir, "pacing", f"{user}.json"),
+        )
+        self.last_load_latency = None
         self.max_loading_wait = max_loading_wait
         self.max_error_trials = max_error_trials
+        # Recycles the tab or browser when it grows past these limits
+        self.memory_governor = MemoryGovernor(
+            max_js_heap_mb=max_js_heap_mb,
+            max_dom_nodes=max_dom_nodes,
+            max_browser_rss_mb=max_browser_rss_mb,
+            max_ram_percentage=max_ram_percentage,
+            check_every=memory_check_every,
+        )
 
         self.chromedriver_path = chromedriver_path
-        self.driver_service = Service(chromedriver_path)
         self.driver_options = webdriver.ChromeOptions()
 
         # Options
@@ -102,9 +156,36 @@ class BaseCrawler:
             self.driver_options.add_argument("--ignore-certificate-errors")
         
         self.alt_chrome_options = deepcopy(self.driver_options)
+        ## Log network events, so that response bodies can be captured through CDP
+        self.capture_network = capture_network
+        self.network_record_dir = network_record_dir
+        self.capture = None
+        if capture_network or block_stats:
+            self.driver_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        ## Block requests for media, fonts and tracking, see request_blocker.py
+        self.request_blocker = RequestBlocker(block_profile)
+        self.block_stats = block_stats
         # self.driver_options.add_argument("--incognito")
+        # Keep a logged in browser ready in the background for the next phase or crash
+        self.prewarm_browsers = prewarm_browsers
+        # Posts retired between two cleanups of page storage and browser cache
+        self.prune_budget = prune_budget
+        # Browsers draining the next phase's work queue while the feed is scrolled, 0 to run phases one after another
+        self.phase_workers = phase_workers
+        # Shared with phase workers, e.g. for appending to the same files
+        self.phase_lock = threading.Lock()
+        self.driver_manager = DriverManager(
+            chromedriver_path, self.driver_options, login=self.login_with_cookies, logger=self.logger
+        )
+        self.chrome = None
         self.alt_chrome = None
         self.alt_chrome_cookies_flag = False
+        # Record what the crawl sees for offline replay
+        self.corpus = CorpusWriter(join(record_dir, "corpus.jsonl.gz")) if record_dir else None
+        # Replaced by a lock shared among workers when running in a `CrawlerPool`
+        self.pipeline_lock = nullcontext()
+        # Set by crawlers running in incremental mode
+        self.seen_posts: SeenPosts | None = None
 
     def on_start(self):
         # raise NotImplementedError("Crawler's on_start method is not implemented")
@@ -121,6 +202,10 @@ class BaseCrawler:
     def on_parse_complete(self, data):
         return data
 
+    def on_recycle(self):
+        """Called once the page being parsed is reopened in a fresh tab or browser"""
+        pass
+
     def parse(self) -> Iterable[dict[str, Any]]:
         raise NotImplementedError("Crawler's parse method is not implemented")
 
@@ -150,34 +235,183 @@ class BaseCrawler:
         self.chrome.switch_to.window(self.main_tab)
 
     def set_pipeline_path_format(self, **format_kwargs):
+        # Buffered records go where they were meant to
+        self.data_pipeline.flush()
         for step in self.data_pipeline.steps:
             step.set_path_format(**format_kwargs)
 
-    def set_crawler_dir(self, crawler_dir: str, data_pipeline: Pipeline):
+    def save_records(self):
+        """Flush the records buffered so far, letting progress kept behind them be persisted"""
+        with self.pipeline_lock:
+            self.data_pipeline.flush()
+
+    def set_crawler_dir(self, crawler_dir: str, data_pipeline: Pipeline | BackgroundPipeline):
         self.crawler_dir = crawler_dir
         self.data_pipeline = data_pipeline
         self.set_pipeline_path_format(crawler_dir=crawler_dir)
 
     def sleep(self, _lambda: float = None):
+        # Politeness delay between page visits
         if _lambda is None:
-            _lambda = self.sleep_weibull_lambda
-        sleep_second = weibull_min.rvs(10, loc=0, scale=_lambda)
+            self.pacer.wait()
+            return
+        sleep_second = random.weibullvariate(_lambda, 10)
         time.sleep(sleep_second)
 
+    def load_url(self, url: str, new_tab: bool = False):
+        """Open `url`, timing how long it takes to load and raising `WallError` on a login or checkpoint wall"""
+        start = time.perf_counter()
+        if new_tab:
+            self.new_tab(url)
+        else:
+            self.chrome.get(url)
+        self.last_load_latency = time.perf_counter() - start
+        if hit_wall(self.chrome):
+            raise WallError(f"Redirected to {self.chrome.current_url}")
+
     def wait_DOM(self):
         self.chrome.implicitly_wait(self.max_loading_wait)
 
     def start_driver(self):
-        self.chrome = webdriver.Chrome(
-            service=self.driver_service, options=self.driver_options
-        )
+        """Replace the current browser, if any, with the spare or a new one"""
+        self.driver_manager.release(self.chrome)
+        self.chrome = self.driver_manager.acquire()
+        if self.prewarm_browsers:
+            self.driver_manager.prewarm()
+        self.request_blocker.apply(self.chrome)
         self.main_tab = self.chrome.current_window_handle
-        self.logger.info(f"Driver started")
+        self.logger.info(f"Driver started ({len(self.driver_manager)} browsers running)")
         base_heap = 4294705152 / 1024**3
         extra_heap = float(self.chrome.execute_script("return (window.performance.memory.jsHeapSizeLimit - 4294705152) / 1024**3"))
         self.logger.info(f"JavaScript VM has {(base_heap + extra_heap):.2f}GB of memory space (extra {extra_heap:.2f}GB).")
         self.action = ActionChains(self.chrome)
         self.wait = WebDriverWait(self.chrome, self.max_loading_wait)
+        # In-page waits time out by themselves, see `wait_nodes_added`
+        self.chrome.set_script_timeout(self.max_loading_wait + 10)
+        if self.capture_network:
+            self.capture = NetworkCapture(
+                self.chrome,
+                record_dir=self.network_record_dir,
+                listener=self.request_blocker.observe if self.block_stats else None,
+            )
+        self.install_prune_agent()
+
+    def recycle_tab(self, url: str):
+        """Reopen `url` in a new tab and close the current one, releasing its JS heap and DOM"""
+        old_tab = self.chrome.current_window_handle
+        # Unlike `window.open`, a new window has no opener, so it gets its own renderer process
+        self.chrome.switch_to.new_window("tab")
+        new_tab = self.chrome.current_window_handle
+        self.chrome.switch_to.window(old_tab)
+        self.chrome.close()
+        self.chrome.switch_to.window(new_tab)
+        if self.main_tab == old_tab:
+            self.main_tab = new_tab
+        # CDP commands apply to the tab they were sent to
+        self.request_blocker.apply(self.chrome)
+        self.install_prune_agent()
+        self.load_url(url)
+        self.wait_DOM()
+
+    def restart_browser(self):
+        """Quit the browser for a logged in replacement"""
+        self.start_driver()
+        self.on_start()
+        self.ensure_logged_in()
+
+    def recycle_browser(self, url: str):
+        """Reopen `url` in a new browser, releasing everything the old one holds"""
+        self.restart_browser()
+        self.load_url(url)
+        self.wait_DOM()
+
+    def govern_memory(self, url: str) -> Literal["ok", "recycled", "exhausted"]:
+        """
+        Recycle the tab or browser parsing `url` once it is over a memory limit.
+        Returns "exhausted" if it still is after recycling, e.g. when the
+        rest of the machine is short on RAM.
+        """
+        action = self.memory_governor.check(self.chrome)
+        if action is None:
+            return "ok"
+
+        self.logger.info(f"Recycling the {action} as {self.memory_governor.reason}")
+        if action == "tab":
+            self.recycle_tab(url)
+        else:
+            self.recycle_browser(url)
+        self.on_recycle()
+        self.memory_governor.n_recycles[action] += 1
+        if self.memory_governor.check(self.chrome, force=True) is not None:
+            self.logger.warning(f"Still {self.memory_governor.reason} after recycling the {action}")
+            return "exhausted"
+        return "recycled"
+
+    def fork(self, name: str):
+        """Shallow copy of this crawler driving a logged in browser of its own"""
+        worker = copy(self)
+        worker.logger = Logger(f"{self.logger.name} ({name})")
+        worker.chrome = None
+        worker.alt_chrome = None
+        worker.alt_chrome_cookies_flag = False
+        worker.capture = None
+        worker.restart_browser()
+        return worker
+
+    def run_phase_worker(self, queue: WorkQueue, handler: Callable[["BaseCrawler", str, Any], None]):
+        """
+        Handle items of `queue` until it is closed and drained. Items failing
+        are left in the queue, to be retried by the next run.
+        """
+        try:
+            while (item := queue.get()) is not None:
+                key, value = item
+                try:
+                    handler(self, key, value)
+                    queue.done(key)
+                except:
+                    exc_type, value, tb = sys.exc_info()
+                    self.logger.warning(f"Leaving {key} in queue due to error: {red(exc_type.__name__)}: {value}\n{format_exc()}")
+                    if exc_type in BaseCrawler.BROWSER_EXCEPTIONS:
+                        self.restart_browser()
+                self.sleep()
+        finally:
+            self.driver_manager.release(self.chrome)
+
+    @contextmanager
+    def phase_workers_running(self, queue: WorkQueue, handler: Callable[["BaseCrawler", str, Any], None]):
+        """
+        While the body runs, drain `queue` in `phase_workers` threads, each in a
+        browser of its own, calling `handler(worker, key, value)` on each item.
+        On leaving, wait for them to finish the queue. Does nothing without phase workers.
+        """
+        if not self.phase_workers:
+            yield
+            return
+
+        def run(i: int):
+            try:
+                self.fork(f"worker {i}").run_phase_worker(queue, handler)
+            except:
+                exc_type, value, tb = sys.exc_info()
+                self.logger.error(f"Phase worker {i} stopped: {red(exc_type.__name__)}: {value}\n{format_exc()}")
+
+        # Items left by a previous run, or failed in a previous attempt, are handed out again
+        queue.load()
+        self.logger.info(f"Starting {self.phase_workers} phase workers, {len(queue)} items already queued")
+        threads = [threading.Thread(target=run, args=(i,), name=f"phase-worker-{i}") for i in range(1, self.phase_workers + 1)]
+        for thread in threads:
+            thread.start()
+        try:
+            yield
+        finally:
+            queue.close()
+            for thread in threads:
+                thread.join()
+            if len(queue) == 0:
+                queue.clear()
+            else:
+                self.logger.warning(f"{len(queue)} queued items left unhandled")
 
     def save_cookies(self):
         self.cookies.save(self.chrome.get_cookies())
@@ -187,6 +421,16 @@ class BaseCrawler:
         for cookie in self.cookies.load():
             self.chrome.add_cookie(cookie)
 
+    def login_with_cookies(self, driver: webdriver.Chrome):
+        """Log a prewarmed browser in with cached cookies, if any, and leave it on a blank page"""
+        if not self.cookies.exists():
+            return False
+        driver.get("https://www.facebook.com")
+        for cookie in self.cookies.load():
+            driver.add_cookie(cookie)
+        driver.get("about:blank")
+        return True
+
     def save_progress(self):
         self.progress.save()
 
@@ -218,9 +462,103 @@ class BaseCrawler:
         self.scroll_into_view(element, offset=offset, sleep=sleep)
         element.click()
     
+    def run_script(self, name: str, *args, asynchronous: bool = False):
+        script = load_script(name)
+        if asynchronous:
+            return self.chrome.execute_async_script(script, *args)
+        return self.chrome.execute_script(script, *args)
+
+    def wait_nodes_added(
+        self,
+        xpath: str,
+        since: int | None = None,
+        min_count: int | None = None,
+        scroll: bool = False,
+        timeout: float | None = None,
+        message: str = "",
+    ) -> tuple[int, int]:
+        """
+        Wait in-page, through a MutationObserver, until a node matching `xpath`
+        is added, or `min_count` of them are present. Nodes are numbered as they
+        appear: pass `since` to wait for one numbered above it, else for one added
+        after the call. With `scroll`, scroll to the bottom once waiting.
+        Returns the last node number and the number of nodes present.
+        """
+        timeout = self.max_loading_wait if timeout is None else timeout
+        result = self.run_script("wait_nodes", xpath, since, min_count, scroll, int(timeout * 1000), asynchronous=True)
+        if result is None:
+            raise TimeoutException(message)
+        seq, count = result
+        return seq, count
+
+    def record(self, kind: CorpusKind, content: str, **meta):
+        if self.corpus is not None:
+            self.corpus.write(kind, content, url=self.chrome.current_url, **meta)
+
+    def record_element(self, kind: CorpusKind, element: WebElement, **meta):
+        if self.corpus is not None:
+            self.record(kind, element.get_attribute("outerHTML"), **meta)
+
+    def is_stored_post(self, post_id: str | None = None, fingerprint: str | None = None):
+        """Whether a feed post was stored by a previous crawl, in incremental mode"""
+        return self.seen_posts is not None and self.seen_posts.known(post_id, fingerprint)
+
+    def update_seen_posts(self, post: dict[str, Any] | None, fingerprint: str | None = None, known: bool = False):
+        """Remember a new post in incremental mode. Returns whether the feed has caught up with the previous crawl"""
+        if self.seen_posts is None:
+            return False
+        post_datetime = post.get("post_datetime") if post else None
+        if not known and post:
+            self.seen_posts.add(post["post_id"], fingerprint, post_datetime, after=self.data_pipeline.n_received)
+        if self.seen_posts.observe(known, post_datetime):
+            self.logger.info(f"Reached {self.seen_posts.known_run} posts in a row stored by a previous crawl, stopping...")
+            return True
+        return False
+
     def remove_element(self, element: WebElement):
         self.chrome.execute_script("arguments[0].remove();", element)
 
+    def click_all(self, xpath: str) -> int:
+        """Click every element matching `xpath` in a single round-trip, returning how many were clicked"""
+        return self.chrome.execute_script(
+            """
+            const result = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (let i = 0; i < result.snapshotLength; i++) {
+                result.snapshotItem(i).click();
+            }
+            return result.snapshotLength;
+            """,
+            xpath,
+        )
+
+    def prune_agent_source(self):
+        return f"{load_script('prune_agent')}\ninstallPruneAgent({self.prune_budget});"
+
+    def install_prune_agent(self):
+        """Inject the prune agent into every document the browser loads from now on"""
+        self.chrome.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": self.prune_agent_source()})
+
+    def retire_post(self, post_div: WebElement, levels: int = 2):
+        """
+        Detach the `levels`-th ancestor of a processed post in a single round-trip,
+        with its media emptied. Page storage and browser cache are cleared every
+        `prune_budget` posts rather than after each one.
+        """
+        retire = "return window.__fbcPrune ? window.__fbcPrune.retire(arguments[0], arguments[1]) : null;"
+        cleaned = self.chrome.execute_script(retire, post_div, levels)
+        if cleaned is None:
+            # Page loaded before the agent was injected
+            self.chrome.execute_script(self.prune_agent_source())
+            cleaned = self.chrome.execute_script(retire, post_div, levels)
+        if cleaned:
+            self.chrome.execute_cdp_cmd("Network.clearBrowserCache", {})
+            self.poll_block_stats()
+
+    def poll_block_stats(self):
+        """Count blocked requests logged since the last call, unless network capture does"""
+        if self.block_stats and self.capture is None:
+            self.request_blocker.poll(self.chrome)
+
     def remove_by_xpath(self, xpaths: str | list[str]):
         if isinstance(xpaths, str):
             xpaths = [xpaths]
@@ -231,6 +569,9 @@ class BaseCrawler:
 
     def ensure_logged_in(self):
         self.logger.info("Ensuring user logging in")
+        if self.driver_manager.is_logged_in(self.chrome):
+            self.logger.info("Browser was logged in with cached cookies when prewarmed")
+            return
         if self.cookies.exists():
             self.logger.info("Found user's credentials cached as cookies")
             self.load_cookies()
@@ -286,16 +627,16 @@ class BaseCrawler:
         self.save_cookies()
         self.logger.info("Saved/Refreshed cookies")
 
-        if len(self.progress.queue) == 0 or self.progress.queue[0] != start_url:
-            self.progress.selectively_enqueue(start_url, side="left", ignore="history")
+        self.progress.seed(start_url)
         err_trial = 0
+        exc_type = None
 
-        while (
-            self.progress.count_remaining() > 0 and err_trial <= self.max_error_trials
-        ):
+        while err_trial <= self.max_error_trials:
+            url = self.claimed_url = self.progress.claim()
+            if url is None:
+                break
             try:
                 exc_type = None
-                url = self.progress.next_url()
 
                 # If URL is for navigation
                 if self.navigate_link_extractor.match(url) or url == start_url:
@@ -305,15 +646,30 @@ class BaseCrawler:
                     self._handle_parse_url(url)
 
                 self.progress.add_history(url)
+                self.claimed_url = None
+                self.progress.checkpoint()
+                if self.block_stats:
+                    self.poll_block_stats()
+                    self.logger.info(f"Request blocking: {self.request_blocker.stats()}")
+                self.pacer.on_success(self.last_load_latency)
                 err_trial = 0
                 self.sleep()
             except:
+                # Keep the records parsed before the error
+                try:
+                    with self.pipeline_lock:
+                        self.data_pipeline.flush()
+                except:
+                    self.logger.error(f"Could not save buffered records: \n{format_exc()}")
                 # Save driver's screen at the erroneous moment
                 if self.error_screenshot_dir:
                     os.makedirs(self.error_screenshot_dir, exist_ok=True)
-                    self.chrome.save_screenshot(
-                        os.path.join(self.error_screenshot_dir, f"{datetime.now()}.png")
-                    )
+                    try:
+                        self.chrome.save_screenshot(
+                            os.path.join(self.error_screenshot_dir, f"{datetime.now()}.png")
+                        )
+                    except WebDriverException:
+                        pass
 
                 err_trial += 1
                 # Logging out error
@@ -321,16 +677,31 @@ class BaseCrawler:
                 self.logger.error(
                     f"Restore {grey(url)} to queue due to error: \n{red(exc_type.__name__)}: {value}\n{format_exc()}"
                 )
-                # If this url hasn't been crawled successfully
-                if not self.progress.propagated(url):
-                    # Re-append URL to queue
-                    self.progress.enqueue(url, "left")
+                # Re-append URL to queue if it hasn't been crawled successfully
+                self.progress.requeue(url)
+                self.claimed_url = None
+                self.progress.checkpoint()
+                # Slow down after errors, more so on login/checkpoint walls
+                if exc_type is WallError:
+                    self.pacer.on_wall()
+                else:
+                    self.pacer.on_error()
+                self.logger.info(f"Pacing: {self.pacer.state()}")
 
                 self.on_parse_error()
                 # self.close_all_new_tabs()
                 # If error due to no abstract method implementation, stop retrying
                 if exc_type in BaseCrawler.CRITICAL_EXCEPTIONS:
                     break
+                # Retry in the prewarmed browser if this one crashed
+                if exc_type in BaseCrawler.BROWSER_EXCEPTIONS:
+                    self.logger.warning("Replacing the browser...")
+                    try:
+                        self.restart_browser()
+                    except:
+                        exc_type, value, tb = sys.exc_info()
+                        self.logger.error(f"Could not replace the browser: {red(exc_type.__name__)}: {value}")
+                        break
                 if err_trial <= err_trial:
                     self.logger.warning(
                         f"Attempting {bold(ordinal(err_trial))} retrial..."
@@ -345,28 +716,62 @@ class BaseCrawler:
             )
         elif self.progress.count_remaining() == 0:
             self.logger.info("Closing driver due to no URL left in queue...")
+        with self.pipeline_lock:
+            self.data_pipeline.close()
         self.save_progress()
+        if self.owns_progress:
+            self.progress.close()
         self.on_exit()
-        # self.chrome.quit()
+        # Browser is left open in detach mode
+        self.driver_manager.quit_all(keep=None if self.headless else self.chrome)
 
     def _handle_navigation_url(self, url: str):
         self.logger.info(f"Matched as URL for {bold('navigation')}: {grey(url)}")
-        self.chrome.get(url)
+        self.load_url(url)
         self.wait_DOM()
 
         self.extract_urls_from_current_page()
 
     def _handle_parse_url(self, url: str):
         self.logger.info(f"Matched as URL for {bold('parsing')}: {grey(url)}")
-        self.new_tab(url)
+        self.load_url(url, new_tab=True)
         self.wait_DOM()
+        if self.corpus is not None:
+            self.record("page", self.chrome.page_source)
 
         for data in self.parse():
             data = self.on_parse_complete(data)
-            self.data_pipeline(data)
+            with self.pipeline_lock:
+                self.data_pipeline(data)
+        # Records of a URL are saved before it is checkpointed as done
+        with self.pipeline_lock:
+            self.data_pipeline.flush()
 
         # self.close_all_new_tabs()
 
+    def scroll_network_stories(self, max_idle_scrolls: int = 5):
+        """
+        Keep scrolling to the bottom of the page, yielding stories parsed from
+        the page source first, then from captured GraphQL responses.
+        Stops after `max_idle_scrolls` scrolls in a row bring no new story.
+        """
+        seen = set()
+        payloads = list(iter_html_payloads(self.chrome.page_source))
+        idle_scrolls = 0
+        while idle_scrolls < max_idle_scrolls:
+            new_stories = [story for story in parse_stories(payloads) if story["post_id"] not in seen]
+            for story in new_stories:
+                seen.add(story["post_id"])
+                yield story
+
+            idle_scrolls = 0 if new_stories else idle_scrolls + 1
+            self.chrome.execute_script("window.scrollTo(0, document.body.scrollHeight)")
+            self.sleep(1)
+            bodies = self.capture.drain()
+            for body in bodies:
+                self.record("graphql", body)
+            payloads = [payload for body in bodies for payload in iter_payloads(body)]
+
     def page_source_soup(self):
         return BeautifulSoup(self.chrome.page_source, "lxml")
     
@@ -380,6 +785,7 @@ class BaseCrawler:
         )
     
     def clean_memory(self, gc: bool = False):
+        self.poll_block_stats()
         self.chrome.execute_cdp_cmd('Network.clearBrowserCache', {})
         self.chrome.execute_script("window.localStorage.clear();")
         self.chrome.execute_script("window.sessionStorage.clear();")
@@ -390,10 +796,7 @@ class BaseCrawler:
     @contextmanager
     def open_alt_chrome(self, url: str | None = None, use_cookies: bool = False, quit_on_done: bool = False):
         if not self.alt_chrome:
-            self.alt_chrome = webdriver.Chrome(
-                service=Service(self.chromedriver_path), 
-                options=self.alt_chrome_options
-            )
+            self.alt_chrome = self.driver_manager.launch(options=self.alt_chrome_options, login=False)
 
         if not self.alt_chrome_cookies_flag and use_cookies:
             self.alt_chrome.get("https://www.facebook.com")
@@ -425,5 +828,5 @@ class BaseCrawler:
             self.alt_chrome.get("about:blank")
             
             if quit_on_done:
-                self.alt_chrome.quit()
+                self.driver_manager.release(self.alt_chrome)
                 self.alt_chrome = None
\ No newline at end of file
@@ -0,0 +1,103 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from utils import Logger
+from utils.colors import *
+
+
+class DriverManager:
+    """
+    Owns every Chrome a crawler starts, each with its own chromedriver service,
+    and quits them when released. `prewarm` launches the next browser in the
+    background, already logged in through `login`, so that `acquire` returns it
+    at once when a phase ends or a browser has to be replaced after a crash.
+    Safe to share among threads, e.g. phase workers, which then take turns at
+    the spare.
+    """
+
+    def __init__(
+        self,
+        chromedriver_path: str,
+        options: webdriver.ChromeOptions,
+        login: Callable[[webdriver.Chrome], bool] | None = None,
+        logger: Logger | None = None,
+    ) -> None:
+        self.chromedriver_path = chromedriver_path
+        self.options = options
+        self.login = login
+        self.logger = logger or Logger("Driver Manager")
+
+        self.drivers: list[webdriver.Chrome] = []
+        self.logged_in: set[int] = set()
+        self.spare: Future | None = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prewarm")
+        self.lock = threading.Lock()
+
+    def launch(self, options: webdriver.ChromeOptions | None = None, login: bool = True) -> webdriver.Chrome:
+        driver = webdriver.Chrome(service=Service(self.chromedriver_path), options=options or self.options)
+        with self.lock:
+            self.drivers.append(driver)
+        if login and self.login is not None and self.login(driver):
+            with self.lock:
+                self.logged_in.add(id(driver))
+        return driver
+
+    def prewarm(self):
+        """Launch a spare browser in the background, unless one is already there"""
+        with self.lock:
+            if self.spare is None:
+                self.spare = self.executor.submit(self.launch)
+
+    def acquire(self) -> webdriver.Chrome:
+        """The spare browser if there is one, else a newly launched one"""
+        with self.lock:
+            spare, self.spare = self.spare, None
+        if spare is not None:
+            try:
+                return spare.result()
+            except Exception:
+                exc_type, value, tb = sys.exc_info()
+                self.logger.warning(f"Spare browser failed to start: {red(exc_type.__name__)}: {value}")
+        return self.launch()
+
+    def is_logged_in(self, driver: webdriver.Chrome):
+        return id(driver) in self.logged_in
+
+    def release(self, driver: webdriver.Chrome | None):
+        """Quit a browser, whether or not it still responds"""
+        if driver is None:
+            return
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+            self.logged_in.discard(id(driver))
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def quit_all(self, keep: webdriver.Chrome | None = None):
+        """Quit the spare and every browser but `keep`"""
+        with self.lock:
+            spare, self.spare = self.spare, None
+        if spare is not None and not spare.cancel():
+            try:
+                self.release(spare.result())
+            except Exception:
+                pass
+        with self.lock:
+            drivers = list(self.drivers)
+        for driver in drivers:
+            if driver is not keep:
+                self.release(driver)
+        self.executor.shutdown(wait=False)
+
+    def __len__(self):
+        """Number of running browsers, spare included"""
+        return len(self.drivers)
@@ -0,0 +1,77 @@
+from selenium.webdriver import Chrome
+from selenium.common.exceptions import WebDriverException
+
+import os
+import re
+import json
+import base64
+from pathlib import Path
+from typing import Any, Callable
+
+
+class NetworkCapture:
+    """
+    Collects the bodies of responses whose URL matches `url_regex` (Facebook's
+    GraphQL endpoint by default) from Chrome's performance log.
+    The driver must be started with the `goog:loggingPrefs` performance capability.
+    Every logged message is also passed to `listener`, as the log is emptied when read.
+    """
+
+    def __init__(
+        self,
+        driver: Chrome,
+        url_regex: str = r"/api/graphql/",
+        record_dir: str | None = None,
+        listener: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> None:
+        self.driver = driver
+        self.url_re = re.compile(url_regex)
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.n_recorded = len(list(self.record_dir.glob("*.json"))) if self.record_dir and self.record_dir.is_dir() else 0
+        self.pending: dict[str, str] = {}
+        self.listener = listener
+
+    def record(self, body: str):
+        """Save a response body as a fixture, readable by `utils.graphql.load_responses`"""
+        os.makedirs(self.record_dir, exist_ok=True)
+        with open(self.record_dir.joinpath(f"{self.n_recorded:06d}.json"), "w", encoding="utf-8") as f:
+            f.write(body)
+        self.n_recorded += 1
+
+    def get_body(self, request_id: str) -> str | None:
+        try:
+            response = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except WebDriverException:
+            # Body already evicted from the browser's buffer
+            return None
+        if response.get("base64Encoded"):
+            return base64.b64decode(response["body"]).decode("utf-8", errors="replace")
+        return response["body"]
+
+    def drain(self) -> list[str]:
+        """Bodies of matching responses finished since the last call, in completion order"""
+        bodies = []
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method, params = message["method"], message.get("params", {})
+            if self.listener:
+                self.listener(method, params)
+
+            if method == "Network.responseReceived" and self.url_re.search(params["response"]["url"]):
+                self.pending[params["requestId"]] = params["response"]["url"]
+            elif method == "Network.loadingFinished" and params["requestId"] in self.pending:
+                self.pending.pop(params["requestId"])
+                body = self.get_body(params["requestId"])
+                if body is None:
+                    continue
+                if self.record_dir:
+                    self.record(body)
+                bodies.append(body)
+            elif method == "Network.loadingFailed":
+                self.pending.pop(params["requestId"], None)
+        return bodies
+
+    def discard(self):
+        """Drop everything logged so far"""
+        self.driver.get_log("performance")
+        self.pending.clear()
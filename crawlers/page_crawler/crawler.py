@@ -3,6 +3,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver import Chrome
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 import re
 import os
@@ -14,9 +15,13 @@ import bs4
 import pandas as pd
 from pathlib import Path
 from ..base_crawler import BaseCrawler
-from EC import more_items_loaded
 from utils.parsing import parse_post_date, parse_text_from_element, get_video_url_from_source
-from utils.utils import to_bs4, to_etree, ordinal, sha256, tqdm_output
+from utils.utils import to_bs4, to_etree, ordinal, sha256, tqdm_output, snapshot
+from utils.feed_cursor import FeedCursor, post_fingerprint
+from utils.seen_posts import SeenPosts
+from utils.work_queue import WorkQueue
+from utils.selectors import selector, selectors
+from .snapshot import classify_post, parse_post_tree, parse_reel_tree, parse_post_entry, parse_reel_entry, extractor_texts, parse_story_record, get_first_content_type
 from utils.colors import *
 
 from urllib.parse import urlparse, parse_qs
@@ -28,8 +33,8 @@ from tqdm import tqdm
 
 
 class Crawler(BaseCrawler):
-    posts_xpath = "(//div[@class='x9f619 x1n2onr6 x1ja2u2z xeuugli xs83m0k xjl7jj x1xmf6yo x1emribx x1e56ztr x1i64zmx x19h7ccj xu9j1y6 x7ep2pv']/div)[last()]/div//div[@class='x1yztbdb x1n2onr6 xh8yej3 x1ja2u2z']"
-    content_on_hover_xpath = "(//div[@class='x78zum5 xdt5ytf x1n2onr6 xat3117 xxzkxad']/div)[2]/div"
+    posts_xpath = selector("feed.posts")
+    content_on_hover_xpath = selector("feed.hover_content")
 
     # class PostCollectCriterion:
     #     def __init__(
@@ -84,10 +89,13 @@ class Crawler(BaseCrawler):
         max_ram_percentage: float = 0.95,
         language: Literal["vi", "en"] = "vi",
         theme: Literal["light", "dark"] = "light",
+        parse_mode: Literal["driver", "snapshot", "batch", "network"] = "driver",
+        incremental: bool = False,
+        incremental_stop_after: int = 10,
         *args,
         **kwargs,
     ):
-        super().__init__(*args, **kwargs, name="Page Crawler")
+        super().__init__(*args, **kwargs, max_ram_percentage=max_ram_percentage, capture_network=parse_mode == "network", name="Page Crawler")
 
         # self.post_collect_criteria = Crawler.PostCollectCriterion(
         #     criterion=post_collect_criterion,
@@ -98,7 +106,25 @@ class Crawler(BaseCrawler):
         self.pagename = None
         self.language = language
         self.theme = theme
+        assert parse_mode in ["driver", "snapshot", "batch", "network"]
+        self.parse_mode = parse_mode
         self.remaining_urls_path = Path(f"{self.crawler_dir}/{self.page_id}/remaining_posts.json")
+        self.feed_cursor = FeedCursor(f"{self.crawler_dir}/{self.page_id}/feed_cursor.jsonl")
+        # Posts are persisted as processed once their records are saved
+        self.feed_cursor.save_through(self.data_pipeline.n_saved)
+        self.data_pipeline.on_flush(self.feed_cursor.save_through)
+        # Posts handed over to phase workers collecting visual content
+        self.work_queue = WorkQueue(f"{self.crawler_dir}/{self.page_id}/visual_content_queue.jsonl")
+        self._visual_content_pipeline = None
+        if incremental:
+            self.seen_posts = SeenPosts(
+                f"{self.crawler_dir}/{self.page_id}/seen_posts.jsonl",
+                stop_after=incremental_stop_after,
+                csv_path=f"{self.crawler_dir}/{self.page_id}/data.csv",
+            )
+            # Posts are persisted as stored once their records are saved
+            self.seen_posts.save_through(self.data_pipeline.n_saved)
+            self.data_pipeline.on_flush(self.seen_posts.save_through)
         self.set_pipeline_path_format(page_id=page_id)
 
     def on_parse_error(self):
@@ -110,122 +136,311 @@ class Crawler(BaseCrawler):
             stop = f"last(){stop}"
         return self.chrome.find_elements(By.XPATH, f"({Crawler.posts_xpath})[position() >= {start} and position() <= {stop}]")
 
+    def prepare_feed(self):
+        """Remove the header and side panels hiding the feed"""
+        self.remove_by_xpath(selectors()["feed.obstructions"])
+
+    def on_recycle(self):
+        self.prepare_feed()
+        # Processed posts are loaded again, and fast-forwarded past
+        self.save_records()
+        self.feed_cursor.load()
+
     def parse(self):
         self.pagename = self.chrome.find_element(By.XPATH, "//h1").text.strip()
-        self.remove_by_xpath([
-            "(//div[@class='x9f619 x1n2onr6 x1ja2u2z x78zum5 xdt5ytf xeuugli x1r8uery x1iyjqo2 xs83m0k x1swvt13 x1pi30zi xqdwrps x16i7wwg x1y5dvz6'])[3]",
-            "//div[@role='banner']",
-            "//div[@class='x9f619 x1ja2u2z x1xzczws x7wzq59']",
-        ])
+        self.prepare_feed()
 
         if os.path.exists(self.remaining_urls_path):
             self.logger.info("Found post URLs previously saved")
             with open(self.remaining_urls_path) as f:
                 post_urls = json.load(f)
         else:
-            post_urls = {}
-            cover_photo_text = {"vi": re.compile(r"đã cập nhật ảnh bìa của họ\.$"), "en": re.compile(r" updated their cover photo\.$")}
-            event_text = {"vi": re.compile(r"đã tạo một sự kiện\.$")}
-            n_scraped_posts = 0
-            current_post_idx = 1
-            crashed = False
-
-            with tqdm_output(
-                tqdm(total=round(virtual_memory().total / 1024**3, ndigits=2), desc="RAM Usage (GB)")
-            ) as bar:
-                # Scroll though page's feed
-                while (ram_usage := virtual_memory()).percent / 100 < self.max_ram_percentage \
-                    and not crashed:
-                    # and not (met := self.post_collect_criteria.condition_met()) \
-                    bar.n = round(ram_usage.used / 1024**3, ndigits=2)
-                    bar.refresh()
+            # With phase workers, visual content is collected while the feed is scrolled
+            with self.phase_workers_running(self.work_queue, Crawler.collect_post_visual_content):
+                if self.parse_mode == "batch":
+                    post_urls = yield from self.parse_feed_batched()
+                elif self.parse_mode == "network":
+                    post_urls = yield from self.parse_feed_network()
+                else:
+                    post_urls = yield from self.parse_feed_driver()
+            self.end_feed(post_urls)
+
+            if post_urls:
+                self.start_driver()
+                self.on_start()
+
+        yield []
+        self.collect_visual_content_step(post_urls)
 
-                    # self.chrome.execute_script("window.scrollTo(0, document.body.scrollHeight)")
-                    # self.wait.until(
-                    #     more_items_loaded(
-                    #         posts_locator=(By.XPATH, Crawler.posts_xpath),
-                    #         current_count=len(self.get_loaded_posts()),
-                    #     ),
-                    #     message="No more post loaded"
-                    # )
-                    # self.post_collect_criteria.update_progress(self.chrome)
-
-                    post_divs = self.get_loaded_posts(start=1, stop=1)
-                    if not post_divs:
+    def parse_feed_driver(self):
+        """
+        Scroll through page's feed, parsing posts one by one through the driver.
+        Returns URLs of posts having visual content.
+        """
+        post_urls = dict(self.feed_cursor.post_urls)
+        n_scraped_posts = 0
+        current_post_idx = 1
+        crashed = False
+        if len(self.feed_cursor):
+            self.logger.info(f"Resuming feed after {len(self.feed_cursor)} processed posts, fast-forwarding...")
+
+        feed_url = self.chrome.current_url
+        with tqdm_output(
+            tqdm(total=round(virtual_memory().total / 1024**3, ndigits=2), desc="RAM Usage (GB)")
+        ) as bar:
+            # Scroll though page's feed, recycling the tab or browser rather than stopping when it grows too big
+            while not crashed:
+                # and not (met := self.post_collect_criteria.condition_met()) \
+                bar.n = round(virtual_memory().used / 1024**3, ndigits=2)
+                bar.refresh()
+                if self.govern_memory(feed_url) == "exhausted":
+                    break
+
+                # self.post_collect_criteria.update_progress(self.chrome)
+
+                post_divs = self.get_loaded_posts(start=1, stop=1)
+                if not post_divs:
+                    break
+
+                post_div = post_divs[0]
+                post = None
+                scraped = False
+
+                # Skip posts processed before a restart, or stored by a previous crawl, without parsing them
+                try:
+                    # Taken once, so that the fingerprint is of what is classified and parsed
+                    post_tree = snapshot(post_div)
+                    fingerprint = post_fingerprint(post_tree)
+                    is_processed = self.feed_cursor.skip(fingerprint)
+                    is_stored = not is_processed and self.is_stored_post(fingerprint=fingerprint)
+                    if is_processed or is_stored:
+                        current_post_idx += 1
+                        self.retire_post(post_div)
+                except WebDriverException:
+                    crashed = True
+                    break
+                if is_stored and self.update_seen_posts(None, known=True):
+                    break
+                if is_processed or is_stored:
+                    continue
+                self.scroll_into_view(post_div)
+
+                try:
+                    post_type = classify_post(post_tree, self.language)
+                    # Check if reel
+                    if post_type == "reel":
+                        post = self.parse_reel(post_div)
+                        scraped = True
+
+                    # Check if update avatar
+                    elif post_type == "avatar":
+                        self.logger.info(f"Found {ordinal(current_post_idx)} post as avatar, skipping...")
+
+                    # Check if update cover photo
+                    elif post_type == "cover_photo":
+                        self.logger.info(f"Found {ordinal(current_post_idx)} post as cover photo, skipping...")
+
+                    elif post_type == "event":
+                        self.logger.info(f"Found {ordinal(current_post_idx)} post as event highlight, skipping...")
+                        
+                    # Normal post
+                    else:
+                        post = self.parse_post(post_div)
+                        scraped = True
+                    self.record_element("post", post_div, post_type=post_type)
+                except Exception as e:
+                    exc_type, value, tb = sys.exc_info()
+                    self.logger.warning(f"Skipping {ordinal(current_post_idx)} post: {red(exc_type.__name__)}: {value}\n{traceback.format_exc()}")
+
+                    if str(e).startswith("Message: tab crashed"):
+                        crashed = True
+                    continue
+                finally:
+                    current_post_idx += 1
+                    try:
+                        # Remove post div from HTML
+                        self.retire_post(post_div)
+                    except: 
+                        crashed = True
                         break
 
-                    post_div = post_divs[0]
-                    post = None
-                    scraped = False
-                    self.scroll_into_view(post_div)
+                # Return result, unless stored by a previous crawl under another fingerprint
+                is_stored = post is not None and self.is_stored_post(post_id=post["post_id"])
+                if post and not is_stored:
+                    yield self.register_post(post, post_urls)
+                self.advance_feed_cursor(fingerprint, post, post_urls)
+                if post and self.update_seen_posts(post, fingerprint, known=is_stored):
+                    break
+                # Continue looping
+                n_scraped_posts += scraped
+                bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
+                # self.sleep()
+
+        # if met:
+        #     self.logger.info(f"Post collect stopping criteria has met with threshold of {self.post_collect_criteria.threshold}")
+        if crashed:
+            # Keep the feed cursor, so that the next run fast-forwards to where the tab crashed
+            raise WebDriverException("Tab crashed while scrolling the feed")
+        return post_urls
+
+    def register_post(self, post: dict[str, Any], post_urls: dict[str, dict[str, Any]]):
+        """
+        Remember posts with visual content for the collecting step, or queue
+        them for phase workers, and return the fields to be saved
+        """
+        if post["first_content_type"] in ["img", "video", "reel"]:
+            post_urls[post["post_id"]] = {
+                "url": post["post_url"],
+                "is_reel": post["is_reel"],
+                "num_visual_content": post["num_visual_content"],
+                "first_content_type": post["first_content_type"],
+            }
+            if self.phase_workers:
+                self.work_queue.put(post["post_id"], post_urls[post["post_id"]])
+        _post = post.copy()
+        _post.pop("num_visual_content")
+        _post.pop("first_content_type")
+        return _post
+
+    def advance_feed_cursor(self, fingerprint: str | None, post: dict[str, Any] | None, post_urls: dict[str, dict[str, Any]]):
+        post_id = post["post_id"] if post else None
+        self.feed_cursor.advance(
+            fingerprint,
+            post_id=post_id,
+            remaining=post_urls.get(post_id),
+            after=self.data_pipeline.n_received,
+        )
 
+    def end_feed(self, post_urls: dict[str, dict[str, Any]]):
+        """
+        Hand post URLs over to the visual content step, replacing the feed
+        cursor. Phase workers have already been through them, only
+        those left in their queue are handed over.
+        """
+        self.save_records()
+        if self.phase_workers:
+            post_urls.clear()
+            post_urls.update(self.work_queue.pending)
+        os.makedirs(self.remaining_urls_path.parent, exist_ok=True)
+        with open(self.remaining_urls_path, "w+") as f:
+            json.dump(post_urls, f, indent=2)
+        if self.phase_workers:
+            self.work_queue.clear()
+        self.feed_cursor.clear()
+
+    def extract_loaded_posts(self) -> list[dict[str, Any]]:
+        entries = self.run_script(
+            "extract_posts",
+            Crawler.posts_xpath,
+            extractor_texts(self.language),
+            True,
+            selectors().xpaths,
+            asynchronous=True,
+        )
+        return json.loads(entries)
+
+    def parse_feed_batched(self):
+        """
+        Scroll through page's feed, extracting every loaded post with a single
+        in-page script call per scroll instead of driver calls per post field.
+        Returns post URLs having visual content.
+        """
+        post_urls = dict(self.feed_cursor.post_urls)
+        n_scraped_posts = 0
+        current_post_idx = 1
+        skip_names = {"avatar": "avatar", "cover_photo": "cover photo", "event": "event highlight"}
+        caught_up = False
+
+        feed_url = self.chrome.current_url
+        with tqdm_output(
+            tqdm(total=round(virtual_memory().total / 1024**3, ndigits=2), desc="RAM Usage (GB)")
+        ) as bar:
+            while not caught_up:
+                bar.n = round(virtual_memory().used / 1024**3, ndigits=2)
+                bar.refresh()
+                # Posts extracted before recycling are extracted again, but not saved twice
+                if self.govern_memory(feed_url) == "exhausted":
+                    break
+
+                try:
+                    entries = self.extract_loaded_posts()
+                except WebDriverException:
+                    exc_type, value, tb = sys.exc_info()
+                    self.logger.warning(f"Stop scrolling: {red(exc_type.__name__)}: {value}")
+                    break
+
+                # Load more posts once every rendered one is extracted, waiting for one added after scrolling
+                if not entries:
+                    try:
+                        self.wait_nodes_added(Crawler.posts_xpath, scroll=True, message="No more post loaded")
+                    except TimeoutException:
+                        self.logger.info("No more post loaded")
+                        break
+                    continue
+
+                for entry in entries:
+                    post = None
                     try:
-                        post_soup = to_bs4(post_div)
-                        # Check if reel
-                        if post_soup.find("a")["href"].startswith("/reel"):
-                            post = self.parse_reel(post_div)
-                            scraped = True
-
-                        # Check if update avatar
-                        elif post_soup.find("img", {"data-imgperflogname": "feedCoverPhoto"}):
-                            self.logger.info(f"Found {ordinal(current_post_idx)} post as avatar, skipping...")
-
-                        # Check if update cover photo
-                        elif post_soup.find("h2").find(string=cover_photo_text[self.language]):
-                            self.logger.info(f"Found {ordinal(current_post_idx)} post as cover photo, skipping...")
-
-                        elif post_soup.find("h2").find(string=event_text[self.language]):
-                            self.logger.info(f"Found {ordinal(current_post_idx)} post as event highlight, skipping...")
-                            
-                        # Normal post
+                        if "error" in entry:
+                            raise ValueError(entry["error"])
+                        if entry["post_type"] == "reel":
+                            post = parse_reel_entry(entry)
+                        elif entry["post_type"] == "post":
+                            post = parse_post_entry(entry)
                         else:
-                            post = self.parse_post(post_div)
-                            scraped = True
-                    except Exception as e:
+                            self.logger.info(f"Found {ordinal(current_post_idx)} post as {skip_names[entry['post_type']]}, skipping...")
+                    except Exception:
                         exc_type, value, tb = sys.exc_info()
                         self.logger.warning(f"Skipping {ordinal(current_post_idx)} post: {red(exc_type.__name__)}: {value}\n{traceback.format_exc()}")
+                    current_post_idx += 1
+
+                    # Posts output before a restart are scrolled past again, but not saved twice
+                    is_stored = post is not None and self.is_stored_post(post_id=post["post_id"])
+                    if post and not is_stored and not self.feed_cursor.seen(post["post_id"]):
+                        yield self.register_post(post, post_urls)
+                        self.advance_feed_cursor(None, post, post_urls)
+                        n_scraped_posts += 1
+                    if post and self.update_seen_posts(post, known=is_stored):
+                        caught_up = True
+                        break
+                bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
+                self.clean_memory()
+
+        return post_urls
+
+    def parse_feed_network(self):
+        """
+        Scroll through page's feed, parsing posts from captured GraphQL responses
+        rather than from the DOM. Returns post URLs having visual content.
+        """
+        post_urls = dict(self.feed_cursor.post_urls)
+        n_scraped_posts = 0
+
+        with tqdm_output(
+            tqdm(total=round(virtual_memory().total / 1024**3, ndigits=2), desc="RAM Usage (GB)")
+        ) as bar:
+            try:
+                for story in self.scroll_network_stories():
+                    if (ram_usage := virtual_memory()).percent / 100 >= self.max_ram_percentage:
+                        break
+                    bar.n = round(ram_usage.used / 1024**3, ndigits=2)
+                    bar.refresh()
 
-                        if str(e).startswith("Message: tab crashed"):
-                            crashed = True
-                        continue
-                    finally:
-                        current_post_idx += 1
-                        try:
-                            # Remove post div from HTML
-                            self.remove_element(post_div.find_element(By.XPATH, "./../.."))
-                            self.clean_memory()
-                        except: 
-                            crashed = True
-                            break
-
-                    # Return result
-                    if post:
-                        _post = post.copy()
-                        _post.pop("num_visual_content")
-                        _post.pop("first_content_type")
-                        yield _post
-                        if post["first_content_type"] in ["img", "video", "reel"]:
-                            post_urls[post["post_id"]] = {
-                                "url": post["post_url"],
-                                "is_reel": post["is_reel"],
-                                "num_visual_content": post["num_visual_content"],
-                                "first_content_type": post["first_content_type"],
-                            }
-                    # Continue looping
-                    n_scraped_posts += scraped
-                    bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
-                    # self.sleep()
-
-            # if met:
-            #     self.logger.info(f"Post collect stopping criteria has met with threshold of {self.post_collect_criteria.threshold}")
-            with open(self.remaining_urls_path, "w+") as f:
-                    json.dump(post_urls, f, indent=2)
-            
-            self.start_driver()
-            self.on_start()
-        
-        yield []
-        self.collect_visual_content_step(post_urls)
+                    post = parse_story_record(story)
+                    # Posts output before a restart are scrolled past again, but not saved twice
+                    is_stored = self.is_stored_post(post_id=post["post_id"])
+                    if not is_stored and not self.feed_cursor.seen(post["post_id"]):
+                        yield self.register_post(post, post_urls)
+                        self.advance_feed_cursor(None, post, post_urls)
+                        n_scraped_posts += 1
+                        bar.set_postfix_str(f"Scraped: {n_scraped_posts}")
+                    if self.update_seen_posts(post, known=is_stored):
+                        break
+            except WebDriverException:
+                exc_type, value, tb = sys.exc_info()
+                self.logger.warning(f"Stop scrolling: {red(exc_type.__name__)}: {value}")
+
+        return post_urls
 
     def on_parse_complete(self, data):
         if data:
@@ -234,98 +449,15 @@ class Crawler(BaseCrawler):
 
     def collect_visual_content_step(self, post_urls: dict[str, dict[str, Any]]):
         self.logger.info("Collecting visual content...")
-        from pipeline import Pipeline, SaveImages, SaveVideos
-        pipline = Pipeline(
-            SaveImages(save_dir=f"{self.crawler_dir}/{self.page_id}", img_url_col="img_urls", id_col="post_id"),
-            SaveVideos(save_dir=f"{self.crawler_dir}/{self.page_id}", vid_url_col="video_urls", audio_url_col="video_audio_urls", id_col="post_id"),
-        )
         with tqdm_output(tqdm(total=len(post_urls), desc="Collecting Images/Videos", unit="post")) as bar:
             try:
                 while post_urls:
+                    id, d = tuple(post_urls.items())[0]
                     try:
-                        id, d = tuple(post_urls.items())[0]
-                        url = d["url"]
-                        first_content_type = d["first_content_type"]
-
-                        self.chrome.get("https://www.facebook.com/")
-                        self.chrome.delete_all_cookies()
-                        self.chrome.get(url)
-                        self.wait_DOM()
-                        if self.page_source_soup().find("span", string="This content isn't available at the moment"):
-                            self.logger.warning(f"Post is no longer available at {url}, skipping...")
-                            post_urls.pop(id)
-                            bar.update()
-                            self.sleep()
-                            continue
-
-                        self.remove_by_xpath([
-                            "//div[@role='banner']",
-                            "//div[@class='x7wzq59 xxzkxad xh8yej3 xzkaem6']",
-                        ])
-                        
-                        visual_urls = {"img_urls": [], "video_urls": [], "video_audio_urls": []}
-                        if first_content_type in ["reel", "video"]:
-                            video_urls = get_video_url_from_source(self.chrome.page_source)
-                            visual_urls["img_urls"].append("")
-                            visual_urls["video_urls"].append(video_urls["video_url"])
-                            visual_urls["video_audio_urls"].append(video_urls["audio_url"])
-
-                        elif first_content_type == "img":
-                            post_div = self.chrome.find_element(By.XPATH, "//div[@role='dialog']")
-                            first_image_a = post_div.find_element(By.XPATH, ".//div[@class='html-div xdj266r x11i5rnm xat24cr x1mh8g0r xexx8yu x4uap5 x18d9i69 xkhd6sd x1n2onr6']//a")
-                            if first_image_a.get_attribute("href").startswith("tel"):
-                                img_url = first_image_a.find_element(By.XPATH, ".//img").get_attribute("src")
-                                visual_urls["img_urls"].append(img_url)
-                            else:
-                                first_image_a.click()
-                                first_content_id = self.get_visual_content_id(self.chrome.current_url, "img")
-                                orig_post_id = self.get_post_id_from_dialog()
-
-                                iter = 0
-                                while True:
-                                    # Remove loging modal if exists
-                                    if self.page_source_etree().xpath("//div[@class='x78zum5 xdt5ytf xg6iff7 xippug5 x1n2onr6']//div[@role='dialog']//div[@class='xxqbpr x1gja9t x17p1517 x8vdgqj x2b8uid']"):
-                                        self.remove_by_xpath("(//div[@class='x78zum5 xdt5ytf xg6iff7 xippug5 x1n2onr6'])[last()]")
-                                        
-                                    post_id = self.get_post_id_from_dialog()
-                                    is_video = self.page_source_soup().find("img", {"data-visualcompletion": "media-vc-image"}) is None
-                                    if is_video:
-                                        content_id = self.get_visual_content_id(self.chrome.current_url, "video")
-                                        video_result = get_video_url_from_source(self.chrome.page_source)
-                                        visual_urls["img_urls"].append("")
-                                        visual_urls["video_urls"].append(video_result["video_url"])
-                                        visual_urls["video_audio_urls"].append(video_result["audio_url"])
-
-                                    else:
-                                        content_id = self.get_visual_content_id(self.chrome.current_url, "img")
-                                        img_el = self.chrome.find_element(By.XPATH, f"//img[@data-visualcompletion='media-vc-image']")
-                                        img_url = img_el.get_attribute("src")
-                                        visual_urls["img_urls"].append(img_url)
-                                        visual_urls["video_urls"].append("")
-                                        visual_urls["video_audio_urls"].append("")
-
-                                    # Check if came back to first content or jumped to other post
-                                    if iter > 0 and (content_id == first_content_id or orig_post_id != post_id):
-                                        break
-                                    
-                                    # Move to next content, if there is any
-                                    next_btn_exist = self.page_source_soup().find("div", {"aria-label": "Next photo"}) is not None
-                                    if next_btn_exist:
-                                        next_img_btn = self.chrome.find_element(By.XPATH, f"//div[@aria-label='Next photo']")
-                                        self.action.move_to_element(next_img_btn).click(next_img_btn).pause(0.5).perform()
-
-                                    # If no next image
-                                    else: break
-
-                                    iter += 1
-
-                        cmt_data = pd.DataFrame(visual_urls)
-                        cmt_data["post_id"] = id
-                        pipline(cmt_data)
-
+                        self.collect_post_visual_content(id, d)
                     except:
                         exc_type, value, tb = sys.exc_info()
-                        self.logger.warning(f"Skipping post {url}: {red(exc_type.__name__)}: {value}\n{traceback.format_exc()}")
+                        self.logger.warning(f"Skipping post {d['url']}: {red(exc_type.__name__)}: {value}\n{traceback.format_exc()}")
                     finally:
                         post_urls.pop(id)
                         bar.update()
@@ -337,8 +469,93 @@ class Crawler(BaseCrawler):
                 with open(self.remaining_urls_path, "w+") as f:
                     json.dump(post_urls, f, indent=2)
 
+    def visual_content_pipeline(self):
+        """Pipeline saving images and videos of posts, built on first use"""
+        if self._visual_content_pipeline is None:
+            from pipeline import Pipeline, SaveImages, SaveVideos
+            self._visual_content_pipeline = Pipeline(
+                SaveImages(save_dir=f"{self.crawler_dir}/{self.page_id}", img_url_col="img_urls", id_col="post_id"),
+                SaveVideos(save_dir=f"{self.crawler_dir}/{self.page_id}", vid_url_col="video_urls", audio_url_col="video_audio_urls", id_col="post_id"),
+            )
+        return self._visual_content_pipeline
+
+    def collect_post_visual_content(self, id: str, d: dict[str, Any]):
+        """Collect image and video URLs of a post, saving them through the visual content pipeline"""
+        url = d["url"]
+        first_content_type = d["first_content_type"]
+
+        self.chrome.get("https://www.facebook.com/")
+        self.chrome.delete_all_cookies()
+        self.chrome.get(url)
+        self.wait_DOM()
+        if self.page_source_soup().find("span", string="This content isn't available at the moment"):
+            self.logger.warning(f"Post is no longer available at {url}, skipping...")
+            return
+
+        self.remove_by_xpath(selectors()["post_page.obstructions"])
+
+        visual_urls = {"img_urls": [], "video_urls": [], "video_audio_urls": []}
+        if first_content_type in ["reel", "video"]:
+            video_urls = get_video_url_from_source(self.chrome.page_source)
+            visual_urls["img_urls"].append("")
+            visual_urls["video_urls"].append(video_urls["video_url"])
+            visual_urls["video_audio_urls"].append(video_urls["audio_url"])
+
+        elif first_content_type == "img":
+            post_div = self.chrome.find_element(By.XPATH, "//div[@role='dialog']")
+            first_image_a = post_div.find_element(By.XPATH, selectors()["dialog.first_image_anchor"])
+            if first_image_a.get_attribute("href").startswith("tel"):
+                img_url = first_image_a.find_element(By.XPATH, ".//img").get_attribute("src")
+                visual_urls["img_urls"].append(img_url)
+            else:
+                first_image_a.click()
+                first_content_id = self.get_visual_content_id(self.chrome.current_url, "img")
+                orig_post_id = self.get_post_id_from_dialog()
+
+                iter = 0
+                while True:
+                    # Remove loging modal if exists
+                    if selectors().xpath("dialog.login_modal")(self.page_source_etree()):
+                        self.remove_by_xpath(selectors()["dialog.login_modal_container"])
+
+                    post_id = self.get_post_id_from_dialog()
+                    is_video = self.page_source_soup().find("img", {"data-visualcompletion": "media-vc-image"}) is None
+                    if is_video:
+                        content_id = self.get_visual_content_id(self.chrome.current_url, "video")
+                        video_result = get_video_url_from_source(self.chrome.page_source)
+                        visual_urls["img_urls"].append("")
+                        visual_urls["video_urls"].append(video_result["video_url"])
+                        visual_urls["video_audio_urls"].append(video_result["audio_url"])
+
+                    else:
+                        content_id = self.get_visual_content_id(self.chrome.current_url, "img")
+                        img_el = self.chrome.find_element(By.XPATH, f"//img[@data-visualcompletion='media-vc-image']")
+                        img_url = img_el.get_attribute("src")
+                        visual_urls["img_urls"].append(img_url)
+                        visual_urls["video_urls"].append("")
+                        visual_urls["video_audio_urls"].append("")
+
+                    # Check if came back to first content or jumped to other post
+                    if iter > 0 and (content_id == first_content_id or orig_post_id != post_id):
+                        break
+
+                    # Move to next content, if there is any
+                    next_btn_exist = self.page_source_soup().find("div", {"aria-label": "Next photo"}) is not None
+                    if next_btn_exist:
+                        next_img_btn = self.chrome.find_element(By.XPATH, f"//div[@aria-label='Next photo']")
+                        self.action.move_to_element(next_img_btn).click(next_img_btn).pause(0.5).perform()
+
+                    # If no next image
+                    else: break
+
+                    iter += 1
+
+        cmt_data = pd.DataFrame(visual_urls)
+        cmt_data["post_id"] = id
+        self.visual_content_pipeline()(cmt_data)
+
     def parse_reel(self, reel_div: WebElement):
-        reel_a = reel_div.find_element(By.XPATH, ".//a[starts-with(@href, '/reel')]")
+        reel_a = reel_div.find_element(By.XPATH, selectors()["reel.anchor"])
         reel_id = re.search(r"reel/(\d+)", reel_a.get_attribute("href")).group(1)
         reel_url = f"https://www.facebook.com/{reel_id}"
 
@@ -358,10 +575,13 @@ class Crawler(BaseCrawler):
 
             see_less_text = {"vi": "Ẩn bớt", "en": "See less"}
             self.remove_element(reel_div.find_element(By.XPATH, f".//div[text()='{see_less_text[self.language]}']"))
-        
+
+        if self.parse_mode == "snapshot":
+            return parse_reel_tree(snapshot(reel_div), self.language)
+
         # Extract caption
-        if len(to_etree(reel_div).xpath("//div[starts-with(@class, 'xyamay9 x1pi30zi x1swvt13 xjkvuk6')]/span/div")) > 0:
-            caption_div = reel_div.find_element(By.XPATH, ".//div[starts-with(@class, 'xyamay9 x1pi30zi x1swvt13 xjkvuk6')]/span/div")
+        if len(selectors().xpath("reel.caption")(to_etree(reel_div))) > 0:
+            caption_div = reel_div.find_element(By.XPATH, selectors()["reel.caption"])
             caption = parse_text_from_element(caption_div)
         else:
             caption = ""
@@ -381,16 +601,20 @@ class Crawler(BaseCrawler):
 
 
     def parse_post(self, post_div: WebElement):
+        if self.parse_mode == "snapshot":
+            return self.parse_post_snapshot(post_div)
+
         hover_content_div = self.chrome.find_element(
             By.XPATH, Crawler.content_on_hover_xpath
         )
 
+        sel = selectors()
         post_content_divs = post_div.find_element(
-            By.XPATH, "./descendant::div[@class='html-div xdj266r x11i5rnm xat24cr x1mh8g0r xexx8yu x4uap5 x18d9i69 xkhd6sd']"
-        ).find_elements(By.XPATH, f"./div/div/div")
+            By.XPATH, sel["post.content_root"]
+        ).find_elements(By.XPATH, sel["post.content_divs"])
 
         # Get profile div
-        profile_div = post_div.find_element(By.XPATH, "./descendant::div[@data-ad-rendering-role='profile_name']")
+        profile_div = post_div.find_element(By.XPATH, sel["post.profile"])
 
         # Get content (caption + image/video) div
         content_div = post_content_divs[2]
@@ -400,7 +624,7 @@ class Crawler(BaseCrawler):
             if content.text != trans_text[self.language]:
                 num_content_modalities += 1
 
-        text_content_div = content_div.find_elements(By.XPATH, "./descendant::div[@data-ad-rendering-role='story_message']")
+        text_content_div = content_div.find_elements(By.XPATH, sel["post.story_message"])
         text_content_div = text_content_div[0] if len(text_content_div) > 0 else None
 
         if (
@@ -415,7 +639,7 @@ class Crawler(BaseCrawler):
 
 
         # Get post's datetime a element
-        post_datetime_a = profile_div.find_element(By.XPATH, "(../../../div)[2]//a")
+        post_datetime_a = profile_div.find_element(By.XPATH, sel["post.datetime_anchor"])
         self.scroll_into_view(post_datetime_a, sleep=0.2)
 
         # Get post's raw URL
@@ -439,20 +663,10 @@ class Crawler(BaseCrawler):
         first_content_type = None
         unavail_text = {"vi": "Nội dung này hiện không hiển thị", "en": "This content isn't available at the moment"}
         if visual_content_div and to_bs4(visual_content_div).find("span", string=unavail_text[self.language]) is None:
-            visual_soup = to_bs4(visual_content_div) if visual_content_div is not None else None
-            num_visual_content = len(visual_soup.find_all("div", {"class": "x10l6tqk x13vifvy"}))
+            visual_tree = to_etree(visual_content_div)
+            num_visual_content = len(sel.xpath("post.visual_items")(visual_tree))
             # Check if the first content is reel, gif, image or video
-            first_is_reel = bool(visual_soup.find("a")["href"].startswith("/reel") and visual_soup)
-            first_is_gif = visual_soup.find("div", {"aria-label": re.compile(r".*GIF.*")}) is not None
-            first_is_link = visual_soup.find("div", {"class": "x10l6tqk xzkaem6 xxt37ne x70y0r9"}) is not None
-            first_is_image = bool(visual_soup.find("img") and "data-visualcompletion" not in visual_soup.find("img").parent.attrs and visual_soup)
-            first_is_video = bool(visual_soup.find("div", {"role": "presentation"}) is not None and visual_soup)
-            first_content_type = "reel" if first_is_reel \
-                                else "gif" if first_is_gif \
-                                else "link" if first_is_link \
-                                else "video" if first_is_video \
-                                else "img" if first_is_image \
-                                else None
+            first_content_type = get_first_content_type(visual_tree)
             # visual_urls = self.get_visual_content(visual_content_div)
 
         return {
@@ -468,6 +682,23 @@ class Crawler(BaseCrawler):
             "is_reel": False,
         }
     
+    def parse_post_snapshot(self, post_div: WebElement):
+        """
+        Only the interactions that change the DOM go through the driver,
+        every field is then derived from a single outerHTML snapshot.
+        """
+        # Hover post's datetime a element so its href is resolved
+        post_datetime_a = post_div.find_element(By.XPATH, selectors()["post.post_datetime_anchor"])
+        self.scroll_into_view(post_datetime_a, sleep=0.2)
+
+        # Ensure post's text content showing full version
+        see_more_text = {"vi": "Xem thêm", "en": "See more"}
+        show_more_btns = post_div.find_elements(By.XPATH, f"{selectors()['post.story_message']}//div[@role='button' and text()='{see_more_text[self.language]}']")
+        if show_more_btns:
+            self.action.move_to_element(show_more_btns[0]).click(show_more_btns[0]).move_to_element(post_div).perform()
+
+        return parse_post_tree(snapshot(post_div), self.language)
+
     def get_visual_content_id(self, url: str, content_type: Literal["img", "video"]):
         if content_type == "img":
             return re.search(r"fbid=((\d)+)", url).group(1)
@@ -475,10 +706,10 @@ class Crawler(BaseCrawler):
             return re.search(r"(\d+)[^\d]*$", url).group(0)
 
     def get_post_id_from_dialog(self):
-        post_id = self.chrome.find_element(By.XPATH, "(//div[@role='dialog'])[last()]//div[@class='xu06os2 x1ok221b'][last()]//a")
+        post_id = self.chrome.find_element(By.XPATH, selectors()["dialog.post_link"])
         self.action.move_to_element(post_id).pause(0.1).perform()
 
-        post_id = self.chrome.find_element(By.XPATH, "(//div[@role='dialog'])[last()]//div[@class='xu06os2 x1ok221b'][last()]//a")
+        post_id = self.chrome.find_element(By.XPATH, selectors()["dialog.post_link"])
         post_id = Path(urlparse(post_id.get_attribute("href")).path).name
 
         return post_id
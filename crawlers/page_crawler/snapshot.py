@@ -0,0 +1,194 @@
+"""
+Browserless parsing of page posts, either from a single outerHTML snapshot,
+from the JSON entries returned by the `extract_posts` in-page script, or
+from GraphQL stories.
+Nothing here touches the driver.
+"""
+import re
+from lxml import etree
+from pathlib import Path
+from urllib.parse import urlparse
+from html import unescape
+from datetime import datetime
+from typing import Literal
+
+from utils.parsing import parse_text_from_html
+from utils.utils import sha256, inner_html, element_text
+from utils.selectors import selectors
+
+cover_photo_text = {"vi": re.compile(r"đã cập nhật ảnh bìa của họ\.$"), "en": re.compile(r" updated their cover photo\.$")}
+event_text = {"vi": re.compile(r"đã tạo một sự kiện\.$"), "en": re.compile(r" created an event\.$")}
+trans_text = {"vi": "Dịch bài viết này", "en": "See translation"}
+unavail_text = {"vi": "Nội dung này hiện không hiển thị", "en": "This content isn't available at the moment"}
+see_more_text = {"vi": "Xem thêm", "en": "See more"}
+
+
+def _h2_matches(post_tree: etree.Element, pattern: re.Pattern):
+    h2 = post_tree.find(".//h2")
+    if h2 is None:
+        return False
+    return any(pattern.search(text) for text in h2.itertext())
+
+
+def classify_post(
+    post_tree: etree.Element, language: Literal["vi", "en"] = "vi"
+) -> Literal["reel", "avatar", "cover_photo", "event", "post"]:
+    first_a = post_tree.find(".//a")
+    if first_a is not None and first_a.get("href", "").startswith("/reel"):
+        return "reel"
+    if selectors().xpath("post.cover_photo")(post_tree):
+        return "avatar"
+    if _h2_matches(post_tree, cover_photo_text[language]):
+        return "cover_photo"
+    if _h2_matches(post_tree, event_text[language]):
+        return "event"
+    return "post"
+
+
+def get_first_content_type(visual_tree: etree.Element):
+    sel = selectors()
+    first_a = visual_tree.find(".//a")
+    first_img = visual_tree.find(".//img")
+    first_is_reel = first_a is not None and first_a.get("href", "").startswith("/reel")
+    first_is_gif = bool(sel.xpath("post.gif")(visual_tree))
+    first_is_link = bool(sel.xpath("post.link_preview")(visual_tree))
+    first_is_image = first_img is not None and "data-visualcompletion" not in first_img.getparent().attrib
+    first_is_video = bool(sel.xpath("post.video")(visual_tree))
+    return "reel" if first_is_reel \
+        else "gif" if first_is_gif \
+        else "link" if first_is_link \
+        else "video" if first_is_video \
+        else "img" if first_is_image \
+        else None
+
+
+def parse_caption(caption_html: str):
+    caption = parse_text_from_html(caption_html)
+    return unescape(re.sub(r"href\(, [^\)]+\)", "", caption).strip())
+
+
+def parse_reel_tree(reel_tree: etree.Element, language: Literal["vi", "en"] = "vi"):
+    sel = selectors()
+    reel_a = sel.xpath("reel.anchor")(reel_tree)[0]
+    reel_id = re.search(r"reel/(\d+)", reel_a.get("href")).group(1)
+
+    caption_divs = sel.xpath("reel.caption")(reel_tree)
+    caption = parse_text_from_html(inner_html(caption_divs[0])) if caption_divs else ""
+
+    return {
+        "post_id": sha256(reel_id),
+        "post_url": f"https://www.facebook.com/{reel_id}",
+        "caption": caption,
+        "num_visual_content": 1,
+        "first_content_type": "reel",
+        "crawl_time": datetime.now(),
+        "is_reel": True,
+    }
+
+
+def parse_post_tree(post_tree: etree.Element, language: Literal["vi", "en"] = "vi"):
+    sel = selectors()
+    post_content_divs = sel.xpath("post.content_divs")(sel.xpath("post.content_root")(post_tree)[0])
+
+    # Get profile div
+    profile_div = sel.xpath("post.profile")(post_tree)[0]
+
+    # Get content (caption + image/video) div
+    content_div = post_content_divs[2]
+    num_content_modalities = sum(
+        element_text(content) != trans_text[language]
+        for content in content_div.xpath("div")
+    )
+
+    text_content_div = sel.xpath("post.story_message")(content_div)
+    text_content_div = text_content_div[0] if text_content_div else None
+
+    if (
+        num_content_modalities == 2
+        and text_content_div is not None
+        or num_content_modalities == 1
+        and text_content_div is None
+    ):
+        visual_content_div = content_div.xpath("(./div)[last()]")[0]
+    else:
+        visual_content_div = None
+
+    # Get post's ID from the datetime anchor
+    post_raw_url = sel.xpath("post.datetime_anchor")(profile_div)[0].get("href", "")
+    post_id = Path(urlparse(post_raw_url).path).name
+
+    # Get post's caption
+    caption = parse_caption(inner_html(text_content_div)) if text_content_div is not None else ""
+
+    # Get post's visual content
+    num_visual_content = 0
+    first_content_type = None
+    if visual_content_div is not None and not sel.xpath("post.unavailable")(
+        visual_content_div, text=unavail_text[language]
+    ):
+        num_visual_content = len(sel.xpath("post.visual_items")(visual_content_div))
+        first_content_type = get_first_content_type(visual_content_div)
+
+    return {
+        "post_id": sha256(post_id),
+        "post_url": f"https://www.facebook.com/{post_id}",
+        "caption": caption,
+        "num_visual_content": num_visual_content,
+        "first_content_type": first_content_type,
+        "crawl_time": datetime.now(),
+        "is_reel": False,
+    }
+
+
+def extractor_texts(language: Literal["vi", "en"] = "vi"):
+    """Localized texts expected by the `extract_posts` in-page script"""
+    return {
+        "see_more": see_more_text[language],
+        "translation": trans_text[language],
+        "unavailable": unavail_text[language],
+        "cover_photo": cover_photo_text[language].pattern,
+        "event": event_text[language].pattern,
+    }
+
+
+def parse_reel_entry(entry: dict):
+    reel_id = re.search(r"reel/(\d+)", entry["url"]).group(1)
+    return {
+        "post_id": sha256(reel_id),
+        "post_url": f"https://www.facebook.com/{reel_id}",
+        "caption": parse_text_from_html(entry["caption_html"]),
+        "num_visual_content": 1,
+        "first_content_type": "reel",
+        "crawl_time": datetime.now(),
+        "is_reel": True,
+    }
+
+
+def parse_post_entry(entry: dict):
+    post_id = Path(urlparse(entry["url"]).path).name
+    return {
+        "post_id": sha256(post_id),
+        "post_url": f"https://www.facebook.com/{post_id}",
+        "caption": parse_caption(entry["caption_html"]),
+        "num_visual_content": entry["num_visual_content"],
+        "first_content_type": entry["first_content_type"],
+        "crawl_time": datetime.now(),
+        "is_reel": False,
+    }
+
+
+def parse_story_record(story: dict):
+    """
+    Record from a story parsed by `utils.graphql.parse_story`. Note that the
+    ID hashed here is the numeric post ID, not the one found in DOM links.
+    """
+    media_types = story["media_types"]
+    return {
+        "post_id": sha256(story["post_id"]),
+        "post_url": f"https://www.facebook.com/{story['post_id']}",
+        "caption": story["caption"],
+        "num_visual_content": 1 if story["is_reel"] else len(media_types),
+        "first_content_type": "reel" if story["is_reel"] else media_types[0] if media_types else None,
+        "crawl_time": datetime.now(),
+        "is_reel": story["is_reel"],
+    }
@@ -0,0 +1,107 @@
+from selenium.webdriver import Chrome
+from selenium.common.exceptions import WebDriverException
+
+import json
+from fnmatch import fnmatchcase
+from collections import Counter
+from typing import Any, Literal
+
+BlockProfile = Literal["none", "light", "feed"]
+
+# Rules of URL patterns, `*` matching any run of characters as in `Network.setBlockedURLs`.
+# Resource types are matched by the URLs serving them, e.g. fonts by extension.
+BLOCK_RULES: dict[str, list[str]] = {
+    "video": ["*://video*.fbcdn.net/*", "*.mp4*", "*.m4s*", "*.webm*"],
+    "font": ["*.woff2*", "*.woff*", "*.ttf*", "*.otf*"],
+    "tracking": [
+        "*facebook.com/ajax/bz*",
+        "*facebook.com/ajax/bnzai*",
+        "*facebook.com/ajax/qm/*",
+        "*facebook.com/ajax/webstorage/*",
+        "*facebook.com/tr/*",
+        "*facebook.com/tr?*",
+        "*facebook.com/security/hsts-pixel*",
+        "*connect.facebook.net/*",
+    ],
+    "image": ["*://scontent*.fbcdn.net/*", "*.jpg*", "*.png*", "*.webp*", "*.gif*"],
+}
+
+BLOCK_PROFILES: dict[BlockProfile, list[str]] = {
+    "none": [],
+    # Nothing the page needs to render or to load more posts
+    "light": ["font", "tracking"],
+    # Also media, whose URLs are still parsed from the page source
+    "feed": ["font", "tracking", "video", "image"],
+}
+
+# Rough transfer size of one blocked request, for estimating the bytes saved
+ESTIMATED_BYTES = {"video": 512 * 1024, "font": 64 * 1024, "tracking": 1024, "image": 48 * 1024}
+
+
+class RequestBlocker:
+    """
+    Blocks requests matching the rules of a profile through CDP's
+    `Network.setBlockedURLs`, before they leave the browser. Blocked requests
+    and bytes loaded per resource type are counted from the performance log,
+    if the driver was started with the `goog:loggingPrefs` performance
+    capability, either by `poll` or by a `NetworkCapture` forwarding to `observe`.
+    """
+
+    def __init__(self, profile: BlockProfile = "light") -> None:
+        assert profile in BLOCK_PROFILES
+        self.profile = profile
+        self.rules = {name: BLOCK_RULES[name] for name in BLOCK_PROFILES[profile]}
+        self.blocked = Counter()
+        self.loaded_bytes = Counter()
+        self.requests: dict[str, tuple[str, str]] = {}
+
+    @property
+    def patterns(self):
+        return [pattern for patterns in self.rules.values() for pattern in patterns]
+
+    def apply(self, driver: Chrome):
+        if not self.rules:
+            return
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+
+    def rule_of(self, url: str) -> str | None:
+        for name, patterns in self.rules.items():
+            if any(fnmatchcase(url, pattern) for pattern in patterns):
+                return name
+        return None
+
+    def observe(self, method: str, params: dict[str, Any]):
+        """Count a performance log message"""
+        if method == "Network.requestWillBeSent":
+            self.requests[params["requestId"]] = (params["request"]["url"], params.get("type", "Other"))
+        elif method == "Network.loadingFinished" and params["requestId"] in self.requests:
+            _, resource_type = self.requests.pop(params["requestId"])
+            self.loaded_bytes[resource_type] += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params["requestId"] in self.requests:
+            url, _ = self.requests.pop(params["requestId"])
+            if params.get("blockedReason") == "inspector":
+                self.blocked[self.rule_of(url) or "other"] += 1
+
+    def poll(self, driver: Chrome):
+        """Count what the performance log holds, emptying it"""
+        try:
+            entries = driver.get_log("performance")
+        except WebDriverException:
+            # Performance log not enabled
+            return
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            self.observe(message["method"], message.get("params", {}))
+
+    def bytes_saved(self):
+        """Estimate, from the number of requests blocked by each rule"""
+        return sum(ESTIMATED_BYTES.get(name, 0) * count for name, count in self.blocked.items())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "profile": self.profile,
+            "blocked": dict(self.blocked),
+            "estimated_saved_mb": round(self.bytes_saved() / 1024**2, 2),
+            "loaded_mb": round(sum(self.loaded_bytes.values()) / 1024**2, 2),
+        }
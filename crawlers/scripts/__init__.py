@@ -0,0 +1,10 @@
+from functools import lru_cache
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+
+
+@lru_cache(maxsize=None)
+def load_script(name: str) -> str:
+    """Read an injectable JavaScript file from this directory once and cache it"""
+    return SCRIPTS_DIR.joinpath(f"{name}.js").read_text(encoding="utf-8")
@@ -0,0 +1,150 @@
+/*
+ * Extract every rendered, not yet extracted feed post in a single round-trip.
+ * Meant for `execute_async_script`.
+ *
+ * arguments[0]: XPath matching post divs
+ * arguments[1]: localized texts {see_more, translation, unavailable, cover_photo, event}
+ * arguments[2]: whether extracted posts are removed from the DOM afterwards
+ * arguments[3]: XPaths of the selector set in use, see utils/selectors.py
+ * arguments[4]: WebDriver callback, receives a JSON array string
+ */
+const [postsXPath, texts, removeExtracted, sel, callback] = arguments;
+
+function evaluateAll(xpath, context) {
+    const result = document.evaluate(xpath, context, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const nodes = [];
+    for (let i = 0; i < result.snapshotLength; i++) {
+        nodes.push(result.snapshotItem(i));
+    }
+    return nodes;
+}
+
+function first(xpath, context) {
+    return document.evaluate(xpath, context, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+
+function textOf(node) {
+    return node ? node.textContent.trim() : "";
+}
+
+function classifyPost(post) {
+    const firstA = post.querySelector("a");
+    if (firstA && (firstA.getAttribute("href") || "").startsWith("/reel")) {
+        return "reel";
+    }
+    if (first(sel["post.cover_photo"], post)) {
+        return "avatar";
+    }
+    const h2 = post.querySelector("h2");
+    const h2Texts = h2 ? evaluateAll(".//text()", h2).map(t => t.textContent) : [];
+    if (texts.cover_photo && h2Texts.some(t => new RegExp(texts.cover_photo).test(t))) {
+        return "cover_photo";
+    }
+    if (texts.event && h2Texts.some(t => new RegExp(texts.event).test(t))) {
+        return "event";
+    }
+    return "post";
+}
+
+function firstContentType(visualDiv) {
+    const firstA = visualDiv.querySelector("a");
+    const firstImg = visualDiv.querySelector("img");
+    if (firstA && (firstA.getAttribute("href") || "").startsWith("/reel")) return "reel";
+    if (first(sel["post.gif"], visualDiv)) return "gif";
+    if (first(sel["post.link_preview"], visualDiv)) return "link";
+    if (first(sel["post.video"], visualDiv)) return "video";
+    if (firstImg && !firstImg.parentElement.hasAttribute("data-visualcompletion")) return "img";
+    return null;
+}
+
+function extractReel(post) {
+    const reelA = first(sel["reel.anchor"], post);
+    const captionDiv = first(sel["reel.caption"], post);
+    return {
+        url: reelA ? reelA.getAttribute("href") : "",
+        caption_html: captionDiv ? captionDiv.innerHTML : "",
+        num_visual_content: 1,
+        first_content_type: "reel",
+    };
+}
+
+function extractPost(post) {
+    const contentRoot = first(sel["post.content_root"], post);
+    const contentDivs = contentRoot ? evaluateAll(sel["post.content_divs"], contentRoot) : [];
+    const contentDiv = contentDivs[2];
+    const datetimeA = first(sel["post.post_datetime_anchor"], post);
+    const textDiv = contentDiv ? first(sel["post.story_message"], contentDiv) : null;
+
+    // Visual content
+    let numVisualContent = 0;
+    let contentType = null;
+    if (contentDiv) {
+        const modalities = evaluateAll("div", contentDiv).filter(div => textOf(div) !== texts.translation).length;
+        if ((modalities === 2 && textDiv) || (modalities === 1 && !textDiv)) {
+            const visualDiv = first("(./div)[last()]", contentDiv);
+            if (!first(`.//span[text()=${JSON.stringify(texts.unavailable)}]`, visualDiv)) {
+                numVisualContent = evaluateAll(sel["post.visual_items"], visualDiv).length;
+                contentType = firstContentType(visualDiv);
+            }
+        }
+    }
+
+    // Interactions
+    const interactionDiv = contentDivs[3] ? first(sel["post.interactions"], contentDivs[3]) : null;
+    const reactionDiv = interactionDiv ? first("./div/div", interactionDiv) : null;
+    const reactionSpan = reactionDiv ? first(sel["post.reactions"], reactionDiv) : null;
+    const cmtShareDiv = interactionDiv ? first("(./div)[last()]", interactionDiv) : null;
+
+    return {
+        url: datetimeA ? datetimeA.href : "",
+        caption_html: textDiv ? textDiv.innerHTML : "",
+        num_visual_content: numVisualContent,
+        first_content_type: contentType,
+        interaction_texts: cmtShareDiv ? evaluateAll(sel["post.interaction_buttons"], cmtShareDiv).map(textOf) : [],
+        num_reactions: textOf(reactionSpan),
+    };
+}
+
+const posts = evaluateAll(postsXPath, document).filter(post => !post.hasAttribute("data-fbc-extracted"));
+
+// Expand captions and resolve datetime links before reading anything
+for (const post of posts) {
+    post.setAttribute("data-fbc-extracted", "");
+    for (const btn of evaluateAll(`${sel["post.story_message"]}//div[@role='button' and text()=${JSON.stringify(texts.see_more)}]`, post)) {
+        btn.click();
+    }
+    const datetimeA = first(sel["post.post_datetime_anchor"], post);
+    if (datetimeA) {
+        datetimeA.dispatchEvent(new MouseEvent("mouseover", {bubbles: true}));
+        datetimeA.dispatchEvent(new FocusEvent("focus"));
+    }
+}
+
+setTimeout(() => {
+    const entries = posts.map(post => {
+        const postType = classifyPost(post);
+        let entry = {post_type: postType};
+        try {
+            if (postType === "reel") {
+                Object.assign(entry, extractReel(post));
+            } else if (postType === "post") {
+                Object.assign(entry, extractPost(post));
+            }
+        } catch (e) {
+            entry.error = String(e);
+        }
+        return entry;
+    });
+    if (removeExtracted) {
+        for (const post of posts) {
+            if (window.__fbcPrune) {
+                // Also empties the post's media, see prune_agent.js
+                window.__fbcPrune.retire(post, 2);
+                continue;
+            }
+            const container = post.parentElement && post.parentElement.parentElement;
+            (container || post).remove();
+        }
+    }
+    callback(JSON.stringify(entries));
+}, 150);
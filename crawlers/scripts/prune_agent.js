@@ -0,0 +1,66 @@
+/*
+ * In-page agent retiring processed feed posts without further WebDriver
+ * round-trips: a retired post is detached, its images and videos are emptied
+ * so their decoded frames and media buffers are released, and every `budget`
+ * posts the page's storage is cleared and garbage collected.
+ *
+ * Installed on every new document by `BaseCrawler.install_prune_agent`, which
+ * appends a call to `installPruneAgent(budget)`.
+ */
+function installPruneAgent(budget) {
+    if (window.__fbcPrune) {
+        return window.__fbcPrune;
+    }
+    let retired = 0;
+
+    function stripMedia(root) {
+        for (const video of root.querySelectorAll("video")) {
+            video.pause();
+            video.removeAttribute("src");
+            for (const source of video.querySelectorAll("source")) {
+                source.remove();
+            }
+            // Drops the media buffer of MSE-backed videos
+            video.load();
+        }
+        for (const img of root.querySelectorAll("img")) {
+            img.removeAttribute("srcset");
+            img.removeAttribute("src");
+        }
+    }
+
+    function cleanup() {
+        try {
+            window.localStorage.clear();
+            window.sessionStorage.clear();
+        } catch (e) {}
+        if (window.indexedDB && indexedDB.databases) {
+            indexedDB.databases().then(dbs => dbs.forEach(db => indexedDB.deleteDatabase(db.name)));
+        }
+        if (window.gc) {
+            window.gc();
+        }
+    }
+
+    window.__fbcPrune = {
+        /* Detach `node`'s `levels`-th ancestor, returning whether the cleanup budget was reached */
+        retire(node, levels) {
+            let container = node;
+            for (let i = 0; i < levels && container.parentElement; i++) {
+                container = container.parentElement;
+            }
+            stripMedia(container);
+            container.remove();
+            retired++;
+            if (retired % budget === 0) {
+                setTimeout(cleanup, 0);
+                return true;
+            }
+            return false;
+        },
+        get retired() {
+            return retired;
+        },
+    };
+    return window.__fbcPrune;
+}
@@ -0,0 +1,81 @@
+/*
+ * Wait for nodes matching an XPath to be added, pushed by a MutationObserver
+ * instead of polled from WebDriver. Meant for `execute_async_script`.
+ *
+ * One watch is kept per XPath for the life of the document. It gives every
+ * matching node a sequential number when first seen, so that nodes removed
+ * in the meantime do not hide new ones, and counts the matching nodes
+ * present. The XPath is only evaluated after a mutation, and only while
+ * something waits.
+ *
+ * arguments[0]: XPath of the nodes
+ * arguments[1]: resolve once a node numbered above this is seen, null for
+ *               above the last number at call time
+ * arguments[2]: or once this many nodes are present, null to ignore
+ * arguments[3]: whether to scroll to the bottom of the page once the watch is set
+ * arguments[4]: timeout in milliseconds
+ * arguments[5]: WebDriver callback, receives [last number, count], or null on timeout
+ */
+const [xpath, since, minCount, scrollToBottom, timeoutMs, callback] = arguments;
+
+window.__fbcWatches = window.__fbcWatches || {};
+let watch = window.__fbcWatches[xpath];
+if (!watch) {
+    watch = {seq: 0, count: 0, dirty: true, scheduled: false, ids: new WeakMap(), waiters: []};
+    watch.scan = () => {
+        const result = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        watch.count = result.snapshotLength;
+        for (let i = 0; i < result.snapshotLength; i++) {
+            const node = result.snapshotItem(i);
+            if (!watch.ids.has(node)) {
+                watch.ids.set(node, ++watch.seq);
+            }
+        }
+        watch.dirty = false;
+    };
+    watch.flush = () => {
+        watch.scheduled = false;
+        if (!watch.waiters.length) {
+            return;
+        }
+        watch.scan();
+        watch.waiters = watch.waiters.filter(waiter => !waiter());
+    };
+    // Coalesce a burst of mutations into one evaluation
+    new MutationObserver(() => {
+        watch.dirty = true;
+        if (watch.waiters.length && !watch.scheduled) {
+            watch.scheduled = true;
+            setTimeout(watch.flush, 0);
+        }
+    }).observe(document.documentElement, {childList: true, subtree: true});
+    window.__fbcWatches[xpath] = watch;
+}
+
+if (watch.dirty) {
+    watch.scan();
+}
+const after = since === null && minCount === null ? watch.seq : since;
+const done = () => (after !== null && watch.seq > after) || (minCount !== null && watch.count >= minCount);
+
+if (done()) {
+    callback([watch.seq, watch.count]);
+} else {
+    let timer = null;
+    const waiter = () => {
+        if (!done()) {
+            return false;
+        }
+        clearTimeout(timer);
+        callback([watch.seq, watch.count]);
+        return true;
+    };
+    timer = setTimeout(() => {
+        watch.waiters = watch.waiters.filter(w => w !== waiter);
+        callback(null);
+    }, timeoutMs);
+    watch.waiters.push(waiter);
+    if (scrollToBottom) {
+        window.scrollTo(0, document.body.scrollHeight);
+    }
+}
@@ -0,0 +1,76 @@
+from .base_crawler import BaseCrawler
+from utils import Logger, open_progress
+from utils.colors import *
+
+import sys
+import threading
+from os.path import join
+from traceback import format_exc
+from typing import Any, Callable, Literal
+
+
+class CrawlerPool:
+    """
+    Runs one crawler per user, each driving its own browser with its own
+    cookie jar, all pulling URLs from a single shared `Progress` queue.
+    Workers are threads: they mostly wait on their Chrome processes, which
+    already run on separate cores.
+    """
+
+    def __init__(
+        self,
+        crawler_factory: Callable[..., BaseCrawler],
+        users: list[str],
+        crawler_dir: str,
+        progress_backend: Literal["text", "journal", "sqlite"] = "text",
+        history_fp_rate: float | None = None,
+        history_capacity: int = 10**7,
+        **crawler_kwargs: Any,
+    ) -> None:
+        assert len(users) > 0, "At least one user is required"
+        assert len(set(users)) == len(users), "Each worker needs its own user"
+        self.logger = Logger("Crawler Pool")
+        self.progress = open_progress(
+            dir=join(crawler_dir, "progress"),
+            backend=progress_backend,
+            shared=True,
+            history_fp_rate=history_fp_rate,
+            history_capacity=history_capacity,
+        )
+        self.pipeline_lock = threading.Lock()
+
+        self.workers: list[BaseCrawler] = []
+        for user in users:
+            crawler = crawler_factory(user=user, crawler_dir=crawler_dir, progress=self.progress, **crawler_kwargs)
+            crawler.logger.name = f"{crawler.logger.name} ({user})"
+            crawler.pipeline_lock = self.pipeline_lock
+            self.workers.append(crawler)
+
+    def _run_worker(self, crawler: BaseCrawler):
+        try:
+            crawler.start()
+        except:
+            exc_type, value, tb = sys.exc_info()
+            self.logger.error(
+                f"Worker {crawler.logger.name} stopped: \n{red(exc_type.__name__)}: {value}\n{format_exc()}"
+            )
+        finally:
+            # Otherwise the other workers would wait for it forever
+            if crawler.claimed_url is not None:
+                self.progress.requeue(crawler.claimed_url)
+                crawler.claimed_url = None
+
+    def start(self):
+        self.logger.info(f"Starting {len(self.workers)} workers")
+        threads = [
+            threading.Thread(target=self._run_worker, args=(crawler,), name=crawler.user)
+            for crawler in self.workers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.progress.save()
+        self.logger.info(f"All workers finished, {self.progress.count_remaining()} URLs left in queue")
+        self.progress.close()
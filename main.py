@@ -1,7 +1,4 @@
-from crawlers import BaseCrawler
-import config
-
-
+# Crawlers and config are imported after parsing arguments, see benchmarks/startup.py
 from importlib import import_module
 import argparse
 
@@ -16,7 +13,11 @@ def parse_args():
     )
     parser.add_argument("--crawler", "-c", help="Crawler option", required=True)
     parser.add_argument(
-        "--user", "-u", help="Facebook user in secrets.json", required=True
+        "--user",
+        "-u",
+        nargs="+",
+        help="Facebook user(s) in secrets.json. Several users run a pool of browser workers sharing one URL queue",
+        required=True,
     )
     parser.add_argument(
         "--additional-js-heap",
@@ -26,6 +27,48 @@ def parse_args():
         help="Additional memory can be stored by JavaScript VM in GB. Default is 4GB.",
         dest="additional_js_heap",
     )
+    parser.add_argument(
+        "--max-js-heap-mb",
+        default=3072,
+        type=float,
+        help="The feed's tab is reopened once its JavaScript heap grows past this many MB",
+        dest="max_js_heap_mb",
+    )
+    parser.add_argument(
+        "--max-dom-nodes",
+        default=200_000,
+        type=int,
+        help="The feed's tab is reopened once its page has more DOM nodes than this",
+        dest="max_dom_nodes",
+    )
+    parser.add_argument(
+        "--max-browser-rss-mb",
+        default=None,
+        type=float,
+        help="The browser is restarted once chromedriver and its Chrome processes hold more than this many MB. Default is no limit",
+        dest="max_browser_rss_mb",
+    )
+    parser.add_argument(
+        "--no-prewarm",
+        default=True,
+        action="store_false",
+        help="Do not keep a logged in spare browser ready for the next crawl phase or a browser crash, saving its memory",
+        dest="prewarm_browsers",
+    )
+    parser.add_argument(
+        "--block-profile",
+        default="feed",
+        choices=["none", "light", "feed"],
+        help="Requests blocked by the browser. 'light' blocks fonts and tracking, 'feed' also images and videos, whose URLs are still parsed from page sources",
+        dest="block_profile",
+    )
+    parser.add_argument(
+        "--block-stats",
+        default=False,
+        action="store_true",
+        help="Log counts of blocked requests and an estimate of the bytes saved, read from Chrome's performance log",
+        dest="block_stats",
+    )
     parser.add_argument(
         "--crawler-dir",
         "-s",
@@ -38,9 +81,15 @@ def parse_args():
         "-sleep",
         default=10.0,
         type=float,
-        help="Mode of sleep time. According to https://doi.org/10.1145/1835449.1835513, user dwelling time on a page follows Weibull distribution",
+        help="Mode of sleep time. According to https://doi.org/10.1145/1835449.1835513, user dwelling time on a page follows Weibull distribution. Initial delay in adaptive pacing",
         dest="sleep_weibull_lambda",
     )
+    parser.add_argument(
+        "--pacing",
+        default="adaptive",
+        choices=["adaptive", "fixed"],
+        help="'adaptive' shortens the delay between pages while they load fine, and lengthens it on errors and login/checkpoint walls. 'fixed' always waits around --sleep-weibull-lambda",
+    )
     parser.add_argument(
         "--max-loading-wait",
         "-max-wait",
@@ -85,31 +134,108 @@ def parse_args():
         help="Maximum number of error trials",
         dest="max_error_trials",
     )
+    parser.add_argument(
+        "--progress-backend",
+        "-pb",
+        default="text",
+        choices=["text", "journal", "sqlite"],
+        help="How progress is persisted. 'journal' checkpoints after every URL, so a crash loses nothing. 'sqlite' keeps it in an indexed database, shareable by several processes",
+        dest="progress_backend",
+    )
+    parser.add_argument(
+        "--history-fp-rate",
+        "-fpr",
+        default=None,
+        type=float,
+        help="Keep history as a Bloom filter with this false-positive rate, for a flat memory footprint. Default keeps every URL. Not used by the sqlite backend",
+        dest="history_fp_rate",
+    )
+    parser.add_argument(
+        "--history-capacity",
+        default=10**7,
+        type=int,
+        help="Number of URLs the Bloom filter history is sized for",
+        dest="history_capacity",
+    )
+    parser.add_argument(
+        "--network-record-dir",
+        "-netdir",
+        default=None,
+        help="Save captured GraphQL response bodies as fixtures (network parse mode only)",
+        dest="network_record_dir",
+    )
+    parser.add_argument(
+        "--record-dir",
+        "-rec",
+        default=None,
+        help="Record page sources and post snapshots into a corpus for replay.py",
+        dest="record_dir",
+    )
+    parser.add_argument(
+        "--background-pipeline",
+        default=0,
+        type=int,
+        help="Run the data pipeline in a background thread, queuing up to this many records before the crawler waits. Default 0 runs it inline",
+        dest="background_pipeline",
+    )
+    parser.add_argument(
+        "--phase-workers",
+        default=0,
+        type=int,
+        help="Browsers collecting comments or visual content of found posts while the feed is still scrolled. Default 0 collects them after the feed",
+        dest="phase_workers",
+    )
+    parser.add_argument(
+        "--selectors",
+        default=None,
+        help="Selector set to parse with, a version in utils/selector_sets or a path to a JSON file. Default is $FBC_SELECTORS, else the latest version",
+        dest="selectors",
+    )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    from datetime import datetime
+    from utils.selectors import use_selectors
+    use_selectors(args.selectors)
+    import config
+    from pipeline import BackgroundPipeline
 
-    crawler: BaseCrawler = import_module(
-        f".{args.crawler}.crawler", "crawlers"
-    ).Crawler(
+    crawler_cls = import_module(f".{args.crawler}.crawler", "crawlers").Crawler
+    crawler_kwargs = dict(
         chromedriver_path=args.chromedriver,
         navigate_link_extractor=config.NAVIGATE_LINK_EXTRACTOR,
         parse_link_extractor=config.PARSE_LINK_EXTRACTOR,
         crawler_dir=args.crawler_dir,
-        data_pipeline=config.PIPELINE,
-        user=args.user,
+        data_pipeline=BackgroundPipeline(config.PIPELINE, max_pending=args.background_pipeline) if args.background_pipeline > 0 else config.PIPELINE,
         secrets_file=args.secrets_json,
         cookies_save_dir=args.cookies_dir,
         error_screenshot_dir=args.error_screenshot_dir,
         headless=args.headless,
         sleep_weibull_lambda=args.sleep_weibull_lambda,
+        pacing=args.pacing,
         max_loading_wait=args.max_loading_wait,
         max_error_trials=args.max_error_trials,
         additional_JS_heap=args.additional_js_heap,
+        max_js_heap_mb=args.max_js_heap_mb,
+        max_dom_nodes=args.max_dom_nodes,
+        max_browser_rss_mb=args.max_browser_rss_mb,
+        prewarm_browsers=args.prewarm_browsers,
+        phase_workers=args.phase_workers,
+        block_profile=args.block_profile,
+        block_stats=args.block_stats,
+        progress_backend=args.progress_backend,
+        history_fp_rate=args.history_fp_rate,
+        history_capacity=args.history_capacity,
+        network_record_dir=args.network_record_dir,
+        record_dir=args.record_dir,
         **config.CRAWLER_ARGUMENTS.get(args.crawler, dict()),
     )
 
+    if len(args.user) > 1:
+        from crawlers import CrawlerPool
+        crawler = CrawlerPool(crawler_cls, users=args.user, **crawler_kwargs)
+    else:
+        crawler = crawler_cls(user=args.user[0], **crawler_kwargs)
+
     crawler.start()
@@ -1,31 +1,262 @@
-from .as_csv import SaveAsCSV
-from .as_excel import SaveAsExcel
-from .save_imgs import SaveImages
-from .save_vids import SaveVideos
-from .handle_hrefs import HandleHrefs
 from .base_step import BaseStep
-from pandas import DataFrame
+import time
+import queue
+import atexit
+import threading
+from importlib import import_module
 from typing import Sequence, Callable, Any
 
+# Steps are imported on first access, as they pull in pandas and requests
+_exports = {
+    "SaveAsCSV": ".as_csv",
+    "SaveAsExcel": ".as_excel",
+    "SaveImages": ".save_imgs",
+    "SaveVideos": ".save_vids",
+    "HandleHrefs": ".handle_hrefs",
+}
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_exports})
+
 
 class Pipeline:
-    def __init__(self, *steps: BaseStep) -> None:
+    """
+    Runs records through its steps, after turning them into a `DataFrame`.
+    With `batch_size` above 1, records are buffered and run through the steps
+    together, once `batch_size` of them are buffered or the oldest has waited
+    `flush_interval` seconds, even if no record comes in after it. Whatever is
+    buffered is flushed by `close`, and at interpreter exit as a last resort
+    while records were buffered since the last `close`. Listeners added by `on_flush` are told how many records are saved so far,
+    counting every record taken in, e.g. for progress persisted behind them.
+    """
+
+    def __init__(self, *steps: BaseStep, batch_size: int = 1, flush_interval: float | None = None) -> None:
+        assert batch_size >= 1
         self.steps: list[BaseStep] = [AsDataFrame(), *steps]
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer: list[Any] = []
+        self.buffered_since = None
+        self.timer: threading.Timer | None = None
+        self.lock = threading.RLock()
+        self.n_received = 0
+        self.n_saved = 0
+        self.flush_listeners: list[Callable[[int], None]] = []
+        # Left to a wrapper handling interpreter exit itself, see `BackgroundPipeline`
+        self.flush_at_exit = batch_size > 1
+        self.exit_registered = False
 
-    def __call__(self, input: Any) -> Any:
+    def on_flush(self, listener: Callable[[int], None]):
+        """Call `listener` with the number of records saved, whenever more are"""
+        self.flush_listeners.append(listener)
+
+    def _saved(self):
+        if self.n_saved == self.n_received:
+            return
+        self.n_saved = self.n_received
+        for listener in self.flush_listeners:
+            listener(self.n_saved)
+
+    def run(self, input: Any) -> Any:
         result = input
         for step in self.steps:
             result = step(result)
         return result
 
+    def __call__(self, input: Any) -> Any:
+        with self.lock:
+            self.n_received += 1
+            if self.batch_size == 1:
+                result = self.run(input)
+                self._saved()
+                return result
+            if not input:
+                if not self.buffer:
+                    self._saved()
+                return None
+
+            if not self.buffer:
+                self.buffered_since = time.monotonic()
+                if self.flush_at_exit and not self.exit_registered:
+                    atexit.register(self.flush)
+                    self.exit_registered = True
+                if self.flush_interval is not None:
+                    self.timer = threading.Timer(self.flush_interval, self._flush_due)
+                    self.timer.daemon = True
+                    self.timer.start()
+            self.buffer.append(input)
+            if len(self.buffer) >= self.batch_size or (
+                self.flush_interval is not None and time.monotonic() - self.buffered_since >= self.flush_interval
+            ):
+                return self.flush()
+        return None
+
+    def flush(self) -> Any:
+        """Run buffered records through the steps as a single batch"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.buffer:
+                return None
+            batch, self.buffer = self.buffer, []
+            result = batch
+            try:
+                for step in self.steps:
+                    result = step.batch(result) if isinstance(step, AsDataFrame) else step(result)
+            except:
+                # Kept for the next flush
+                self.buffer = batch + self.buffer
+                raise
+            self._saved()
+            return result
+
+    def _flush_due(self):
+        with self.lock:
+            self.timer = None
+            if not self.buffer or time.monotonic() - self.buffered_since < self.flush_interval:
+                return
+            try:
+                self.flush()
+            except Exception:
+                # Records are kept, the error is raised by the next call or flush retrying them
+                pass
+
+    def close(self):
+        """Flush, no longer flushing at interpreter exit until more records are buffered"""
+        with self.lock:
+            self.flush()
+            if self.exit_registered:
+                atexit.unregister(self.flush)
+                self.exit_registered = False
+
     def add(self, step: Callable[[Any], Any]):
         self.steps.append(step)
 
 
+class BackgroundPipeline:
+    """
+    Runs a `Pipeline` in a worker thread, so that slow steps such as downloads
+    or file writes do not hold up the browser. Records are queued in order,
+    and a call only waits while `max_pending` of them are already queued.
+    An error raised by the pipeline is raised again by the next call, once
+    its record is queued, or by `flush` or `close`. `flush` waits for every
+    queued record to be through. While the worker runs, it is closed at
+    interpreter exit, which also flushes the pipeline.
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, pipeline: Pipeline, max_pending: int = 100) -> None:
+        self.pipeline = pipeline
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error: BaseException | None = None
+        self.thread: threading.Thread | None = None
+        self.lock = threading.Lock()
+        # Records reach the pipeline in order, so its count of saved ones applies to calls here
+        self.n_received = pipeline.n_received
+        self.exit_registered = False
+        # Flushed from the worker by `close` instead, not twice
+        with pipeline.lock:
+            pipeline.flush_at_exit = False
+            if pipeline.exit_registered:
+                atexit.unregister(pipeline.flush)
+                pipeline.exit_registered = False
+
+    @property
+    def steps(self):
+        return self.pipeline.steps
+
+    @property
+    def n_saved(self):
+        return self.pipeline.n_saved
+
+    def on_flush(self, listener: Callable[[int], None]):
+        """Call `listener` with the number of records saved, from the worker thread"""
+        self.pipeline.on_flush(listener)
+
+    def add(self, step: Callable[[Any], Any]):
+        self.pipeline.add(step)
+
+    def _work(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            stopping = item is BackgroundPipeline._STOP
+            try:
+                if stopping:
+                    self.pipeline.close()
+                elif item is BackgroundPipeline._FLUSH:
+                    self.pipeline.flush()
+                else:
+                    self.pipeline(item)
+            except BaseException as e:
+                # Later records are still run, the first error is kept for the crawler
+                if self.error is None:
+                    self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._work, daemon=True, name="pipeline")
+                self.thread.start()
+                if not self.exit_registered:
+                    atexit.register(self.close)
+                    self.exit_registered = True
+
+    def _raise_error(self):
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def __call__(self, input: Any) -> None:
+        self._start()
+        self.n_received += 1
+        self.queue.put(input)
+        self._raise_error()
+
+    def flush(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(BackgroundPipeline._FLUSH)
+            self.queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Drain the queue and stop the worker, which is started again by the next call"""
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(BackgroundPipeline._STOP)
+            self.thread.join()
+        self._raise_error()
+        with self.lock:
+            if self.exit_registered:
+                atexit.unregister(self.close)
+                self.exit_registered = False
+
+
 class AsDataFrame(BaseStep):
     def __call__(self, data: dict[str, Any]) -> Any:
+        from pandas import DataFrame
         try:
             df = DataFrame(data)
         except ValueError:
             df = DataFrame([data])
         return df
+
+    def batch(self, records: Sequence[dict[str, Any]]) -> Any:
+        """One `DataFrame` of several records, built at once when they are all flat"""
+        from pandas import DataFrame, concat
+        if all(isinstance(record, dict) and not any(isinstance(value, (list, tuple, dict)) for value in record.values()) for record in records):
+            return DataFrame.from_records(records)
+        return concat([self(record) for record in records], ignore_index=True)
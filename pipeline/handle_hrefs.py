@@ -44,4 +44,4 @@ class HandleHrefs(BaseStep):
         elif self.action == "keep_content":
             return df.map(HandleHrefs._keep_content_fn)
         elif self.action == "replace":
-            return df.map(HandleHrefs._replace_fn, self.replace_predicate)
+            return df.map(HandleHrefs._replace_fn, predicate=self.replace_predicate)
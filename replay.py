@@ -0,0 +1,116 @@
+"""
+Replay a corpus recorded with `main.py --record-dir` through the parsing code,
+with no browser and no network, and report throughput of each stage.
+"""
+from utils.corpus import read_corpus
+from utils.utils import html_to_element
+from utils.graphql import iter_payloads, parse_stories
+from crawlers.page_crawler import snapshot as page_snapshot
+from crawlers.bank_crawler import snapshot as bank_snapshot
+import config
+
+import time
+import argparse
+import tempfile
+from lxml import etree
+from collections import defaultdict
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.seconds = defaultdict(float)
+        self.items = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def run(self, stage: str, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            self.errors[stage] += 1
+        finally:
+            self.seconds[stage] += time.perf_counter() - start
+            self.items[stage] += 1
+
+    def report(self):
+        print(f"{'stage':<16}{'items':>10}{'errors':>10}{'seconds':>12}{'items/s':>12}")
+        for stage, seconds in self.seconds.items():
+            rate = self.items[stage] / seconds if seconds > 0 else float("inf")
+            print(f"{stage:<16}{self.items[stage]:>10}{self.errors[stage]:>10}{seconds:>12.4f}{rate:>12.1f}")
+
+
+def parse_page_post(tree, language: str):
+    post_type = page_snapshot.classify_post(tree, language)
+    if post_type == "reel":
+        return post_type, page_snapshot.parse_reel_tree(tree, language)
+    if post_type == "post":
+        return post_type, page_snapshot.parse_post_tree(tree, language)
+    return post_type, None
+
+
+def parse_bank_post(tree, language: str):
+    post_type = page_snapshot.classify_post(tree, language)
+    if post_type in ["reel", "avatar", "cover_photo"]:
+        return post_type, None
+    return post_type, bank_snapshot.parse_post_tree(tree, language)
+
+
+def replay(corpus: str, crawler: str, language: str, run_pipeline: bool, output_dir: str, timer: StageTimer):
+    parse_post = parse_page_post if crawler == "page_crawler" else parse_bank_post
+    pipeline = config.PIPELINE
+    for step in pipeline.steps:
+        step.set_path_format(crawler_dir=output_dir, page_id="replay")
+
+    for record in read_corpus(corpus):
+        kind, content = record["kind"], record["content"]
+        if kind == "page":
+            timer.run("extract_links", config.PARSE_LINK_EXTRACTOR.extract, content)
+        elif kind == "post":
+            tree = timer.run("load_snapshot", html_to_element, content)
+            if tree is None:
+                continue
+            result = timer.run("parse_post", parse_post, tree, language)
+            if run_pipeline and result and result[1]:
+                post = result[1]
+                if crawler == "page_crawler":
+                    post = {k: v for k, v in post.items() if k not in ["num_visual_content", "first_content_type"]}
+                timer.run("pipeline", pipeline, post)
+        elif kind == "comments" and crawler == "bank_crawler":
+            tree = timer.run("load_snapshot", etree.HTML, content)
+            if tree is not None:
+                timer.run("get_comments", bank_snapshot.parse_comments_tree, tree)
+        elif kind == "graphql":
+            timer.run("graphql", lambda body: parse_stories(iter_payloads(body)), content)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", "-i", help="Path to a recorded corpus.jsonl.gz", required=True)
+    parser.add_argument("--crawler", "-c", help="Crawler option", choices=["page_crawler", "bank_crawler"], required=True)
+    parser.add_argument("--language", "-l", default="vi", choices=["vi", "en"])
+    parser.add_argument("--repeat", "-n", default=1, type=int, help="Number of passes over the corpus")
+    parser.add_argument(
+        "--pipeline",
+        "-p",
+        default=False,
+        action="store_true",
+        help="Also run parsed posts through config.PIPELINE",
+    )
+    parser.add_argument(
+        "--output-dir",
+        "-o",
+        default=None,
+        help="Crawler directory used by the pipeline. Default is a temporary directory",
+        dest="output_dir",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix="replay-")
+
+    timer = StageTimer()
+    for _ in range(args.repeat):
+        replay(args.corpus, args.crawler, args.language, args.pipeline, output_dir, timer)
+    timer.report()
@@ -0,0 +1,40 @@
+from crawlers.bank_crawler.snapshot import parse_comment_bubble, parse_comments_tree
+from utils.utils import html_to_element
+
+
+def bubble(comment_id: str, author: str, text: str, replies: str = "") -> str:
+    return f"""
+    <div>
+      {author}
+      <div class="x1lliihq xjkvuk6 x1iorvi4"><span>{text}</span></div>
+      <div class="x6s0dn4 x3nfvp2"><a role="link" tabindex="0" href="/posts/1?comment_id={comment_id}">1h</a></div>
+      {replies}
+    </div>
+    """
+
+
+def author_link(user_id: str, name: str) -> str:
+    return f'<a role="link" href="/profile.php?id={user_id}"><span class="x3nfvp2">{name}</span></a>'
+
+
+def test_author_of_a_nested_reply_stays_inside_its_bubble():
+    # The reply is shown inside a link of its parent comment, and its author has no profile link
+    reply = bubble("2", '<span class="x3nfvp2">Unavailable</span>', "Reply")
+    replies = f'<a role="link" href="/posts/1?comment_id=1">{reply}</a>'
+    page = html_to_element(f"""
+    <div>
+      <div class="x1n2onr6 x1ye3gou x1iorvi4 x78zum5 x1q0g3np x1a2a7pz">
+        {bubble("1", author_link("100012345", "Parent"), "Comment", replies)}
+      </div>
+    </div>
+    """)
+
+    comments = parse_comments_tree(page)
+    assert comments["comment_id"] == ["1"]
+    assert comments["author_id"] == ["100012345"]
+    assert comments["author_name"] == ["Parent"]
+
+    reply_bubble = page.xpath(".//a[@href='/posts/1?comment_id=1']/div")[0]
+    reply = parse_comment_bubble(reply_bubble)
+    assert reply["comment_id"] == "2"
+    assert reply["author_id"] is None
@@ -0,0 +1,24 @@
+from benchmarks import fixtures
+from benchmarks.stub_server import StubServer
+from utils.comment_client import CommentClient, find_page_info
+
+
+def test_page_info_of_the_comments_connection_only():
+    payloads = [{"data": {"node": {
+        # A story's comment count comes first, without page info
+        "story": {"comments": {"total_count": 12}},
+        "replies_connection": {"page_info": {"end_cursor": "reply-cursor", "has_next_page": True}},
+        "comments": {"edges": [], "page_info": {"end_cursor": "comment-cursor", "has_next_page": True}},
+    }}}]
+    assert find_page_info(payloads)["end_cursor"] == "comment-cursor"
+    assert find_page_info([{"data": {"comments": {"total_count": 3}, "page_info": {"end_cursor": "other"}}}]) is None
+
+
+def test_fetch_pages_through_every_comment():
+    page_html, responses = fixtures.comment_thread(fixtures.rng(), n_pages=3, per_page=5)
+    with StubServer(page_html, responses) as server:
+        client = CommentClient([], base_url=server.base_url, page_delay=0)
+        comments = client.fetch(f"{server.base_url}/123456789")
+        client.close()
+    assert [comment["comment_id"] for comment in comments] == [str(10**15 + i) for i in range(15)]
+    assert server.n_requests == 3
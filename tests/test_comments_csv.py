@@ -0,0 +1,32 @@
+import pandas as pd
+
+from crawlers.bank_crawler.snapshot import parse_author_id
+from utils.utils import append_csv
+
+
+def test_author_id_is_numeric_in_every_mode():
+    assert parse_author_id("https://www.facebook.com/profile.php?id=100012345&comment_id=1") == "100012345"
+    assert parse_author_id("/people/Nguyen-Van-A/100054321/?comment_id=1") == "100054321"
+    # Only a username, no ID to compare with those of GraphQL comments
+    assert parse_author_id("https://www.facebook.com/nguyenvana?comment_id=1") is None
+
+
+def test_append_csv_keeps_the_header_of_an_older_file(tmp_path):
+    path = str(tmp_path / "comments.csv")
+    pd.DataFrame({"comment_id": ["1"], "comment_text": ["old"], "post_id": ["p"]}).to_csv(path, index=False)
+    comments = pd.DataFrame({"comment_id": ["2"], "comment_text": ["new"], "author_id": ["100"], "author_name": ["A"], "post_id": ["p"]})
+    assert append_csv(comments, path) == ["author_id", "author_name"]
+
+    df = pd.read_csv(path, dtype=str)
+    assert list(df.columns) == ["comment_id", "comment_text", "post_id"]
+    assert df.to_dict("records")[1] == {"comment_id": "2", "comment_text": "new", "post_id": "p"}
+
+
+def test_append_csv_writes_the_header_once(tmp_path):
+    path = str(tmp_path / "comments.csv")
+    for i in range(2):
+        assert append_csv(pd.DataFrame({"comment_id": [str(i)], "author_id": ["100"]}), path) == []
+    assert pd.read_csv(path, dtype=str).to_dict("records") == [
+        {"comment_id": "0", "author_id": "100"},
+        {"comment_id": "1", "author_id": "100"},
+    ]
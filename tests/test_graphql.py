@@ -0,0 +1,48 @@
+from pathlib import Path
+from datetime import datetime
+
+from utils.graphql import iter_payloads, iter_html_payloads, load_responses, parse_stories, parse_comments
+
+FIXTURES = Path(__file__).parent / "fixtures" / "graphql"
+
+
+def read(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_parse_stories():
+    stories = parse_stories(iter_payloads(read("feed_response.json")))
+    # The deferred copy of the first story is left out, so is the shared one
+    assert [story["post_id"] for story in stories] == ["1111", "2222"]
+
+    album, reel = stories
+    assert album["caption"] == "Ưu đãi tháng 10"
+    assert album["creation_time"] == datetime.fromtimestamp(1727740800)
+    assert (album["num_comments"], album["num_shares"], album["num_reactions"]) == (12, 3, 45)
+    assert album["media_types"] == ["img", "video"]
+    assert not album["is_reel"]
+
+    # Comments rendered inline are counted
+    assert reel["num_comments"] == 2
+    assert reel["media_types"] == ["video"]
+    assert reel["is_reel"]
+
+
+def test_parse_comments():
+    payloads = [*iter_html_payloads(read("post_page.html")), *iter_payloads(read("comments_response.json"))]
+    comments = parse_comments(payloads)
+    assert [comment["comment_id"] for comment in comments] == ["1", "2", "3", "4"]
+    assert comments[0] == {
+        "comment_id": "1",
+        "comment_text": "Hay quá",
+        "author_id": "101",
+        "author_name": "User 1",
+        "created_time": datetime.fromtimestamp(1727900001),
+        "depth": 0,
+    }
+    assert comments[2]["depth"] == 1
+    assert comments[3]["comment_text"] == ""
+
+
+def test_load_responses_in_capture_order():
+    assert load_responses(str(FIXTURES)) == [read("comments_response.json"), read("feed_response.json")]
@@ -0,0 +1,25 @@
+from utils.pacing import Pacer
+
+
+def test_state_is_saved_only_when_the_delay_changes(tmp_path):
+    pacer = Pacer(base_delay=4.0, min_delay=2.0, decrease_step=1.0, state_path=str(tmp_path / "pacing.json"))
+    pacer.on_success(latency=1.0)
+    pacer.on_success(latency=1.0)
+    assert pacer.delay == 2.0
+    pacer.state_path.unlink()
+    # Already at the minimum
+    pacer.on_success(latency=1.0)
+    assert not pacer.state_path.exists()
+    pacer.on_error()
+    assert pacer.state_path.exists()
+
+
+def test_fixed_mode_sleeps_the_whole_delay(monkeypatch):
+    slept = []
+    monkeypatch.setattr("utils.pacing.time.sleep", slept.append)
+    monkeypatch.setattr("utils.pacing.random.weibullvariate", lambda delay, shape: delay)
+    pacer = Pacer(base_delay=5.0, mode="fixed")
+    pacer.on_error()
+    pacer.wait()
+    pacer.wait()
+    assert slept == [5.0, 5.0]
@@ -0,0 +1,140 @@
+import time
+import threading
+
+import pytest
+
+from pipeline import Pipeline, BackgroundPipeline, BaseStep
+from utils.feed_cursor import FeedCursor
+from utils.seen_posts import SeenPosts
+
+
+class Failing(BaseStep):
+    def __call__(self, df):
+        raise IOError("disk full")
+
+
+class Collect(BaseStep):
+    def __init__(self) -> None:
+        self.seen = []
+
+    def __call__(self, df):
+        self.seen.extend(df["i"].tolist())
+        return df
+
+
+def close_within(pipeline: BackgroundPipeline, timeout: float = 5):
+    """Close in another thread, failing instead of hanging the suite"""
+    errors = []
+
+    def close():
+        try:
+            pipeline.close()
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=close, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "close() hung"
+    return errors
+
+
+def test_background_pipeline_keeps_order():
+    step = Collect()
+    background = BackgroundPipeline(Pipeline(step), max_pending=2)
+    for i in range(20):
+        background({"i": i})
+    assert close_within(background) == []
+    assert step.seen == list(range(20))
+
+
+def test_background_pipeline_failing_final_flush_raises():
+    pipeline = Pipeline(Failing(), batch_size=2)
+    background = BackgroundPipeline(pipeline)
+    # Buffered, only run by the flush of close()
+    background({"i": 1})
+    errors = close_within(background)
+    assert len(errors) == 1 and isinstance(errors[0], IOError)
+    # Left to the wrapper, whose worker is stopped, so it is not flushed again at exit
+    assert not pipeline.exit_registered
+
+
+def test_background_pipeline_closed_at_exit_only_while_running():
+    background = BackgroundPipeline(Pipeline(Collect(), batch_size=10))
+    assert not background.exit_registered
+    background({"i": 1})
+    assert background.exit_registered and not background.pipeline.exit_registered
+    assert close_within(background) == []
+    assert not background.exit_registered
+
+
+def test_pipeline_flushes_at_exit_only_while_records_are_buffered():
+    step = Collect()
+    pipeline = Pipeline(step, batch_size=10)
+    assert not pipeline.exit_registered
+    pipeline({"i": 1})
+    assert pipeline.exit_registered
+    pipeline.close()
+    assert step.seen == [1] and not pipeline.exit_registered
+
+
+def test_background_pipeline_raises_on_next_call():
+    background = BackgroundPipeline(Pipeline(Failing()))
+    background({"i": 1})
+    with pytest.raises(IOError):
+        background.flush()
+    close_within(background)
+
+
+def test_pipeline_flushes_on_interval_without_new_records():
+    step = Collect()
+    pipeline = Pipeline(step, batch_size=10, flush_interval=0.05)
+    pipeline({"i": 1})
+    deadline = time.monotonic() + 5
+    while not step.seen and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert step.seen == [1]
+    assert pipeline.n_saved == 1
+
+
+def test_feed_cursor_waits_for_records_to_be_saved(tmp_path):
+    pipeline = Pipeline(Collect(), batch_size=2)
+    cursor = FeedCursor(str(tmp_path / "feed_cursor.jsonl"))
+    pipeline.on_flush(cursor.save_through)
+
+    pipeline({"i": 1})
+    cursor.advance("a", post_id="1", after=pipeline.n_received)
+    # Its record is still buffered, a restart now must parse the post again
+    assert len(FeedCursor(cursor.path)) == 0
+
+    pipeline({"i": 2})
+    cursor.advance("b", post_id="2", after=pipeline.n_received)
+    assert FeedCursor(cursor.path).post_ids == {"1", "2"}
+
+
+def test_feed_cursor_behind_background_pipeline(tmp_path):
+    background = BackgroundPipeline(Pipeline(Collect(), batch_size=3))
+    cursor = FeedCursor(str(tmp_path / "feed_cursor.jsonl"))
+    background.on_flush(cursor.save_through)
+    for i in range(4):
+        background({"i": i})
+        cursor.advance(str(i), post_id=str(i), after=background.n_received)
+    background.flush()
+    assert len(FeedCursor(cursor.path)) == 4
+    close_within(background)
+
+
+def test_seen_posts_wait_for_records_to_be_saved(tmp_path):
+    pipeline = Pipeline(Collect(), batch_size=2)
+    seen_posts = SeenPosts(str(tmp_path / "seen_posts.jsonl"))
+    pipeline.on_flush(seen_posts.save_through)
+
+    pipeline({"i": 1})
+    seen_posts.add("1", after=pipeline.n_received)
+    assert seen_posts.known("1")
+    # Its record is still buffered, the next crawl must not take it for stored
+    assert not SeenPosts(seen_posts.path).known("1")
+
+    pipeline({"i": 2})
+    seen_posts.add("2", after=pipeline.n_received)
+    assert SeenPosts(seen_posts.path).post_ids == {"1", "2"}
@@ -0,0 +1,72 @@
+import threading
+
+from utils.bloom import BloomFilter
+from utils.progress import Progress, SQLiteProgress
+
+
+def test_sqlite_claim_of_a_stopped_thread_is_released(tmp_path):
+    progress = SQLiteProgress(str(tmp_path), poll_interval=0.01)
+    progress.enqueue("https://www.facebook.com/1")
+    claimed = []
+    # Stops without adding its URL to history or requeuing it
+    thread = threading.Thread(target=lambda: claimed.append(progress.claim()))
+    thread.start()
+    thread.join()
+    assert claimed == ["https://www.facebook.com/1"]
+
+    assert progress.claim() == "https://www.facebook.com/1"
+    progress.add_history("https://www.facebook.com/1")
+    assert progress.claim() is None
+
+
+def test_sqlite_claims_of_live_threads_are_kept(tmp_path):
+    progress = SQLiteProgress(str(tmp_path))
+    progress.enqueue_list(["https://www.facebook.com/1", "https://www.facebook.com/2"])
+    assert progress.claim() == "https://www.facebook.com/1"
+    progress.release_stale_claims()
+    assert progress.count_remaining() == 1
+    assert progress.compact_every > 0
+
+
+def test_journal_keeps_a_claimed_url_until_it_is_done(tmp_path):
+    progress = Progress(str(tmp_path), backend="journal")
+    progress.enqueue_list(["https://www.facebook.com/1", "https://www.facebook.com/2"])
+    progress.checkpoint()
+    assert progress.claim() == "https://www.facebook.com/1"
+    # Found on the claimed page
+    progress.enqueue("https://www.facebook.com/3", "left")
+    progress.checkpoint()
+    # Killed while crawling it
+    assert list(Progress(str(tmp_path), backend="journal").queue) == [
+        "https://www.facebook.com/3", "https://www.facebook.com/1", "https://www.facebook.com/2"
+    ]
+    progress.save()
+    assert list(Progress(str(tmp_path), backend="journal").queue)[0] == "https://www.facebook.com/1"
+
+    progress.add_history("https://www.facebook.com/1")
+    progress.checkpoint()
+    reloaded = Progress(str(tmp_path), backend="journal")
+    assert list(reloaded.queue) == ["https://www.facebook.com/3", "https://www.facebook.com/2"]
+    assert reloaded.propagated("https://www.facebook.com/1")
+
+
+def test_journal_requeued_url_goes_back_in_front(tmp_path):
+    progress = Progress(str(tmp_path), backend="journal")
+    progress.enqueue_list(["https://www.facebook.com/1", "https://www.facebook.com/2"])
+    url = progress.claim()
+    progress.requeue(url)
+    progress.checkpoint()
+    assert list(Progress(str(tmp_path), backend="journal").queue) == list(progress.queue) == [
+        "https://www.facebook.com/1", "https://www.facebook.com/2"
+    ]
+
+
+def test_journal_checkpoint_flushes_compact_history(tmp_path):
+    progress = Progress(str(tmp_path), backend="journal", history_fp_rate=1e-6, history_capacity=1000)
+    progress.enqueue("https://www.facebook.com/1")
+    progress.add_history(progress.claim())
+    progress.checkpoint()
+    # Read by another process, e.g. one inspecting the crawl
+    assert len(BloomFilter(progress.bloom_path)) == 1
+    progress.close()
+    assert progress.history.mm.closed
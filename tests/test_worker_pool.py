@@ -0,0 +1,43 @@
+import threading
+
+from crawlers.worker_pool import CrawlerPool
+from utils import Logger
+
+
+class FakeCrawler:
+    """Claims URLs like `BaseCrawler.start`, the first one claimed crashing it"""
+
+    crashed = threading.Event()
+
+    def __init__(self, user: str, crawler_dir: str, progress) -> None:
+        self.user = user
+        self.logger = Logger("Fake Crawler")
+        self.progress = progress
+        self.claimed_url = None
+        self.crawled = []
+
+    def start(self):
+        while (url := self.progress.claim()) is not None:
+            self.claimed_url = url
+            if not FakeCrawler.crashed.is_set():
+                FakeCrawler.crashed.set()
+                raise RuntimeError("browser gone")
+            self.crawled.append(url)
+            self.progress.add_history(url)
+            self.claimed_url = None
+
+
+def test_url_of_a_stopped_worker_is_requeued(tmp_path):
+    FakeCrawler.crashed.clear()
+    pool = CrawlerPool(FakeCrawler, users=["a", "b"], crawler_dir=str(tmp_path), history_fp_rate=1e-6, history_capacity=1000)
+    pool.progress.enqueue_list(["https://www.facebook.com/1", "https://www.facebook.com/2"])
+    thread = threading.Thread(target=pool.start, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), "workers waited forever for the crashed one"
+    crawled = [url for worker in pool.workers for url in worker.crawled]
+    assert sorted(crawled) == ["https://www.facebook.com/1", "https://www.facebook.com/2"]
+    assert pool.progress.count_remaining() == 0
+    # One history for every worker, closed once they are done
+    assert all(worker.progress is pool.progress for worker in pool.workers)
+    assert pool.progress.history.mm.closed
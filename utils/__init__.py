@@ -1,6 +1,32 @@
-from .progress import Progress
-from .logger import Logger
-from .link_extractor import LinkExtractor
-from .cookies import Cookies
-from .utils import FormatablePath
-from . import colors
+from importlib import import_module
+
+# Submodules are imported on first access, so that e.g. `utils.progress` does not import selenium
+_exports = {
+    "Progress": ".progress",
+    "SharedProgress": ".progress",
+    "SQLiteProgress": ".progress",
+    "open_progress": ".progress",
+    "BloomFilter": ".bloom",
+    "Pacer": ".pacing",
+    "MemoryGovernor": ".memory",
+    "SelectorSet": ".selectors",
+    "WorkQueue": ".work_queue",
+    "Logger": ".logger",
+    "LinkExtractor": ".link_extractor",
+    "Cookies": ".cookies",
+    "FormatablePath": ".utils",
+    "colors": ".colors",
+}
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = import_module(_exports[name], __name__)
+    value = module if name == "colors" else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_exports})
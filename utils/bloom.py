@@ -0,0 +1,89 @@
+import os
+import math
+import mmap
+import struct
+import hashlib
+from pathlib import Path
+
+
+class BloomFilter:
+    """
+    Set of strings with no false negatives and a bounded false-positive rate,
+    stored as a bit array in a memory-mapped file. Memory use is flat
+    (about 3.6 bytes per URL at a 1e-6 rate), and opening an existing
+    filter reads only its header. Items cannot be listed or removed.
+    The false-positive rate grows past `fp_rate` once more than `capacity`
+    items are added.
+    """
+
+    MAGIC = b"FBCBLOOM"
+    HEADER = struct.Struct("<8sQIQQ")  # magic, number of bits, number of hashes, capacity, count
+
+    def __init__(self, path: str, capacity: int = 10**7, fp_rate: float = 1e-6) -> None:
+        assert capacity > 0 and 0 < fp_rate < 1
+        self.path = Path(path)
+        if self.path.exists() and self.path.stat().st_size >= self.HEADER.size:
+            self._open()
+        else:
+            self._create(capacity, fp_rate)
+
+    def _create(self, capacity: int, fp_rate: float):
+        num_bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        num_bits = (num_bits + 7) // 8 * 8
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+
+        os.makedirs(self.path.parent, exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, num_bits, num_hashes, capacity, 0))
+            f.truncate(self.HEADER.size + num_bits // 8)
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "r+b")
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        magic, self.num_bits, self.num_hashes, self.capacity, self.count = self.HEADER.unpack_from(self.mm, 0)
+        assert magic == self.MAGIC, f"{self.path} is not a Bloom filter"
+
+    def _positions(self, item: str):
+        # Double hashing: bit i is h1 + i * h2
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        h2 |= 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        offset = self.HEADER.size
+        is_new = False
+        for pos in self._positions(item):
+            byte, bit = offset + (pos >> 3), 1 << (pos & 7)
+            value = self.mm[byte]
+            if not value & bit:
+                self.mm[byte] = value | bit
+                is_new = True
+        if is_new:
+            self.count += 1
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str):
+        offset = self.HEADER.size
+        return all(
+            self.mm[offset + (pos >> 3)] & (1 << (pos & 7))
+            for pos in self._positions(item)
+        )
+
+    def __len__(self):
+        """Approximate number of items added"""
+        return self.count
+
+    def flush(self):
+        self.HEADER.pack_into(self.mm, 0, self.MAGIC, self.num_bits, self.num_hashes, self.capacity, self.count)
+        self.mm.flush()
+
+    def close(self):
+        self.flush()
+        self.mm.close()
+        self.file.close()
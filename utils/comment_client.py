@@ -0,0 +1,143 @@
+"""
+Browserless collection of a post's comments: the post page is fetched once
+for its tokens and first comments, then further comments are paged through
+Facebook's GraphQL endpoint with the cursors it returns, over a pooled
+`requests.Session` carrying the cookies of a logged in browser.
+"""
+import re
+import json
+import time
+from typing import Any, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cookies import Cookies
+from .graphql import iter_payloads, iter_html_payloads, parse_comments, find_all
+
+# Persisted query paging a post's comments. It changes with Facebook's releases,
+# find the current one in the `doc_id` of a captured comment pagination request
+COMMENTS_QUERY_DOC_ID = "8894656107282580"
+COMMENTS_QUERY_NAME = "CommentsListComponentsPaginationQuery"
+
+_dtsg_re = re.compile(r'"DTSGInitialData",\[\],\{"token":"([^"]+)"')
+_lsd_re = re.compile(r'"LSD",\[\],\{"token":"([^"]+)"')
+# Feedback IDs are base64 of "feedback:<post ID>"
+_feedback_id_re = re.compile(r'"id":"(ZmVlZGJhY2s6[A-Za-z0-9+/=]+)"')
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"
+
+
+class CommentClientError(Exception):
+    """The post page did not hold what is needed to page through its comments"""
+
+
+def find_page_info(payloads: list[Any]) -> dict[str, Any] | None:
+    """Page info of the last comment connection in `payloads`, telling the cursor to continue from"""
+    page_info = None
+    for payload in payloads:
+        for connection in find_all(payload, "comments"):
+            # Comment counts of stories are also stored under "comments", without page info
+            if isinstance(connection, dict) and connection.get("page_info"):
+                page_info = connection["page_info"]
+    return page_info
+
+
+class CommentClient:
+    """
+    Pages through comments of posts over HTTP. `base_url` may point at a
+    local server replaying recorded pages, see `benchmarks/stub_server.py`.
+    Safe to share among threads, which then share the connection pool.
+    """
+
+    def __init__(
+        self,
+        cookies: Cookies | list[dict[str, Any]],
+        base_url: str = "https://www.facebook.com",
+        doc_id: str = COMMENTS_QUERY_DOC_ID,
+        page_delay: float = 0.5,
+        max_pages: int = 1000,
+        pool_size: int = 4,
+        timeout: float = 30,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.doc_id = doc_id
+        self.page_delay = page_delay
+        self.max_pages = max_pages
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "vi-VN,vi;q=0.9,en;q=0.8"})
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=None),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        for cookie in cookies.load() if isinstance(cookies, Cookies) else cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        self.n_requests = 0
+
+    def get(self, url: str) -> str:
+        response = self.session.get(url, timeout=self.timeout)
+        self.n_requests += 1
+        response.raise_for_status()
+        return response.text
+
+    def query(self, tokens: dict[str, str], feedback_id: str, cursor: str | None) -> str:
+        variables = {
+            "commentsAfterCount": -1,
+            "commentsAfterCursor": cursor,
+            "commentsBeforeCount": None,
+            "commentsBeforeCursor": None,
+            "commentsIntentToken": "CHRONOLOGICAL_UNFILTERED_INTENT_V1",
+            "feedLocation": "POST_PERMALINK_DIALOG",
+            "focusCommentID": None,
+            "scale": 1,
+            "useDefaultActor": False,
+            "id": feedback_id,
+        }
+        response = self.session.post(
+            f"{self.base_url}/api/graphql/",
+            data={
+                **tokens,
+                "fb_api_caller_class": "RelayModern",
+                "fb_api_req_friendly_name": COMMENTS_QUERY_NAME,
+                "variables": json.dumps(variables),
+                "server_timestamps": "true",
+                "doc_id": self.doc_id,
+            },
+            timeout=self.timeout,
+        )
+        self.n_requests += 1
+        response.raise_for_status()
+        return response.text
+
+    def iter_payloads(self, post_url: str) -> Iterator[Any]:
+        """Payloads of the post page, then of each page of comments"""
+        if post_url.startswith("https://www.facebook.com"):
+            post_url = self.base_url + post_url.removeprefix("https://www.facebook.com")
+        html = self.get(post_url)
+        dtsg, lsd, feedback_id = _dtsg_re.search(html), _lsd_re.search(html), _feedback_id_re.search(html)
+        if dtsg is None or feedback_id is None:
+            raise CommentClientError(f"No token or feedback ID in {post_url}, cookies may have expired")
+        tokens = {"fb_dtsg": dtsg.group(1), **({"lsd": lsd.group(1)} if lsd else {})}
+
+        payloads = list(iter_html_payloads(html))
+        yield from payloads
+        page_info = find_page_info(payloads)
+        for _ in range(self.max_pages):
+            if not page_info or not page_info.get("has_next_page") or not page_info.get("end_cursor"):
+                return
+            time.sleep(self.page_delay)
+            payloads = list(iter_payloads(self.query(tokens, feedback_id.group(1), page_info["end_cursor"])))
+            yield from payloads
+            page_info = find_page_info(payloads)
+
+    def fetch(self, post_url: str) -> list[dict[str, Any]]:
+        """Unique comments of a post (replies included), as parsed by `utils.graphql.parse_comment`"""
+        return parse_comments(self.iter_payloads(post_url))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,36 @@
+import os
+import gzip
+import json
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Iterator, Literal
+
+CorpusKind = Literal["page", "post", "comments", "graphql"]
+
+
+class CorpusWriter:
+    """
+    Append-only corpus of what a live crawl has seen, one gzipped JSON line per
+    item. Each write is its own gzip member, so a killed crawl leaves a readable file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.lock = threading.Lock()
+
+    def write(self, kind: CorpusKind, content: str, **meta: Any):
+        record = {"kind": kind, "time": datetime.now().isoformat(), **meta, "content": content}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            os.makedirs(self.path.parent, exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+
+def read_corpus(path: str, kinds: list[CorpusKind] | None = None) -> Iterator[dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if kinds is None or record["kind"] in kinds:
+                yield record
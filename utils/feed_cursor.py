@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from collections import Counter, deque
+from typing import Any
+
+from lxml import etree
+
+
+def post_fingerprint(post_tree: etree.Element) -> str:
+    """
+    Cheap identity of a feed post from its snapshot: author, caption and image
+    descriptions, leaving out relative timestamps and counters that change
+    between page loads.
+    """
+    parts = post_tree.xpath(
+        ".//*[@data-ad-rendering-role='profile_name']//text()"
+        " | .//*[@data-ad-rendering-role='story_message']//text()"
+        " | .//a[starts-with(@href, '/reel')]/@href"
+        " | .//img/@alt"
+    )
+    text = " ".join(" ".join(part.split()) for part in parts if part.strip())
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class FeedCursor:
+    """
+    Durable position in a page's feed, appended one JSON line per processed
+    post: its fingerprint, post ID and what the next step of the crawl needs
+    about it. After a restart, `skip` tells which loaded posts were processed
+    before, so they are removed without being parsed again.
+    An entry may wait for the records parsed up to its post to be saved, see
+    `save_through`, so that a restart never skips a post whose records were
+    still buffered.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.n_saved = 0
+        self.load()
+
+    def load(self):
+        self.unsaved: deque[tuple[int, dict[str, Any]]] = deque()
+        self.pending = Counter()
+        self.post_ids = set()
+        self.post_urls: dict[str, Any] = {}
+        self.last_post_id = None
+        self.count = 0
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Line torn by a killed process
+                    continue
+                self._apply(entry)
+                if entry["fingerprint"]:
+                    self.pending[entry["fingerprint"]] += 1
+
+    def _apply(self, entry: dict[str, Any]):
+        self.count += 1
+        if entry["post_id"]:
+            self.post_ids.add(entry["post_id"])
+            self.last_post_id = entry["post_id"]
+        if entry["remaining"] is not None:
+            self.post_urls[entry["post_id"]] = entry["remaining"]
+
+    def skip(self, fingerprint: str):
+        """Whether a loaded post was processed before the restart"""
+        if self.pending[fingerprint] > 0:
+            self.pending[fingerprint] -= 1
+            return True
+        return False
+
+    def seen(self, post_id: str):
+        return post_id in self.post_ids
+
+    def advance(
+        self,
+        fingerprint: str | None,
+        post_id: str | None = None,
+        remaining: Any = None,
+        after: int = 0,
+    ):
+        """
+        Persist a processed post, once `after` records are saved. `remaining`
+        is kept in `post_urls` for the next crawl step
+        """
+        entry = {
+            "fingerprint": fingerprint,
+            "post_id": post_id,
+            "remaining": remaining,
+        }
+        with self.lock:
+            self._apply(entry)
+            self.unsaved.append((after, entry))
+            self._write()
+
+    def save_through(self, n_saved: int):
+        """Persist entries waiting for at most `n_saved` records, e.g. as a `Pipeline` flush listener"""
+        with self.lock:
+            self.n_saved = n_saved
+            self._write()
+
+    def _write(self):
+        entries = []
+        while self.unsaved and self.unsaved[0][0] <= self.n_saved:
+            entries.append(self.unsaved.popleft()[1])
+        if not entries:
+            return
+        os.makedirs(self.path.parent, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+
+    def clear(self):
+        """Forget the cursor once the whole feed is processed"""
+        if self.path.exists():
+            os.remove(self.path)
+        self.load()
+
+    def __len__(self):
+        return self.count
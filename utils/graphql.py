@@ -0,0 +1,162 @@
+"""
+Parsing of Facebook GraphQL payloads, as captured from the network or
+embedded in page source. Only plain JSON is handled here, so every function
+can be run against recorded response fixtures.
+"""
+import re
+import json
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+_script_json_re = re.compile(r'<script type="application/json"[^>]*>(.*?)</script>', re.DOTALL)
+_media_types = {
+    "Photo": "img",
+    "Video": "video",
+    "GenericAttachmentMedia": "link",
+}
+
+
+def iter_payloads(body: str) -> Iterator[Any]:
+    """
+    A GraphQL response body may hold several JSON documents, one per line
+    (deferred/streamed results), optionally behind an anti-hijacking prefix.
+    """
+    body = body.removeprefix("for (;;);")
+    for line in body.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+def iter_html_payloads(html: str) -> Iterator[Any]:
+    """JSON payloads embedded in page source, holding the first server-rendered items"""
+    for match in _script_json_re.finditer(html):
+        try:
+            yield json.loads(match.group(1))
+        except json.JSONDecodeError:
+            continue
+
+
+def load_responses(dir: str) -> list[str]:
+    """Read response bodies recorded by `NetworkCapture`, in capture order"""
+    return [path.read_text(encoding="utf-8") for path in sorted(Path(dir).glob("*.json"))]
+
+
+def find_nodes(obj: Any, typename: str, nested: bool = False) -> Iterator[dict]:
+    """
+    Yield dicts with `__typename == typename`. Unless `nested`, matching nodes
+    are not searched further (e.g. a shared story inside a story).
+    """
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            if current.get("__typename") == typename:
+                yield current
+                if not nested:
+                    continue
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+def find_all(obj: Any, key: str) -> Iterator[Any]:
+    """Depth-first lookup of the values stored under `key`, other than None"""
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            if key in current and current[key] is not None:
+                yield current[key]
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+def find_first(obj: Any, key: str, default: Any = None) -> Any:
+    """Depth-first lookup of the first value stored under `key`"""
+    return next(find_all(obj, key), default)
+
+
+def _count(value: Any) -> int:
+    # Items rendered inline, e.g. a story's first comments
+    if isinstance(value, list):
+        return len(value)
+    if isinstance(value, dict):
+        value = value.get("count", value.get("total_count", 0))
+    return int(value or 0)
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, dict):
+        value = value.get("text")
+    return value or ""
+
+
+def parse_story(node: dict) -> dict[str, Any]:
+    post_id = node.get("post_id") or find_first(node, "post_id") or node.get("id")
+    creation_time = find_first(node, "creation_time")
+    attachments = find_first(node, "attachments", [])
+
+    # Visual content, taking albums' sub-attachments into account
+    media_types = []
+    for attachment in attachments:
+        subattachments = find_first(attachment, "all_subattachments")
+        if subattachments:
+            media_types.extend(
+                _media_types.get((find_first(sub, "media") or sub).get("__typename"), None)
+                for sub in subattachments.get("nodes", [])
+            )
+        elif (media := find_first(attachment, "media")) is not None:
+            media_types.append(_media_types.get(media.get("__typename"), None))
+    url = node.get("url") or find_first(node, "url") or ""
+
+    return {
+        "post_id": str(post_id),
+        "url": url,
+        "caption": _text(find_first(node, "message")),
+        "creation_time": datetime.fromtimestamp(creation_time) if creation_time else None,
+        "num_comments": _count(find_first(node, "total_comment_count") or find_first(node, "comments")),
+        "num_shares": _count(find_first(node, "share_count")),
+        "num_reactions": _count(find_first(node, "reaction_count")),
+        "media_types": media_types,
+        "is_reel": "/reel/" in url,
+    }
+
+
+def parse_comment(node: dict) -> dict[str, Any]:
+    author = node.get("author") or {}
+    created_time = node.get("created_time")
+    return {
+        "comment_id": str(node.get("legacy_fbid") or node.get("id")),
+        "comment_text": _text(node.get("body")),
+        "author_id": author.get("id"),
+        "author_name": author.get("name"),
+        "created_time": datetime.fromtimestamp(created_time) if created_time else None,
+        "depth": node.get("depth", 0),
+    }
+
+
+def parse_stories(payloads: Iterable[Any]) -> list[dict[str, Any]]:
+    """Unique top-level stories, in order of appearance"""
+    stories = {}
+    for payload in payloads:
+        for node in find_nodes(payload, "Story"):
+            story = parse_story(node)
+            stories.setdefault(story["post_id"], story)
+    return list(stories.values())
+
+
+def parse_comments(payloads: Iterable[Any]) -> list[dict[str, Any]]:
+    """Unique comments (replies included), in order of appearance"""
+    comments = {}
+    for payload in payloads:
+        for node in find_nodes(payload, "Comment", nested=True):
+            comment = parse_comment(node)
+            comments.setdefault(comment["comment_id"], comment)
+    return list(comments.values())
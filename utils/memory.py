@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Literal
+
+import psutil
+
+if TYPE_CHECKING:
+    from selenium.webdriver import Chrome
+
+SAMPLE_SCRIPT = """
+return [
+    window.performance.memory ? window.performance.memory.usedJSHeapSize : null,
+    document.getElementsByTagName('*').length,
+];
+"""
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident memory in bytes of a process and all of its descendants"""
+    try:
+        root = psutil.Process(pid)
+        processes = [root, *root.children(recursive=True)]
+    except psutil.Error:
+        return 0
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            # Renderers come and go between listing and sampling
+            continue
+    return rss
+
+
+class MemoryGovernor:
+    """
+    Watches the memory of the browser rather than of the machine: the JS heap
+    and DOM node count of the current tab, and the resident memory of the
+    chromedriver process tree, that is every Chrome process it started.
+    Sampled every `check_every` calls to `check`, which tells whether the tab
+    (JS heap or DOM over its limit) or the whole browser (process tree or
+    system RAM over its limit) should be recycled. A limit of None is not
+    checked. Recycles are counted by the crawler in `n_recycles`.
+    """
+
+    def __init__(
+        self,
+        max_js_heap_mb: float | None = 3072,
+        max_dom_nodes: int | None = 200_000,
+        max_browser_rss_mb: float | None = None,
+        max_ram_percentage: float | None = 0.95,
+        check_every: int = 10,
+    ) -> None:
+        assert check_every > 0
+        self.max_js_heap_mb = max_js_heap_mb
+        self.max_dom_nodes = max_dom_nodes
+        self.max_browser_rss_mb = max_browser_rss_mb
+        self.max_ram_percentage = max_ram_percentage
+        self.check_every = check_every
+
+        self.n_calls = 0
+        self.last_sample: dict[str, Any] = {}
+        self.reason = None
+        self.n_recycles = {"tab": 0, "browser": 0}
+
+    def sample(self, driver: Chrome) -> dict[str, Any]:
+        js_heap, dom_nodes = driver.execute_script(SAMPLE_SCRIPT)
+        process = getattr(driver.service, "process", None)
+        self.last_sample = {
+            "js_heap_mb": js_heap / 1024**2 if js_heap is not None else None,
+            "dom_nodes": dom_nodes,
+            "browser_rss_mb": process_tree_rss(process.pid) / 1024**2 if process is not None else None,
+            "ram_percentage": psutil.virtual_memory().percent / 100,
+        }
+        return self.last_sample
+
+    def check(self, driver: Chrome, force: bool = False) -> Literal["tab", "browser"] | None:
+        """Sample if due, returning what to recycle, with `reason` set to the limit exceeded"""
+        self.n_calls += 1
+        if not force and self.n_calls % self.check_every:
+            return None
+
+        sample = self.sample(driver)
+        limits = [
+            ("browser", "browser_rss_mb", self.max_browser_rss_mb),
+            ("browser", "ram_percentage", self.max_ram_percentage),
+            ("tab", "js_heap_mb", self.max_js_heap_mb),
+            ("tab", "dom_nodes", self.max_dom_nodes),
+        ]
+        for action, key, limit in limits:
+            if limit is not None and sample[key] is not None and sample[key] >= limit:
+                self.reason = f"{key} {sample[key]:.2f} >= {limit}"
+                return action
+        self.reason = None
+        return None
+
+    def state(self) -> dict[str, Any]:
+        return {**self.last_sample, "recycles": dict(self.n_recycles)}
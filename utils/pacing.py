@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import random
+import threading
+from pathlib import Path
+from typing import Any, Literal
+
+
+class Pacer:
+    """
+    Delay between page visits of one account, adapted AIMD-style: it shrinks
+    by `decrease_step` seconds after each page that loads within
+    `latency_target`, and is multiplied by `increase_factor` after an error,
+    or by its square after a login/checkpoint wall. Slow page loads count as
+    half an error. The delay is measured from the previous visit, so time
+    spent parsing a page counts towards it, and is jittered with a Weibull
+    distribution of shape 10 as user dwell time is
+    (https://doi.org/10.1145/1835449.1835513).
+
+    With `mode="fixed"`, the crawler sleeps for the jittered `base_delay`
+    after each visit, as it did before pacing. State is saved to `state_path`,
+    if given, whenever the delay changes, so it carries over to the next run
+    of the account.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 10.0,
+        min_delay: float = 2.0,
+        max_delay: float = 600.0,
+        decrease_step: float = 0.5,
+        increase_factor: float = 2.0,
+        latency_target: float = 10.0,
+        mode: Literal["adaptive", "fixed"] = "adaptive",
+        state_path: str | None = None,
+    ) -> None:
+        assert mode in ["adaptive", "fixed"]
+        assert 0 < min_delay <= base_delay <= max_delay
+        self.base_delay = base_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.decrease_step = decrease_step
+        self.increase_factor = increase_factor
+        self.latency_target = latency_target
+        self.mode = mode
+        self.state_path = Path(state_path) if state_path else None
+
+        self.delay = base_delay
+        self.latency = None
+        self.n_successes = 0
+        self.n_errors = 0
+        self.n_walls = 0
+        self.last_visit = None
+        # Visits from several threads of the account are spaced out one after another
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if self.mode == "fixed" or self.state_path is None or not self.state_path.exists():
+            return
+        with open(self.state_path, "r") as f:
+            state = json.load(f)
+        self.delay = min(max(state["delay"], self.min_delay), self.max_delay)
+        self.latency = state["latency"]
+
+    def save(self):
+        if self.state_path is None:
+            return
+        os.makedirs(self.state_path.parent, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state(), f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "delay": self.delay,
+            "latency": self.latency,
+            "successes": self.n_successes,
+            "errors": self.n_errors,
+            "walls": self.n_walls,
+        }
+
+    def _set_delay(self, delay: float):
+        if self.mode == "fixed":
+            return
+        delay = min(max(delay, self.min_delay), self.max_delay)
+        if delay != self.delay:
+            self.delay = delay
+            self.save()
+
+    def on_success(self, latency: float | None = None):
+        self.n_successes += 1
+        if latency is not None:
+            # Exponentially weighted moving average of page load latency
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if latency is not None and latency > self.latency_target:
+            self._set_delay(self.delay * (1 + (self.increase_factor - 1) / 2))
+        else:
+            self._set_delay(self.delay - self.decrease_step)
+
+    def on_error(self):
+        self.n_errors += 1
+        self._set_delay(self.delay * self.increase_factor)
+
+    def on_wall(self):
+        self.n_walls += 1
+        self._set_delay(self.delay * self.increase_factor**2)
+
+    def wait(self):
+        """Sleep until the jittered delay since the previous visit has passed"""
+        if self.mode == "fixed":
+            time.sleep(random.weibullvariate(self.delay, 10))
+            return
+        with self.lock:
+            target = random.weibullvariate(self.delay, 10)
+            if self.last_visit is not None:
+                target -= time.monotonic() - self.last_visit
+            if target > 0:
+                time.sleep(target)
+            self.last_visit = time.monotonic()
@@ -6,6 +6,7 @@ from datetime import datetime
 from bs4 import BeautifulSoup
 from typing import Literal
 from utils.utils import unicode_escape_url, write_element, to_bs4
+from utils.selectors import selectors
 
 en_month_map = {
     "january": 1,
@@ -42,7 +43,10 @@ def parse_post_date(raw_data: str, lang: Literal["vi", "en"] = "vi"):
 
 
 def parse_text_from_element(text_element: WebElement):
-    text = text_element.get_attribute("innerHTML")
+    return parse_text_from_html(text_element.get_attribute("innerHTML"))
+
+
+def parse_text_from_html(text: str):
     text = re.sub(r"(<img[^>]*alt=\"([^\"]+)\")[^>]*>", r"\2", text)
     text = re.sub(r"<a[^>]*href=\"([^\"]+)\"[^>]*>(.*?)</a>", r"href(\2, \1)", text)
     text = re.sub(r"(?<=</div>)()(?=<div)", r"\n", text)
@@ -86,15 +90,16 @@ def get_text_from_cmt_bubble(comment_bubble: WebElement, lang: Literal["vi", "en
     if to_bs4(comment_bubble).find("div", {"role": "button"}, string=see_more_text[lang]):
         comment_bubble.find_element(By.XPATH, f".//div[@role='button' and text()='{see_more_text[lang]}']").click()
 
-    if not to_bs4(comment_bubble).find("div", attrs={"class": "x1lliihq xjkvuk6 x1iorvi4"}):
+    text_divs = comment_bubble.find_elements(By.XPATH, selectors()["comments.bubble_text"])
+    if not text_divs:
         return ""
 
-    text_div = comment_bubble.find_element(By.XPATH, ".//div[@class='x1lliihq xjkvuk6 x1iorvi4']")
+    text_div = text_divs[0]
     text = parse_text_from_element(text_div)
     return text
 
 def get_id_from_cmt_bubble(comment_bubble: WebElement):
-    link_a = comment_bubble.find_element(By.XPATH, ".//div[@class='x6s0dn4 x3nfvp2']//a[@role='link' and @tabindex='0']")
+    link_a = comment_bubble.find_element(By.XPATH, selectors()["comments.bubble_link"])
     link = link_a.get_attribute("href")
     id = re.search(r"comment_id=(\d+)", link).group(1)
     return id
\ No newline at end of file
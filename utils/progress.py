@@ -1,13 +1,52 @@
-from collections import deque
+from collections import deque, Counter
 import os
+import time
+import sqlite3
+import threading
 from pathlib import Path
+from contextlib import contextmanager
 
 from typing import Literal
 
+from .bloom import BloomFilter
+
+
+MemoryBackend = Literal["text", "journal"]
+ProgressBackend = Literal[MemoryBackend, "sqlite"]
+
 
 class Progress:
-    def __init__(self, dir: str = "progress") -> None:
+    """
+    Crawl frontier (queue) and history of crawled URLs, saved under `dir`.
+
+    With the `"text"` backend, `save` rewrites history.txt and queue.txt.
+    With the `"journal"` backend, changes are also appended to journal.log as
+    events by `checkpoint`, which is cheap enough to call after every URL.
+    `load` replays the journal over the last snapshot, and the journal is
+    compacted into a new snapshot every `compact_every` events. A claimed URL
+    is kept in the saved queue until it is added to history or requeued.
+
+    If `history_fp_rate` is set, history is a `BloomFilter` in history.bloom
+    sized for `history_capacity` URLs, instead of a set of every URL. A URL is
+    then wrongly considered crawled with probability `history_fp_rate`.
+    """
+
+    backends = ["text", "journal"]
+
+    def __init__(
+        self,
+        dir: str = "progress",
+        backend: MemoryBackend = "text",
+        compact_every: int = 10000,
+        history_fp_rate: float | None = None,
+        history_capacity: int = 10**7,
+    ) -> None:
+        assert backend in self.backends
         dir = Path(dir)
+        self.backend: ProgressBackend = backend
+        self.compact_every = compact_every
+        self.history_fp_rate = history_fp_rate
+        self.history_capacity = history_capacity
         self.set_dir(dir)
         self.load()
 
@@ -15,14 +54,19 @@ class Progress:
         self.progress_dir = dir
         self.history_path = dir.joinpath("history.txt")
         self.queue_path = dir.joinpath("queue.txt")
+        self.journal_path = dir.joinpath("journal.log")
+        self.generation_path = dir.joinpath("generation.txt")
+        self.bloom_path = dir.joinpath("history.bloom")
 
     def load(self):
         # Prepare history
-        if not self.history_path.exists():
-            history = []
+        if self.history_fp_rate is not None:
+            history = self._load_compact_history()
+        elif not self.history_path.exists():
+            history = set()
         else:
             with open(self.history_path, "r") as f_hist:
-                history = f_hist.read().split()
+                history = set(f_hist.read().split())
 
         # Prepare queue
         if not self.queue_path.exists():
@@ -31,45 +75,167 @@ class Progress:
             with open(self.queue_path, "r") as f_queue:
                 queue = f_queue.read().split()
 
-        history, queue = set(history), deque(queue)
+        queue = deque(queue)
         self.history = history
         self.queue = queue
+        # Count of each URL in queue, kept in sync for O(1) membership tests
+        self.queued = Counter(queue)
+
+        # Popped by `claim`, their dequeue journaled once added to history or requeued
+        self.claimed = Counter()
+        # Events not yet written to journal
+        self.journal_buffer = []
+        self.journal_size = 0
+        if self.backend == "journal":
+            self.generation = self._read_generation()
+            self._replay_journal()
         return self.history, self.queue
 
+    def _load_compact_history(self):
+        if isinstance(getattr(self, "history", None), BloomFilter):
+            self.history.close()
+        is_new = not self.bloom_path.exists()
+        history = BloomFilter(self.bloom_path, capacity=self.history_capacity, fp_rate=self.history_fp_rate)
+
+        # Import history saved as text
+        if is_new and self.history_path.exists():
+            with open(self.history_path, "r") as f_hist:
+                history.update(f_hist.read().split())
+            history.flush()
+        return history
+
     def save(self):
         if not self.progress_dir.is_dir():
             os.makedirs(self.progress_dir, exist_ok=True)
+        is_compact = isinstance(self.history, BloomFilter)
+        if is_compact:
+            self.history.flush()
+
+        # Claimed URLs are not done yet
+        queue = [*self.claimed.elements(), *self.queue]
+        if self.backend == "text":
+            if not is_compact:
+                with open(self.history_path, "w") as f_hist:
+                    f_hist.write("\n".join(self.history))
+            with open(self.queue_path, "w") as f_queue:
+                f_queue.write("\n".join(queue))
+            return
+
+        # Snapshot, then bump generation, so that a crash in between never replays
+        # the old journal twice, then start a new journal for that generation
+        if not is_compact:
+            self._write_atomic(self.history_path, "\n".join(self.history))
+        self._write_atomic(self.queue_path, "\n".join(queue))
+        self.generation += 1
+        self._write_atomic(self.generation_path, str(self.generation))
+        self._write_atomic(self.journal_path, f"C {self.generation}\n")
+        self.journal_buffer.clear()
+        self.journal_size = 0
 
-        with open(self.history_path, "w") as f_hist, open(
-            self.queue_path, "w"
-        ) as f_queue:
-            f_hist.writelines("\n".join(self.history))
-            f_queue.writelines("\n".join(self.queue))
+    def checkpoint(self):
+        """Persist changes since the last checkpoint. No-op for the text backend"""
+        if self.backend != "journal" or not self.journal_buffer:
+            return
+        if self.journal_size + len(self.journal_buffer) > self.compact_every:
+            self.save()
+            return
+
+        if not self.journal_path.exists():
+            self.save()
+            return
+        with open(self.journal_path, "a") as f_journal:
+            f_journal.write("".join(self.journal_buffer))
+        self.journal_size += len(self.journal_buffer)
+        self.journal_buffer.clear()
+        if isinstance(self.history, BloomFilter):
+            self.history.flush()
+
+    def close(self):
+        """Release the file of a compact history, once saved"""
+        if isinstance(self.history, BloomFilter):
+            self.history.close()
+
+    def _journal(self, event: str, url: str = ""):
+        if self.backend == "journal":
+            self.journal_buffer.append(f"{event} {url}\n")
+
+    def _read_generation(self):
+        if not self.generation_path.exists():
+            return 0
+        with open(self.generation_path, "r") as f_gen:
+            return int(f_gen.read().strip() or 0)
+
+    def _replay_journal(self):
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, "r") as f_journal:
+            lines = f_journal.read().splitlines()
+        # A journal of an older generation is already in the snapshot
+        if not lines or lines[0] != f"C {self.generation}":
+            return
+
+        for line in lines[1:]:
+            event, _, url = line.partition(" ")
+            if event == "E":
+                self.queue.append(url)
+                self.queued[url] += 1
+            elif event == "L":
+                self.queue.appendleft(url)
+                self.queued[url] += 1
+            elif event == "D" and self.queue:
+                # Older journals did not name the URL, always the head of the queue
+                if not url or self.queue[0] == url:
+                    url = self.queue.popleft()
+                elif url in self.queued:
+                    self.queue.remove(url)
+                else:
+                    continue
+                self.queued[url] -= 1
+                if self.queued[url] <= 0:
+                    del self.queued[url]
+            elif event == "H":
+                self.history.add(url)
+        self.journal_size = len(lines) - 1
+
+    @staticmethod
+    def _write_atomic(path: Path, content: str):
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
 
     def enqueue(self, url: str, side: Literal["left", "right"] = "right"):
         if side == "right":
             self.queue.append(url)
         elif side == "left":
             self.queue.appendleft(url)
+        else:
+            return
+        self.queued[url] += 1
+        self._journal("E" if side == "right" else "L", url)
 
     def enqueue_list(self, urls: list[str], side: Literal["left", "right"] = "right"):
         for url in urls:
             self.enqueue(url, side)
 
+    def excluded(self, url: str, ignore: Literal["none", "queue", "history"] = "none"):
+        """Whether `url` is already in history or queue, depending on what is ignored"""
+        assert ignore in ["none", "queue", "history"]
+        if ignore in ["none", "queue"] and url in self.history:
+            return True
+        if ignore in ["none", "history"] and url in self.queued:
+            return True
+        return False
+
     def selectively_enqueue(
         self,
         url: str,
         side: Literal["left", "right"] = "right",
         ignore: Literal["none", "queue", "history"] = "none",
     ):
-        assert ignore in ["none", "queue", "history"]
-        exclude_set = set()
-        if ignore in ["none", "queue"]:
-            exclude_set.update(self.history)
-        if ignore in ["none", "history"]:
-            exclude_set.update(self.queue)
-
-        if url not in exclude_set:
+        if not self.excluded(url, ignore):
             # Enqueue URLs that are not already in progress or history.
             self.enqueue(url, side=side)
 
@@ -79,27 +245,397 @@ class Progress:
         side: Literal["left", "right"] = "right",
         ignore: Literal["none", "queue", "history"] = "none",
     ):
-        assert ignore in ["none", "queue", "history"]
-        exclude_set = set()
-        if ignore in ["none", "queue"]:
-            exclude_set.update(self.history)
-        if ignore in ["none", "history"]:
-            exclude_set.update(self.queue)
-
-        # Enqueue URLs that are not already in progress or history.
-        urls = list(set(urls).difference(exclude_set))
+        # Enqueue URLs that are not already in progress or history, once each, in order.
+        urls = [url for url in dict.fromkeys(urls) if not self.excluded(url, ignore)]
         self.enqueue_list(urls, side=side)
 
+    def _pop(self):
+        url = self.queue.popleft()
+        self.queued[url] -= 1
+        if self.queued[url] <= 0:
+            del self.queued[url]
+        return url
+
     def next_url(self, pop: bool = True):
-        if pop:
-            return self.queue.popleft()
-        return self.queue[0]
+        if not pop:
+            return self.queue[0]
+        url = self._pop()
+        self._journal("D", url)
+        return url
+
+    def claim(self) -> str | None:
+        """
+        Pop the next URL to crawl, or return `None` if nothing is left. Until it
+        is added to history or requeued, it is still in the queue once reloaded
+        """
+        if self.count_remaining() == 0:
+            return None
+        url = self._pop()
+        self.claimed[url] += 1
+        return url
+
+    def _release(self, url: str):
+        if self.claimed[url] > 0:
+            self.claimed[url] -= 1
+            self._journal("D", url)
+        if self.claimed[url] <= 0:
+            del self.claimed[url]
+
+    def requeue(self, url: str):
+        """Put a claimed URL back in front of the queue unless it was crawled successfully"""
+        self._release(url)
+        if not self.propagated(url):
+            self.enqueue(url, "left")
+
+    def seed(self, url: str):
+        """Ensure a session starts from `url`, even if it was crawled before"""
+        if self.count_remaining() == 0 or self.next_url(pop=False) != url:
+            self.selectively_enqueue(url, side="left", ignore="history")
 
     def add_history(self, url: str):
         self.history.add(url)
+        self._release(url)
+        self._journal("H", url)
 
     def propagated(self, url: str):
         return url in self.history
 
     def count_remaining(self):
         return len(self.queue)
+
+
+class SharedProgress(Progress):
+    """
+    Thread-safe `Progress` shared by the crawlers of a worker pool.
+    A claimed URL stays in flight until it is added to history or requeued,
+    so it is neither enqueued again nor considered finished meanwhile.
+    """
+
+    def __init__(
+        self,
+        dir: str = "progress",
+        backend: MemoryBackend = "text",
+        compact_every: int = 10000,
+        history_fp_rate: float | None = None,
+        history_capacity: int = 10**7,
+        poll_interval: float = 5,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.in_flight = set()
+        self.seeded = set()
+        super().__init__(dir, backend, compact_every, history_fp_rate, history_capacity)
+
+    def load(self):
+        with self.lock:
+            return super().load()
+
+    def save(self):
+        with self.lock:
+            super().save()
+
+    def checkpoint(self):
+        with self.lock:
+            super().checkpoint()
+
+    def close(self):
+        with self.lock:
+            super().close()
+
+    def enqueue(self, url: str, side: Literal["left", "right"] = "right"):
+        with self.changed:
+            super().enqueue(url, side)
+            self.changed.notify_all()
+
+    def enqueue_list(self, urls: list[str], side: Literal["left", "right"] = "right"):
+        with self.changed:
+            super().enqueue_list(urls, side)
+            self.changed.notify_all()
+
+    def excluded(self, url: str, ignore: Literal["none", "queue", "history"] = "none"):
+        return url in self.in_flight or super().excluded(url, ignore)
+
+    def selectively_enqueue(self, *args, **kwargs):
+        with self.lock:
+            super().selectively_enqueue(*args, **kwargs)
+
+    def selectively_enqueue_list(self, *args, **kwargs):
+        with self.lock:
+            super().selectively_enqueue_list(*args, **kwargs)
+
+    def next_url(self, pop: bool = True):
+        with self.lock:
+            return super().next_url(pop)
+
+    def claim(self) -> str | None:
+        # Wait while other workers may still enqueue URLs found on their pages
+        with self.changed:
+            while self.count_remaining() == 0 and self.in_flight:
+                # Woken by the others' changes, checking again now and then in case one is missed
+                self.changed.wait(timeout=self.poll_interval)
+            url = super().claim()
+            if url is not None:
+                self.in_flight.add(url)
+            return url
+
+    def requeue(self, url: str):
+        with self.changed:
+            super().requeue(url)
+            self.in_flight.discard(url)
+            self.changed.notify_all()
+
+    def seed(self, url: str):
+        # Only the first worker of a session seeds its start URL
+        with self.lock:
+            if url in self.seeded:
+                return
+            self.seeded.add(url)
+            super().seed(url)
+
+    def add_history(self, url: str):
+        with self.changed:
+            super().add_history(url)
+            self.in_flight.discard(url)
+            self.changed.notify_all()
+
+    def propagated(self, url: str):
+        with self.lock:
+            return super().propagated(url)
+
+    def count_remaining(self):
+        with self.lock:
+            return super().count_remaining()
+
+
+class SQLiteProgress(Progress):
+    """
+    `Progress` kept in progress/progress.db (SQLite, WAL mode) instead of in memory.
+    Every change is committed right away, and the queue and history are indexed
+    tables, so nothing is loaded at startup. Several threads or processes on one
+    host may share it: a claimed URL stays in queue, marked with the process
+    and thread that claimed it, until it is added to history or requeued.
+    Claims of processes or threads that died are released.
+    """
+
+    def __init__(self, dir: str = "progress", poll_interval: float = 0.5) -> None:
+        self.poll_interval = poll_interval
+        self.local = threading.local()
+        super().__init__(dir)
+        # `Progress.__init__` only takes the in-memory backends
+        self.backend = "sqlite"
+
+    def set_dir(self, dir: str):
+        super().set_dir(dir)
+        self.db_path = dir.joinpath("progress.db")
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One connection per thread
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction, taking the database lock up front. Nested calls join the outer one"""
+        conn = self.conn
+        if self.local.depth > 0:
+            self.local.depth += 1
+            try:
+                yield conn
+            finally:
+                self.local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self.local.depth = 1
+        try:
+            yield conn
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self.local.depth = 0
+
+    def load(self):
+        os.makedirs(self.progress_dir, exist_ok=True)
+        with self.transaction() as conn:
+            is_new = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name = 'queue'"
+            ).fetchone()[0] == 0
+            conn.execute("CREATE TABLE IF NOT EXISTS history (url TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS queue "
+                "(pos INTEGER PRIMARY KEY, url TEXT NOT NULL, claimed_pid INTEGER, claimed_thread INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS queue_url ON queue (url)")
+            # Databases of older versions only kept the claiming process
+            if "claimed_thread" not in [column[1] for column in conn.execute("PRAGMA table_info(queue)")]:
+                conn.execute("ALTER TABLE queue ADD COLUMN claimed_thread INTEGER")
+
+            # Import progress saved by the text backend
+            if is_new:
+                self._import_text()
+        self.release_stale_claims()
+
+    def _import_text(self):
+        conn = self.conn
+        if self.history_path.exists():
+            with open(self.history_path, "r") as f_hist:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO history (url) VALUES (?)",
+                    ((url,) for url in f_hist.read().split()),
+                )
+        if self.queue_path.exists():
+            with open(self.queue_path, "r") as f_queue:
+                conn.executemany(
+                    "INSERT INTO queue (url) VALUES (?)",
+                    ((url,) for url in f_queue.read().split()),
+                )
+
+    def release_stale_claims(self):
+        with self.transaction() as conn:
+            pids = [pid for pid, in conn.execute("SELECT DISTINCT claimed_pid FROM queue WHERE claimed_pid IS NOT NULL")]
+            dead_pids = [(pid,) for pid in pids if not pid_alive(pid)]
+            conn.executemany("UPDATE queue SET claimed_pid = NULL, claimed_thread = NULL WHERE claimed_pid = ?", dead_pids)
+            # Threads of this process stopped without adding their URL to history or requeuing it
+            threads = [thread for thread, in conn.execute(
+                "SELECT DISTINCT claimed_thread FROM queue WHERE claimed_pid = ?", (os.getpid(),)
+            )]
+            alive = {thread.ident for thread in threading.enumerate()}
+            conn.executemany(
+                "UPDATE queue SET claimed_pid = NULL, claimed_thread = NULL WHERE claimed_pid = ? AND claimed_thread IS ?",
+                [(os.getpid(), thread) for thread in threads if thread not in alive],
+            )
+
+    def save(self):
+        self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def checkpoint(self):
+        # Every change is already committed
+        pass
+
+    def enqueue(self, url: str, side: Literal["left", "right"] = "right"):
+        with self.transaction() as conn:
+            if side == "right":
+                conn.execute("INSERT INTO queue (pos, url) SELECT COALESCE(MAX(pos), 0) + 1, ? FROM queue", (url,))
+            elif side == "left":
+                conn.execute("INSERT INTO queue (pos, url) SELECT COALESCE(MIN(pos), 0) - 1, ? FROM queue", (url,))
+
+    def enqueue_list(self, urls: list[str], side: Literal["left", "right"] = "right"):
+        with self.transaction():
+            super().enqueue_list(urls, side)
+
+    def excluded(self, url: str, ignore: Literal["none", "queue", "history"] = "none"):
+        assert ignore in ["none", "queue", "history"]
+        if ignore in ["none", "queue"] and self.propagated(url):
+            return True
+        if ignore in ["none", "history"]:
+            return self.conn.execute("SELECT 1 FROM queue WHERE url = ? LIMIT 1", (url,)).fetchone() is not None
+        return False
+
+    def selectively_enqueue(self, *args, **kwargs):
+        with self.transaction():
+            super().selectively_enqueue(*args, **kwargs)
+
+    def selectively_enqueue_list(self, *args, **kwargs):
+        with self.transaction():
+            super().selectively_enqueue_list(*args, **kwargs)
+
+    def _head(self):
+        return self.conn.execute(
+            "SELECT pos, url FROM queue WHERE claimed_pid IS NULL ORDER BY pos LIMIT 1"
+        ).fetchone()
+
+    def next_url(self, pop: bool = True):
+        with self.transaction() as conn:
+            head = self._head()
+            if head is None:
+                raise IndexError("pop from an empty queue")
+            pos, url = head
+            if pop:
+                conn.execute("DELETE FROM queue WHERE pos = ?", (pos,))
+            return url
+
+    def claim(self) -> str | None:
+        while True:
+            with self.transaction() as conn:
+                head = self._head()
+                if head is not None:
+                    pos, url = head
+                    conn.execute(
+                        "UPDATE queue SET claimed_pid = ?, claimed_thread = ? WHERE pos = ?",
+                        (os.getpid(), threading.get_ident(), pos),
+                    )
+                    return url
+                in_flight = conn.execute("SELECT 1 FROM queue LIMIT 1").fetchone() is not None
+            if not in_flight:
+                return None
+            # Wait while other workers may still enqueue URLs found on their pages
+            time.sleep(self.poll_interval)
+            self.release_stale_claims()
+
+    def requeue(self, url: str):
+        with self.transaction() as conn:
+            if self.propagated(url):
+                return
+            updated = conn.execute(
+                "UPDATE queue SET claimed_pid = NULL, claimed_thread = NULL, pos = (SELECT MIN(pos) FROM queue) - 1 "
+                "WHERE pos = (SELECT pos FROM queue WHERE url = ? AND claimed_pid IS NOT NULL LIMIT 1)",
+                (url,),
+            ).rowcount
+            if updated == 0:
+                self.enqueue(url, "left")
+
+    def add_history(self, url: str):
+        with self.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO history (url) VALUES (?)", (url,))
+            conn.execute("DELETE FROM queue WHERE url = ? AND claimed_pid IS NOT NULL", (url,))
+
+    def propagated(self, url: str):
+        return self.conn.execute("SELECT 1 FROM history WHERE url = ?", (url,)).fetchone() is not None
+
+    def count_remaining(self):
+        return self.conn.execute("SELECT COUNT(*) FROM queue WHERE claimed_pid IS NULL").fetchone()[0]
+
+
+def pid_alive(pid: int):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def open_progress(
+    dir: str,
+    backend: ProgressBackend = "text",
+    shared: bool = False,
+    history_fp_rate: float | None = None,
+    history_capacity: int = 10**7,
+) -> Progress:
+    """
+    `Progress` for `backend`. `shared` makes it safe to share between threads.
+    SQLite history is already on disk, so `history_fp_rate` does not apply to it
+    """
+    if backend == "sqlite":
+        return SQLiteProgress(dir)
+    if shared:
+        return SharedProgress(dir, backend, history_fp_rate=history_fp_rate, history_capacity=history_capacity)
+    return Progress(dir, backend, history_fp_rate=history_fp_rate, history_capacity=history_capacity)
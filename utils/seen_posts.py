@@ -0,0 +1,127 @@
+import os
+import json
+import threading
+from pathlib import Path
+from collections import deque
+from datetime import datetime
+from typing import Any
+
+
+class SeenPosts:
+    """
+    Index of posts already stored for a page, for incremental crawls: their
+    `post_id` hashes, feed fingerprints, and the newest `post_datetime` seen
+    (the watermark). Appended to `path` as posts are stored. When the index does
+    not exist yet, it is seeded from the page's data.csv written by `SaveAsCSV`.
+
+    `observe` counts consecutive known posts, so that scrolling stops after
+    `stop_after` of them rather than at the first one, as pinned posts are
+    usually known.
+
+    Like `FeedCursor` entries, a post added may wait for its record to be
+    saved, see `save_through`, so that a post lost in a crash is not taken for
+    stored by the next crawls.
+    """
+
+    def __init__(self, path: str, stop_after: int = 10, csv_path: str | None = None) -> None:
+        self.path = Path(path)
+        self.stop_after = stop_after
+        self.csv_path = Path(csv_path) if csv_path else None
+        self.lock = threading.Lock()
+        self.n_saved = 0
+        self.load()
+
+    def load(self):
+        self.unsaved: deque[tuple[int, dict[str, Any]]] = deque()
+        self.post_ids = set()
+        self.fingerprints = set()
+        self.watermark: datetime | None = None
+        self.known_run = 0
+
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._apply(entry)
+        elif self.csv_path and self.csv_path.exists():
+            self._seed_from_csv()
+
+    def _seed_from_csv(self):
+        import pandas as pd
+        columns = pd.read_csv(self.csv_path, nrows=0).columns
+        data = pd.read_csv(self.csv_path, usecols=[c for c in ["post_id", "post_datetime"] if c in columns])
+        post_ids = data["post_id"].dropna().astype(str).unique() if "post_id" in data else []
+        newest = None
+        if "post_datetime" in data:
+            newest = pd.to_datetime(data["post_datetime"], errors="coerce", format="mixed").max()
+            newest = None if pd.isna(newest) else newest.to_pydatetime()
+
+        # Persist seeds, as the CSV is not read again once the index exists
+        entries = [{"post_id": post_id} for post_id in post_ids]
+        if newest is not None:
+            entries.append({"post_datetime": newest.isoformat()})
+        os.makedirs(self.path.parent, exist_ok=True)
+        with open(self.path, "w") as f:
+            for entry in entries:
+                self._apply(entry)
+                f.write(json.dumps(entry) + "\n")
+
+    def _apply(self, entry: dict[str, Any]):
+        if entry.get("post_id"):
+            self.post_ids.add(entry["post_id"])
+        if entry.get("fingerprint"):
+            self.fingerprints.add(entry["fingerprint"])
+        if entry.get("post_datetime"):
+            post_datetime = datetime.fromisoformat(entry["post_datetime"])
+            if self.watermark is None or post_datetime > self.watermark:
+                self.watermark = post_datetime
+
+    def known(self, post_id: str | None = None, fingerprint: str | None = None):
+        return post_id in self.post_ids or fingerprint in self.fingerprints
+
+    def add(
+        self,
+        post_id: str | None,
+        fingerprint: str | None = None,
+        post_datetime: datetime | None = None,
+        after: int = 0,
+    ):
+        """Remember a stored post, persisted once `after` records are saved"""
+        entry = {
+            "post_id": post_id,
+            "fingerprint": fingerprint,
+            "post_datetime": post_datetime.isoformat() if isinstance(post_datetime, datetime) else None,
+        }
+        with self.lock:
+            self._apply(entry)
+            self.unsaved.append((after, entry))
+            self._write()
+
+    def save_through(self, n_saved: int):
+        """Persist posts waiting for at most `n_saved` records, e.g. as a `Pipeline` flush listener"""
+        with self.lock:
+            self.n_saved = n_saved
+            self._write()
+
+    def _write(self):
+        entries = []
+        while self.unsaved and self.unsaved[0][0] <= self.n_saved:
+            entries.append(self.unsaved.popleft()[1])
+        if not entries:
+            return
+        os.makedirs(self.path.parent, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+    def observe(self, known: bool, post_datetime: datetime | None = None):
+        """
+        Count a feed post as known or new, and return whether the run of known
+        posts is long enough to stop. A post older than the watermark counts as known.
+        """
+        if not known and isinstance(post_datetime, datetime) and self.watermark is not None:
+            known = post_datetime <= self.watermark
+        self.known_run = self.known_run + 1 if known else 0
+        return self.known_run >= self.stop_after
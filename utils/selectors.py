@@ -0,0 +1,94 @@
+import os
+import json
+from pathlib import Path
+from typing import Any
+
+from lxml import etree
+
+SELECTOR_SETS_DIR = Path(__file__).parent / "selector_sets"
+# Selector set used unless `use_selectors` is called, a version or a JSON file path
+SELECTORS_ENV = "FBC_SELECTORS"
+
+
+class SelectorSet:
+    """
+    XPaths of one Facebook layout, by name. Raw strings are served to the
+    browser side (`find_element`, in-page scripts), and lxml `etree.XPath`
+    objects, compiled on first use, to the snapshot side. A set may extend
+    another, overriding only the selectors that changed with the layout.
+    A name may also map to a list of XPaths, e.g. of elements to remove.
+    """
+
+    def __init__(self, version: str, xpaths: dict[str, str | list[str]]) -> None:
+        self.version = version
+        self.xpaths = xpaths
+        self._compiled: dict[str, etree.XPath] = {}
+
+    @classmethod
+    def load(cls, version_or_path: str):
+        path = Path(version_or_path)
+        if path.suffix != ".json":
+            path = SELECTOR_SETS_DIR / f"{version_or_path}.json"
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        xpaths = {}
+        if data.get("extends"):
+            xpaths.update(cls.load(data["extends"]).xpaths)
+        xpaths.update(data["xpaths"])
+        return cls(data.get("version", path.stem), xpaths)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.xpaths[name]
+
+    def __contains__(self, name: str):
+        return name in self.xpaths
+
+    def xpath(self, name: str) -> etree.XPath:
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            compiled = self._compiled[name] = etree.XPath(self.xpaths[name])
+        return compiled
+
+    def compile_all(self):
+        """Compile every selector, raising `etree.XPathSyntaxError` on the first invalid one"""
+        for name, xpath in self.xpaths.items():
+            if isinstance(xpath, str):
+                self.xpath(name)
+        return self
+
+    def __repr__(self):
+        return f"SelectorSet({self.version!r}, {len(self.xpaths)} selectors)"
+
+
+def available_versions() -> list[str]:
+    return sorted(path.stem for path in SELECTOR_SETS_DIR.glob("*.json"))
+
+
+_active: SelectorSet | None = None
+
+
+def use_selectors(version_or_path: str | None = None) -> SelectorSet:
+    """
+    Switch to a selector set, by version or path to a JSON file. Defaults to
+    $FBC_SELECTORS, else the latest version.
+    """
+    global _active
+    version_or_path = version_or_path or os.environ.get(SELECTORS_ENV) or available_versions()[-1]
+    _active = SelectorSet.load(version_or_path).compile_all()
+    return _active
+
+
+def selectors() -> SelectorSet:
+    """The selector set in use"""
+    return _active or use_selectors()
+
+
+class selector:
+    """Class attribute resolving to a selector of the set in use, when accessed"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return selectors()[self.name]
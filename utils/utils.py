@@ -1,16 +1,21 @@
+from __future__ import annotations
 from os import PathLike
-from selenium.webdriver.common.by import By
-from selenium.webdriver import Chrome
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.remote.webelement import WebElement
+from typing import TYPE_CHECKING
 
+# Selenium is only imported when a browser is driven, see benchmarks/startup.py
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from selenium.webdriver import Chrome
+    from selenium.webdriver.remote.webelement import WebElement
+
+import os
+import csv
 import urllib.parse
 import bs4
 import time
 import hashlib
 import sys
-from html import unescape
+from html import unescape, escape
 from unittest.mock import patch
 from contextlib import contextmanager
 from lxml import etree
@@ -37,8 +42,18 @@ def is_logged_in(driver: Chrome):
     return "c_user" in cookies
 
 
+def hit_wall(driver: Chrome):
+    """Function to check if Facebook redirected to a login or checkpoint page"""
+    path = urllib.parse.urlparse(driver.current_url).path
+    return path.startswith(("/checkpoint", "/login"))
+
+
 def login(driver: Chrome, username: str, password: str):
     """Function to login to facebook"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     username_box = driver.find_element(By.CSS_SELECTOR, "input[id=email]")
     username_box.send_keys(username)
 
@@ -83,6 +98,29 @@ def to_etree(element: WebElement) -> etree.Element:
     return etree.HTML(element.get_attribute("outerHTML"))
 
 
+def snapshot(element: WebElement) -> etree.Element:
+    """Fetch `element`'s outerHTML once and return it as a detached lxml element"""
+    return html_to_element(element.get_attribute("outerHTML"))
+
+
+def html_to_element(html: str) -> etree.Element:
+    body = etree.HTML(html).find("body")
+    return body[0]
+
+
+def inner_html(element: etree.Element) -> str:
+    """Browser-like innerHTML of an lxml element"""
+    text = escape(element.text, quote=False) if element.text else ""
+    return text + "".join(
+        etree.tostring(child, encoding="unicode", method="html")
+        for child in element
+    )
+
+
+def element_text(element: etree.Element) -> str:
+    return "".join(element.itertext()).strip()
+
+
 def write_element(element: WebElement, dst: str):
         soup = to_bs4(element)
         try:
@@ -92,6 +130,22 @@ def write_element(element: WebElement, dst: str):
             print(f"Cannot write \n{soup}\n to {dst}")
 
 
+def append_csv(df: DataFrame, path: str) -> list[str]:
+    """
+    Append `df` to the CSV at `path`, in the columns of its header if it exists,
+    e.g. as written by an older version. Returns the columns of `df` left out.
+    """
+    header = None
+    if os.path.exists(path):
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), None)
+    if not header:
+        df.to_csv(path, index=False, mode="a", header=True)
+        return []
+    df.reindex(columns=header).to_csv(path, index=False, mode="a", header=False)
+    return [column for column in df.columns if column not in header]
+
+
 def check_unavailable(page_source: str):
     h2 = bs4.BeautifulSoup(page_source, "lxml").find("h2")
     return h2 and h2.text == "This content isn't available at the moment"
@@ -0,0 +1,92 @@
+import os
+import json
+import threading
+from pathlib import Path
+from collections import deque
+from typing import Any
+
+
+class WorkQueue:
+    """
+    Durable queue handing work items from one crawl phase to the workers of the
+    next while both run, e.g. posts with comments found while scrolling the
+    feed. Each put and each done item is appended as a JSON line, so after a
+    restart the items put but not done are pending again. Items are unique by
+    key. `get` blocks until an item is available, or returns None once the
+    queue is closed and drained.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.cond = threading.Condition()
+        self.load()
+
+    def load(self):
+        with self.cond:
+            self.items: dict[str, Any] = {}
+            self.closed = False
+            if self.path.exists():
+                with open(self.path, "r") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            # Line torn by a killed process
+                            continue
+                        if entry["op"] == "put":
+                            self.items[entry["key"]] = entry["value"]
+                        else:
+                            self.items.pop(entry["key"], None)
+            self.ready = deque(self.items)
+
+    def _append(self, entry: dict[str, Any]):
+        os.makedirs(self.path.parent, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def put(self, key: str, value: Any = None):
+        with self.cond:
+            if key in self.items:
+                return
+            self._append({"op": "put", "key": key, "value": value})
+            self.items[key] = value
+            self.ready.append(key)
+            self.cond.notify()
+
+    def get(self, timeout: float | None = None) -> tuple[str, Any] | None:
+        """Next item as a (key, value) pair, None if closed and drained or on timeout"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.ready or self.closed, timeout=timeout)
+            if not self.ready:
+                return None
+            key = self.ready.popleft()
+            return key, self.items[key]
+
+    def done(self, key: str):
+        with self.cond:
+            if key not in self.items:
+                return
+            self._append({"op": "done", "key": key})
+            self.items.pop(key)
+
+    def close(self):
+        """No more items will be put: let `get` return None once drained"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def clear(self):
+        """Forget the queue once every item is done"""
+        with self.cond:
+            if self.path.exists():
+                os.remove(self.path)
+        self.load()
+
+    @property
+    def pending(self) -> dict[str, Any]:
+        """Items not done, handed out or not"""
+        with self.cond:
+            return dict(self.items)
+
+    def __len__(self):
+        return len(self.items)